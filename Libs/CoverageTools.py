@@ -0,0 +1,525 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from Libs import constants, GeoTools
+
+
+class GridSpec(object):
+    """
+    Square ENU grid centred on a sensor
+    Parameters
+    __________
+    half_width_nmi: float
+        Grid extends +/- half_width_nmi east and north of the sensor
+    spacing_nmi: float
+        Distance between grid points
+    alt_ft: float
+        Up component of every grid point above the sensor tangent plane
+    tile_size: int
+        Number of grid points along each side of a tile; peak memory scales with tile_size ** 2
+    dtype: np.dtype
+        Precision of the ENU tiles and their lat/lon/alt output (float32 halves tile memory)
+    """
+
+    def __init__(self, half_width_nmi=150.0, spacing_nmi=0.1, alt_ft=1500.0, tile_size=512, dtype=np.float64):
+        if spacing_nmi <= 0 or half_width_nmi <= 0:
+            raise ValueError("half_width_nmi and spacing_nmi must be positive.")
+        if tile_size < 1:
+            raise ValueError("tile_size must be at least 1.")
+        self.half_width_nmi = half_width_nmi
+        self.spacing_nmi = spacing_nmi
+        self.alt_ft = alt_ft
+        self.tile_size = int(tile_size)
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def num_points(self) -> int:
+        """Points along one side of the grid"""
+        return int(round(2 * self.half_width_nmi / self.spacing_nmi)) + 1
+
+    @property
+    def shape(self) -> tuple:
+        return self.num_points, self.num_points
+
+    @property
+    def axis_meters(self) -> np.ndarray:
+        """East (and north) coordinates of the grid columns (rows) in metres"""
+        return (np.arange(self.num_points) * self.spacing_nmi - self.half_width_nmi) * constants.NM_TO_METERS
+
+    @property
+    def up_meters(self) -> float:
+        return self.alt_ft * constants.FEET_TO_METERS
+
+    def tile_origins(self):
+        """Yield the (row, col) of the first grid point of every tile in row-major order"""
+        for row in range(0, self.num_points, self.tile_size):
+            for col in range(0, self.num_points, self.tile_size):
+                yield row, col
+
+
+class GridTile(object):
+    """One tile of a coverage grid, with its ENU inputs and LLA outputs"""
+
+    def __init__(self, row, col, shape, enu, lla=None):
+        self.row = row
+        self.col = col
+        self.shape = shape
+        self.enu = enu
+        self.lla = lla
+
+    @property
+    def lat(self) -> np.ndarray:
+        return self.lla[0].reshape(self.shape)
+
+    @property
+    def lon(self) -> np.ndarray:
+        return self.lla[1].reshape(self.shape)
+
+    @property
+    def alt(self) -> np.ndarray:
+        return self.lla[2].reshape(self.shape)
+
+
+def _enu_tile(axis, row, col, tile_size, up_meters, dtype=np.float64) -> tuple:
+    """nx3 ENU points of the tile starting at (row, col) and its (rows, cols) shape"""
+    north = axis[row:row + tile_size]
+    east = axis[col:col + tile_size]
+    enu = np.empty((north.size * east.size, 3), dtype=dtype)
+    enu[:, 0] = np.tile(east, north.size)
+    enu[:, 1] = np.repeat(north, east.size)
+    enu[:, 2] = up_meters
+    return enu, (north.size, east.size)
+
+
+def iter_enu_tiles(spec: GridSpec):
+    """Yield GridTile objects holding the nx3 ENU points of each tile; the full grid is never built"""
+    axis = spec.axis_meters
+    for row, col in spec.tile_origins():
+        enu, shape = _enu_tile(axis, row, col, spec.tile_size, spec.up_meters, spec.dtype)
+        yield GridTile(row, col, shape, enu)
+
+
+def iter_lla_tiles(observer, spec: GridSpec, geo=None, method="heikkinen"):
+    """
+    Yield GridTile objects converted to lat/lon/alt for a sensor observer
+    Parameters
+    __________
+    observer: tuple
+        (lat, lon, alt) of the sensor in degrees and metres
+    spec: GridSpec
+    geo: GeoTools.Geo
+        Optional shared Geo instance
+    method: str
+        ECEF to geodetic solver passed on to Geo.enu_to_lat_lon_alt
+    """
+    geo = geo if geo is not None else GeoTools.Geo()
+    for tile in iter_enu_tiles(spec):
+        tile.lla = geo.enu_to_lat_lon_alt(tile.enu, observer, method=method, dtype=spec.dtype)
+        yield tile
+
+
+def run_coverage_grid(observer, spec: GridSpec, consumers, geo=None, method="heikkinen"):
+    """
+    Stream every tile of a sensor's grid through one or more consumers
+    Parameters
+    __________
+    observer: tuple
+        (lat, lon, alt) of the sensor in degrees and metres
+    spec: GridSpec
+    consumers: callable or list of callables
+        Each is called with every GridTile; a close() method is called once the grid is done
+    Returns
+    _______
+    list of the consumers, so reducer results can be read back
+    """
+    if callable(consumers):
+        consumers = [consumers]
+    for tile in iter_lla_tiles(observer, spec, geo=geo, method=method):
+        for consumer in consumers:
+            consumer(tile)
+        # Drop the tile arrays before the next one is generated
+        tile.enu = tile.lla = None
+
+    for consumer in consumers:
+        close = getattr(consumer, "close", None)
+        if close is not None:
+            close()
+
+    return consumers
+
+
+class NpyGridWriter(object):
+    """Write tiles into a memory-mapped (3, rows, cols) lat/lon/alt .npy file"""
+
+    def __init__(self, file_path, spec: GridSpec, dtype=np.float64):
+        self.file_path = file_path
+        self.grid = np.lib.format.open_memmap(file_path, mode="w+", dtype=dtype, shape=(3,) + spec.shape)
+
+    def __call__(self, tile: GridTile):
+        rows, cols = tile.shape
+        self.grid[:, tile.row:tile.row + rows, tile.col:tile.col + cols] = tile.lla.reshape(3, rows, cols)
+
+    def close(self):
+        self.grid.flush()
+        self.grid = None
+
+
+class ExtentReducer(object):
+    """Running lat/lon/alt extent and point count of a grid"""
+
+    def __init__(self):
+        self.count = 0
+        self.minimum = np.full(3, np.inf)
+        self.maximum = np.full(3, -np.inf)
+
+    def __call__(self, tile: GridTile):
+        self.count += tile.lla.shape[1]
+        self.minimum = np.minimum(self.minimum, tile.lla.min(axis=1))
+        self.maximum = np.maximum(self.maximum, tile.lla.max(axis=1))
+
+
+class KmlTileWriter(object):
+    """Add the footprint of every tile to a KmlTools.KmlCreator as a polygon"""
+
+    def __init__(self, kml, parent_node=None, color=None, opacity=50, name=None):
+        self.kml = kml
+        self.parent_node = parent_node
+        self.color = color
+        self.opacity = opacity
+        self.name = name
+
+    def __call__(self, tile: GridTile):
+        lat, lon, alt = tile.lat, tile.lon, tile.alt
+        corners = [(0, 0), (0, -1), (-1, -1), (-1, 0), (0, 0)]
+        footprint = [(lon[r, c], lat[r, c], alt[r, c]) for r, c in corners]
+        self.kml.add_tiles(
+            [footprint],
+            parent_node=self.parent_node,
+            color=self.color,
+            opacity=self.opacity,
+            name=self.name,
+        )
+
+
+# Shared buffers attached once per worker process by _attach_shared_buffers
+_worker_buffers = {}
+
+
+def _attach_untracked(name) -> shared_memory.SharedMemory:
+    """
+    Attach to a block created by the parent without registering it with the resource tracker, so a
+    worker exiting never unlinks it or reports it as leaked (bpo-39959); only the parent unlinks
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument. Workers share the parent's tracker, so unregistering
+        # after the fact would drop the parent's registration; skip registering instead
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _attach_shared_buffers(buffers: dict):
+    """Process pool initializer: map each (name, shape) shared block to a numpy view"""
+    for key, (name, shape) in buffers.items():
+        shm = _attach_untracked(name)
+        _worker_buffers[key] = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    _worker_buffers["geo"] = GeoTools.Geo()
+
+
+def _coverage_shard(task):
+    """Convert one (radar, tile) shard and write it straight into the shared output block"""
+    slot, radar, row, col, tile_size, up_meters, method = task
+    start = time.perf_counter()
+    axis = _worker_buffers["axis"][1]
+    observers = _worker_buffers["observers"][1]
+    output = _worker_buffers["output"][1]
+
+    enu, (rows, cols) = _enu_tile(axis, row, col, tile_size, up_meters)
+    lla = _worker_buffers["geo"].enu_to_lat_lon_alt(enu, tuple(observers[radar]), method=method)
+    output[slot, :, row:row + rows, col:col + cols] = lla.reshape(3, rows, cols)
+
+    return os.getpid(), enu.shape[0], time.perf_counter() - start
+
+
+class ParallelCoverage(object):
+    """
+    Compute coverage grids for many radars on a process pool
+    Parameters
+    __________
+    spec: GridSpec
+        Grid computed around every radar; tiles are the unit of work handed to workers
+    workers: int
+        Number of worker processes (defaults to os.cpu_count())
+    retries: int
+        How many times a failed shard is resubmitted before the run is abandoned
+    batch_size: int
+        Radars whose grids share the output block at once; bounds memory to
+        batch_size * 3 * rows * cols * 8 bytes
+
+    Inputs (the ENU axis and radar observers) and outputs live in shared memory so workers only
+    receive small task tuples and return timing. Each shard owns a disjoint slice of the output,
+    so results do not depend on completion order.
+    """
+
+    def __init__(self, spec: GridSpec, workers=None, retries=2, batch_size=8, method="heikkinen"):
+        self.spec = spec
+        self.workers = workers or os.cpu_count() or 1
+        self.retries = retries
+        self.batch_size = max(int(batch_size), 1)
+        self.method = method
+        self.worker_stats = {}
+
+    @staticmethod
+    def observers_from_radars(radars, alt_m=0.0, lat_col="Radar_Lat", lon_col="Radar_Lon", id_col="Radar_ID"):
+        """Radar IDs and an nx3 (lat, lon, alt) array from a Terminal/EnRoute radars frame"""
+        radars = radars.dropna(subset=[lat_col, lon_col])
+        observers = np.empty((len(radars), 3))
+        observers[:, 0] = radars[lat_col].to_numpy(dtype=float)
+        observers[:, 1] = radars[lon_col].to_numpy(dtype=float)
+        observers[:, 2] = alt_m
+        return radars[id_col].to_list(), observers
+
+    def run_radars(self, radars, alt_m=0.0, consumer=None):
+        """Run every radar in a Terminal.radars / EnRoute.radars frame"""
+        ids, observers = self.observers_from_radars(radars, alt_m=alt_m)
+        return self.run(observers, ids=ids, consumer=consumer)
+
+    def run(self, observers, ids=None, consumer=None):
+        """
+        Parameters
+        __________
+        observers: np.ndarray
+            nx3 (lat, lon, alt) per radar
+        ids: list
+            Radar identifiers, defaults to the row number
+        consumer: callable
+            Called in radar order with (radar_id, lla) where lla is a (3, rows, cols) view of shared
+            memory that is only valid during the call. Defaults to collecting copies in a dict.
+        Returns
+        _______
+        dict of radar_id -> (3, rows, cols) lat/lon/alt grid when no consumer is given, else None
+        """
+        observers = np.asarray(observers, dtype=np.float64).reshape(-1, 3)
+        ids = list(range(observers.shape[0])) if ids is None else list(ids)
+        results = {} if consumer is None else None
+        if consumer is None:
+            def consumer(radar_id, lla):
+                results[radar_id] = lla.copy()
+
+        self.worker_stats = {}
+        batch = min(self.batch_size, max(observers.shape[0], 1))
+        blocks = {
+            "axis": self.spec.axis_meters,
+            "observers": observers,
+            "output": (batch, 3) + self.spec.shape,
+        }
+        shared = {}
+        try:
+            for key, value in blocks.items():
+                shape = value if isinstance(value, tuple) else value.shape
+                shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+                view = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+                if not isinstance(value, tuple):
+                    view[:] = value
+                shared[key] = (shm, view)
+
+            init_args = {key: (shm.name, view.shape) for key, (shm, view) in shared.items()}
+            output = shared["output"][1]
+            executor = ProcessPoolExecutor(self.workers, initializer=_attach_shared_buffers, initargs=(init_args,))
+            try:
+                for first in range(0, observers.shape[0], batch):
+                    radars = range(first, min(first + batch, observers.shape[0]))
+                    tasks = [
+                        (slot, radar, row, col, self.spec.tile_size, self.spec.up_meters, self.method)
+                        for slot, radar in enumerate(radars)
+                        for row, col in self.spec.tile_origins()
+                    ]
+                    executor = self.__run_tasks(executor, tasks, init_args)
+                    for slot, radar in enumerate(radars):
+                        consumer(ids[radar], output[slot])
+            finally:
+                executor.shutdown()
+        finally:
+            for shm, _ in shared.values():
+                shm.close()
+                shm.unlink()
+
+        return results
+
+    def __run_tasks(self, executor, tasks, init_args):
+        """Run shards to completion, resubmitting failures; returns the (possibly rebuilt) executor"""
+        attempts = dict.fromkeys(range(len(tasks)), 0)
+        pending = list(attempts)
+        while pending:
+            futures = {executor.submit(_coverage_shard, tasks[ix]): ix for ix in pending}
+            pending = []
+            broken = False
+            for future in as_completed(futures):
+                ix = futures[future]
+                try:
+                    pid, points, seconds = future.result()
+                except Exception as err:
+                    broken = broken or isinstance(err, BrokenProcessPool)
+                    attempts[ix] += 1
+                    if attempts[ix] > self.retries:
+                        raise RuntimeError(f"Coverage shard {tasks[ix][:4]} failed {attempts[ix]} times") from err
+                    pending.append(ix)
+                    continue
+                stats = self.worker_stats.setdefault(pid, {"points": 0, "seconds": 0.0})
+                stats["points"] += points
+                stats["seconds"] += seconds
+            if broken:
+                executor.shutdown()
+                executor = ProcessPoolExecutor(
+                    self.workers, initializer=_attach_shared_buffers, initargs=(init_args,)
+                )
+
+        return executor
+
+    @property
+    def throughput(self) -> dict:
+        """Points per second converted by each worker process in the last run"""
+        return {
+            pid: stats["points"] / stats["seconds"] if stats["seconds"] else 0.0
+            for pid, stats in self.worker_stats.items()
+        }
+
+
+def radio_horizon_nmi(antenna_height_ft, target_alt_ft, k_factor=4.0 / 3.0, earth_radius_nmi=6371 * 1000 / 1852):
+    """
+    Smooth-earth radio horizon between an antenna and a target, both heights above the earth surface
+    d = sqrt(2 k R h_antenna) + sqrt(2 k R h_target), evaluated with numpy broadcasting
+    """
+    effective_radius_ft = k_factor * earth_radius_nmi * constants.NM_TO_METERS * constants.METERS_TO_FEET
+    antenna = np.sqrt(2 * effective_radius_ft * np.maximum(np.asarray(antenna_height_ft, dtype=float), 0.0))
+    target = np.sqrt(2 * effective_radius_ft * np.maximum(np.asarray(target_alt_ft, dtype=float), 0.0))
+    return (antenna + target) * constants.FEET_TO_METERS / constants.NM_TO_METERS
+
+
+class HorizonCoverage(object):
+    """
+    Smooth-earth (4/3 effective radius) coverage for many radars at several target altitudes
+    Parameters
+    __________
+    observers: np.ndarray
+        nx2 [lat, lon] (extra columns are ignored) of each radar
+    antenna_height_ft: float or array-like
+        Antenna height above the surface, scalar or one per radar
+    altitudes_ft: array-like
+        Target altitudes above the surface
+    num_azimuths: int
+        Azimuth resolution of the coverage (equal steps from true north)
+    max_range_nmi: float or array-like
+        Instrumented range limit, scalar or one per radar (None for no limit)
+    azimuth_limits_nmi: np.ndarray
+        Optional (radars, num_azimuths) per-azimuth range limits, e.g. from a terrain viewshed
+    k_factor: float
+        Effective earth radius factor
+
+    range_nmi holds the (radars, altitudes, azimuths) maximum detection range.
+    """
+
+    def __init__(self, observers, antenna_height_ft=50.0, altitudes_ft=(1500.0,), num_azimuths=360,
+                 max_range_nmi=None, azimuth_limits_nmi=None, k_factor=4.0 / 3.0, ids=None, geo=None):
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        observers = np.asarray(observers, dtype=float)
+        self.lat_lon = observers.reshape(-1, observers.shape[-1])[:, :2]
+        num_radars = self.lat_lon.shape[0]
+        self.ids = list(range(num_radars)) if ids is None else list(ids)
+        self.altitudes_ft = np.atleast_1d(np.asarray(altitudes_ft, dtype=float))
+        self.azimuths = np.arange(num_azimuths) * (360.0 / num_azimuths)
+
+        antenna = np.broadcast_to(np.asarray(antenna_height_ft, dtype=float), (num_radars,))
+        self.horizon_nmi = radio_horizon_nmi(
+            antenna[:, None], self.altitudes_ft[None, :], k_factor, self._geo.earth_radius_nmi
+        )
+        range_nmi = np.repeat(self.horizon_nmi[:, :, None], num_azimuths, axis=2)
+        if max_range_nmi is not None:
+            limit = np.broadcast_to(np.asarray(max_range_nmi, dtype=float), (num_radars,))
+            range_nmi = np.minimum(range_nmi, limit[:, None, None])
+        if azimuth_limits_nmi is not None:
+            limits = np.asarray(azimuth_limits_nmi, dtype=float).reshape(num_radars, 1, num_azimuths)
+            range_nmi = np.minimum(range_nmi, limits)
+        self.range_nmi = range_nmi
+
+    @classmethod
+    def from_radars(cls, radars, lat_col="Radar_Lat", lon_col="Radar_Lon", id_col="Radar_ID", **kwargs):
+        """Build from a Terminal.radars / EnRoute.radars frame"""
+        radars = radars.dropna(subset=[lat_col, lon_col])
+        return cls(radars[[lat_col, lon_col]].to_numpy(dtype=float), ids=radars[id_col].to_list(), **kwargs)
+
+    def polygons(self) -> tuple:
+        """
+        Closed coverage rings for every radar and altitude in one batched geodesic call
+        Returns
+        _______
+        (lats, lons): np.ndarray of shape (radars, altitudes, azimuths + 1)
+        """
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.lat_lon[:, 0, None, None],
+            self.lat_lon[:, 1, None, None],
+            self.range_nmi,
+            self.azimuths[None, None, :],
+        )
+        return np.concatenate((lats, lats[:, :, :1]), axis=2), np.concatenate((lons, lons[:, :, :1]), axis=2)
+
+    def polygon(self, radar_id, altitude_ft) -> list:
+        """Coverage ring of one radar/altitude as [(lat, lon), ...] for KmlCreator.add_polygon"""
+        radar = self.ids.index(radar_id)
+        altitude = int(np.nonzero(self.altitudes_ft == altitude_ft)[0][0])
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.lat_lon[radar, 0], self.lat_lon[radar, 1], self.range_nmi[radar, altitude], self.azimuths
+        )
+        return list(zip(np.append(lats, lats[0]).tolist(), np.append(lons, lons[0]).tolist()))
+
+    def grid_mask(self, lat_lon, chunk_size=1024) -> np.ndarray:
+        """
+        Which points are covered by at least one radar at each altitude
+        Parameters
+        __________
+        lat_lon: np.ndarray
+            nx2 [lat, lon] points, e.g. a flattened coverage grid
+        Returns
+        _______
+        np.ndarray of bool with shape (altitudes, n)
+        """
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        num_azimuths = self.azimuths.size
+        step = 360.0 / num_azimuths
+        mask = np.zeros((self.altitudes_ft.size, lat_lon.shape[0]), dtype=bool)
+        radar_lat = np.radians(self.lat_lon[:, 0])[None, :]
+        radar_lon = np.radians(self.lat_lon[:, 1])[None, :]
+        radars = np.arange(self.lat_lon.shape[0])[None, :]
+        # Skip the bearing lookup when every azimuth of a radar/altitude has the same range
+        azimuth_dependent = not (self.range_nmi == self.range_nmi[:, :, :1]).all()
+        for start, distance in self._geo.iter_pairwise_distance(lat_lon, self.lat_lon, chunk_size=chunk_size):
+            stop = start + distance.shape[0]
+            if not azimuth_dependent:
+                for altitude in range(self.altitudes_ft.size):
+                    mask[altitude, start:stop] = (distance <= self.range_nmi[None, :, altitude, 0]).any(axis=1)
+                continue
+            points = np.radians(lat_lon[start:stop])
+            bearing = _initial_bearing_deg(radar_lat, radar_lon, points[:, 0, None], points[:, 1, None])
+            az_index = np.rint(bearing / step).astype(int) % num_azimuths
+            for altitude in range(self.altitudes_ft.size):
+                # (points, radars) range toward each point
+                reach = self.range_nmi[radars, altitude, az_index]
+                mask[altitude, start:stop] = (distance <= reach).any(axis=1)
+
+        return mask
+
+
+def _initial_bearing_deg(lat0, lon0, lat1, lon1):
+    """Spherical initial bearing in [0, 360) degrees from point 0 to point 1 (radian inputs)"""
+    dlon = lon1 - lon0
+    y = np.sin(dlon) * np.cos(lat1)
+    x = np.cos(lat0) * np.sin(lat1) - np.sin(lat0) * np.cos(lat1) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
@@ -1,67 +1,1155 @@
 # 3rd party imports
 import os
+import re
+import abc
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import zipfile
+import weakref
+import warnings
+import posixpath
 import collections
+import collections.abc
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
+from scipy.spatial import cKDTree
+from shapely.geometry import Point, Polygon
+from shapely.prepared import prep
+try:
+    from xlrd import XLRDError
+except ImportError:
+    XLRDError = ValueError
+try:
+    from shapely import contains_xy
+except ImportError:
+    # shapely < 2
+    from shapely.vectorized import contains as contains_xy
 
 # Lib imports
-from constants import RADARS, RADIOS, RADARS_WITH_CLASS, SV_LIST
-import GeoTools
+from Libs.constants import RADARS, RADIOS, RADARS_WITH_CLASS, SV_LIST, NM_TO_METERS, WORKBOOK_CACHE
+from Libs.constants import RADAR_SHAPES, RADAR_COLORS, RADIO_COLORS, RADIO_SHAPES, ERAM_SITES
+from Libs import GeoTools
 
 
-class SurveillanceSystem(object):
-    """Main parent class to carry all data for NAS Surveillance Systems"""
+class WorkbookCache(object):
+    """
+    On-disk columnar cache of parsed Excel sheets
+    Parameters
+    __________
+    cache_dir: str
+        Directory holding one entry per (workbook, sheet, header); None disables caching
+
+    Each entry stores numeric columns as .npy files and the remaining (object) columns as one
+    pickle per column, alongside the workbook size, mtime and SHA-1. An entry whose workbook size or mtime
+    has changed is re-hashed; if the content differs it is re-parsed and rewritten. Columns are read into
+    memory rather than memory-mapped: building the DataFrame copies them, and callers modify the frames they get.
+    """
+
+    def __init__(self, cache_dir=WORKBOOK_CACHE):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(path) -> dict:
+        stat = os.stat(path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    @staticmethod
+    def content_hash(path) -> str:
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    # SpreadsheetML namespaces used by sheet_fingerprints
+    XLSX_NS = {
+        "main": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+        "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    }
+    # (absolute path, sheet part) -> ((CRC, size) of the part, (shared string indices, style indices) its cells use)
+    _sheet_references = {}
+    # Value of a shared-string cell (t="s"), and any style index attribute, in a sheet part's XML
+    _SHARED_STRING_CELL = re.compile(rb' t="s"[^>]*>\s*<(?:\w+:)?v>(\d+)<')
+    _STYLE_ATTRIBUTE = re.compile(rb' s="(\d+)"')
+
+    @classmethod
+    def sheet_fingerprints(cls, path) -> dict:
+        """
+        Per-sheet fingerprint of an .xlsx workbook without parsing it into frames
+        Returns
+        _______
+        dict of sheet name (and position) -> CRC-32 and size of the sheet's XML part, plus digests of the
+        shared strings and number formats its cells refer to; empty for workbooks that are not zip packages (e.g. .xls)
+
+        Text cells index into the workbook-wide shared string table and every cell into the style sheet, whose
+        number formats decide whether a value parses as a date. Only the entries a sheet refers to count towards
+        its fingerprint, so editing the text of one sheet leaves the others unchanged. An edit that renumbers
+        strings another sheet uses rewrites that sheet's XML part, so it still shows up as a change there.
+        """
+        if not zipfile.is_zipfile(path):
+            return {}
+        ns = cls.XLSX_NS
+        rel_id = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+        with zipfile.ZipFile(path) as package:
+            parts = {info.filename: (info.CRC, info.file_size) for info in package.infolist()}
+            sheets = ElementTree.fromstring(package.read("xl/workbook.xml")).findall("main:sheets/main:sheet", ns)
+            rels = ElementTree.fromstring(package.read("xl/_rels/workbook.xml.rels")).findall("rel:Relationship", ns)
+            targets = {rel.get("Id"): cls.__part_name(rel.get("Target")) for rel in rels}
+            by_type = {(rel.get("Type") or "").rsplit("/", 1)[-1]: cls.__part_name(rel.get("Target")) for rel in rels}
+            strings = cls.__shared_strings(package, by_type.get("sharedStrings", "xl/sharedStrings.xml"), parts)
+            formats = cls.__cell_formats(package, by_type.get("styles", "xl/styles.xml"), parts)
+
+            fingerprints = {}
+            for position, sheet in enumerate(sheets):
+                part = targets.get(sheet.get(rel_id), "")
+                fingerprint = (parts.get(part), None, None)
+                if part in parts:
+                    string_refs, style_refs = cls.__references(package, (os.path.abspath(path), part), parts[part])
+                    fingerprint = (
+                        parts[part],
+                        cls.__digest([strings[ix] if ix < len(strings) else None for ix in string_refs]),
+                        cls.__digest([formats[ix] if ix < len(formats) else None for ix in style_refs]),
+                    )
+                fingerprints[sheet.get("name")] = fingerprints[position] = fingerprint
+        return fingerprints
+
+    @staticmethod
+    def __part_name(target) -> str:
+        """Package part name of a workbook relationship target"""
+        target = target or ""
+        return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+    @classmethod
+    def __shared_strings(cls, package, part, parts) -> list:
+        """Text of every shared string table entry (plain or rich text runs)"""
+        if part not in parts:
+            return []
+        ns = cls.XLSX_NS
+        table = ElementTree.fromstring(package.read(part))
+        return [
+            "".join(t.text or "" for t in si.findall("main:t", ns) + si.findall("main:r/main:t", ns))
+            for si in table.findall("main:si", ns)
+        ]
+
+    @classmethod
+    def __cell_formats(cls, package, part, parts) -> list:
+        """(numFmtId, custom format code) of every cell style; the number format is all that changes a parsed value"""
+        if part not in parts:
+            return []
+        ns = cls.XLSX_NS
+        styles = ElementTree.fromstring(package.read(part))
+        codes = {fmt.get("numFmtId"): fmt.get("formatCode") for fmt in styles.findall("main:numFmts/main:numFmt", ns)}
+        return [
+            (xf.get("numFmtId", "0"), codes.get(xf.get("numFmtId", "0")))
+            for xf in styles.findall("main:cellXfs/main:xf", ns)
+        ]
+
+    @classmethod
+    def __references(cls, package, key, crc_size) -> tuple:
+        """(shared string indices, style indices) used by one sheet part's cells, rescanned when the part changes"""
+        cached = cls._sheet_references.get(key)
+        if cached is not None and cached[0] == crc_size:
+            return cached[1]
+
+        with package.open(key[1]) as f:
+            data = f.read()
+        # Scanning the raw XML is several times faster than building elements for every cell. Cells without
+        # a style attribute use style 0; row styles only apply to empty cells, but counting them is harmless
+        strings = {int(ix) for ix in set(cls._SHARED_STRING_CELL.findall(data))}
+        styles = {0} | {int(ix) for ix in set(cls._STYLE_ATTRIBUTE.findall(data))}
+        references = (sorted(strings), sorted(styles))
+        cls._sheet_references[key] = (crc_size, references)
+        return references
+
+    @staticmethod
+    def __digest(values) -> str:
+        return hashlib.sha1(repr(values).encode()).hexdigest()
+
+    def revalidate(self, path, sheet_names, header=0) -> None:
+        """Mark entries for sheets known to be unchanged as current for the workbook's present contents"""
+        if self.cache_dir is None:
+            return
+        fingerprint = dict(self.fingerprint(path), sha1=self.content_hash(path))
+        for sheet_name in sheet_names:
+            entry = self.entry_dir(path, sheet_name, header)
+            meta = self.__load_meta(entry)
+            if meta is not None and meta["sha1"] != fingerprint["sha1"]:
+                meta.update(fingerprint)
+                self.__write_meta(entry, meta)
+
+    def is_current(self, path, sheet_name=0, header=0) -> bool:
+        """Whether an entry exists whose stored size and mtime match the workbook (no content hashing)"""
+        if self.cache_dir is None:
+            return False
+        meta = self.__load_meta(self.entry_dir(path, sheet_name, header))
+        return meta is not None and all(meta[key] == value for key, value in self.fingerprint(path).items())
+
+    def entry_dir(self, path, sheet_name=0, header=0) -> str:
+        key = repr((os.path.abspath(path), sheet_name, header)).encode()
+        return os.path.join(self.cache_dir, hashlib.sha1(key).hexdigest())
+
+    def read_excel(self, path, sheet_name=0, header=0, usecols=None) -> pd.DataFrame:
+        """
+        pd.read_excel(path, sheet_name=sheet_name, header=header), served from the cache when it is current;
+        usecols is a list of column names, and only those columns are loaded from a current entry
+        """
+        return self.read_excel_sheets(path, [sheet_name], header=header, usecols=usecols)[sheet_name]
+
+    def read_excel_sheets(self, path, sheet_names, header=0, usecols=None) -> dict:
+        """
+        Several sheets of one workbook as {sheet_name: DataFrame}; every sheet missing from the cache
+        is parsed in a single pd.read_excel(sheet_name=[...]) pass
+        """
+        sheet_names = list(dict.fromkeys(sheet_names))
+        if self.cache_dir is None:
+            frames = pd.read_excel(path, sheet_name=sheet_names, header=header)
+            return {name: self.__project(df, usecols) for name, df in frames.items()}
+
+        frames = {}
+        fingerprint = self.fingerprint(path)
+        sha1 = None
+        for sheet_name in sheet_names:
+            entry = self.entry_dir(path, sheet_name, header)
+            meta = self.__load_meta(entry)
+            if meta is None:
+                continue
+            current = all(meta[key] == value for key, value in fingerprint.items())
+            if not current:
+                sha1 = sha1 or self.content_hash(path)
+                if meta["sha1"] == sha1:
+                    # Touched or copied but unchanged: refresh the stored fingerprint and reuse the columns
+                    meta.update(fingerprint)
+                    self.__write_meta(entry, meta)
+                    current = True
+            if current:
+                positions = self.__column_positions(meta["columns"], usecols)
+                try:
+                    frames[sheet_name] = self.__load_columns(entry, meta, positions)
+                    self.hits += 1
+                except (OSError, ValueError, pickle.UnpicklingError, EOFError) as err:
+                    warnings.warn(f"Discarding unreadable workbook cache entry {entry}: {err}")
+
+        missing = [sheet_name for sheet_name in sheet_names if sheet_name not in frames]
+        if missing:
+            self.misses += len(missing)
+            parsed = pd.read_excel(path, sheet_name=missing, header=header)
+            fingerprint.update(sha1=sha1 or self.content_hash(path), path=os.path.abspath(path))
+            for sheet_name, df in parsed.items():
+                entry = self.entry_dir(path, sheet_name, header)
+                try:
+                    self.__store(entry, df, fingerprint)
+                except OSError as err:
+                    warnings.warn(f"Unable to write workbook cache entry {entry}: {err}")
+                frames[sheet_name] = self.__project(df, usecols)
+
+        return {sheet_name: frames[sheet_name] for sheet_name in sheet_names}
+
+    def invalidate(self, path=None) -> None:
+        """Drop every entry, or only the entries parsed from path"""
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        source = os.path.abspath(path) if path is not None else None
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            meta = self.__load_meta(entry)
+            if source is None or (meta is not None and meta["path"] == source):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @property
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def __load_meta(entry):
+        try:
+            with open(os.path.join(entry, "meta.pkl"), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    @staticmethod
+    def __write_meta(entry, meta):
+        tmp_path = os.path.join(entry, "meta.pkl.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(entry, "meta.pkl"))
+
+    @staticmethod
+    def __column_positions(columns, usecols) -> list:
+        if usecols is None:
+            return list(range(len(columns)))
+        missing = [column for column in usecols if column not in columns]
+        if missing:
+            raise ValueError(f"Usecols do not match columns, columns expected but not found: {missing}")
+        return [columns.index(column) for column in usecols]
+
+    @classmethod
+    def __project(cls, df, usecols) -> pd.DataFrame:
+        if usecols is None:
+            return df
+        cls.__column_positions(list(df.columns), usecols)
+        return df[list(usecols)]
+
+    def __load_columns(self, entry, meta, positions) -> pd.DataFrame:
+        numeric = set(meta["numeric"])
+        columns = {}
+        for position in positions:
+            if position in numeric:
+                columns[position] = np.load(os.path.join(entry, f"{position}.npy"))
+            else:
+                with open(os.path.join(entry, f"{position}.pkl"), "rb") as f:
+                    columns[position] = pickle.load(f)
+        df = pd.DataFrame(columns, columns=positions)
+        df.columns = [meta["columns"][position] for position in positions]
+        return df
+
+    def __store(self, entry, df, fingerprint):
+        tmp_entry = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(tmp_entry, exist_ok=True)
+        numeric = []
+        for position, (_, column) in enumerate(df.items()):
+            values = column.to_numpy()
+            if values.dtype.kind in "biufcmM":
+                np.save(os.path.join(tmp_entry, f"{position}.npy"), values)
+                numeric.append(position)
+            else:
+                with open(os.path.join(tmp_entry, f"{position}.pkl"), "wb") as f:
+                    pickle.dump(values, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        meta = dict(fingerprint, columns=list(df.columns), numeric=numeric)
+        self.__write_meta(tmp_entry, meta)
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+
+# Shared by every SurveillanceSystem / SurveillanceSource that is not given its own cache
+_workbook_cache = WorkbookCache()
+
+# What pd.read_excel raises for a sheet the workbook does not have (openpyxl: ValueError, xlrd: XLRDError)
+_MISSING_SHEET_ERRORS = (ValueError, XLRDError)
+
+
+class WorkbookSession(object):
+    """
+    Parsed workbook sheets shared between SurveillanceSystems
+    Parameters
+    __________
+    sheets: dict
+        {(path, header): [batch, ...]} where each batch is a list of sheet names parsed together the first
+        time any of them is asked for (a flat list of names is one batch); defaults to one batch per table
+        Terminal and EnRoute read, so loading radars never parses an airspace sheet
+    workbook_cache: WorkbookCache
+        On-disk cache underneath the session (the shared module cache by default; WorkbookCache(None) disables it)
+
+    Build one session in a script and pass it to each Terminal / EnRoute so every workbook is
+    parsed at most once. Callers get a copy of each sheet, so they can modify it freely.
+    """
+
+    def __init__(self, sheets=None, workbook_cache=None):
+        if sheets is None:
+            sheets = {
+                (RADARS, 0): [
+                    ["Terminal Radars", "En Route Radars"],
+                    ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"],
+                    ["EnRoute"],
+                ],
+                (RADIOS, 6): [[0]],
+            }
+        self._batches = {}
+        for (path, header), batches in sheets.items():
+            if not all(isinstance(batch, (list, tuple)) for batch in batches):
+                batches = [batches]
+            for batch in batches:
+                self.require(path, batch, header)
+        self.parses = 0
+        self._workbook_cache = workbook_cache if workbook_cache is not None else _workbook_cache
+        self._frames = {}
+        # Per parsed sheet: the sheet fingerprint it was read at and how many times refresh replaced it
+        self._fingerprints = {}
+        self._versions = {}
+        self._stats = {}
+        # Sheets refresh found missing from their workbook (renamed or deleted)
+        self._removed = set()
+
+    @property
+    def workbook_cache(self) -> WorkbookCache:
+        return self._workbook_cache
+
+    @property
+    def sheets(self) -> dict:
+        """{(path, header): [sheet names]} registered, across every batch"""
+        return {key: [name for batch in batches for name in batch] for key, batches in self._batches.items()}
+
+    def require(self, path, sheet_names, header=0) -> None:
+        """Register sheets to parse together for (path, header); sheets already registered keep their batch"""
+        batches = self._batches.setdefault((path, header), [])
+        registered = {name for batch in batches for name in batch}
+        batch = [name for name in dict.fromkeys(sheet_names) if name not in registered]
+        if batch:
+            batches.append(batch)
+
+    def batch(self, path, sheet_name=0, header=0) -> list:
+        """The sheets parsed together with sheet_name (registering it on its own if it is new)"""
+        self.require(path, [sheet_name], header)
+        return next(batch for batch in self._batches[(path, header)] if sheet_name in batch)
+
+    def read_excel(self, path, sheet_name=0, header=0, usecols=None) -> pd.DataFrame:
+        """One sheet (optionally only the usecols columns), parsing the rest of its batch on first use"""
+        if (path, sheet_name, header) not in self._frames:
+            batch = self.batch(path, sheet_name, header)
+            pending = [name for name in batch if (path, name, header) not in self._frames]
+            snapshot = self.__snapshot(path)
+            if snapshot[1]:
+                # Skip registered sheets this workbook does not have; a missing sheet_name still raises below
+                pending = [name for name in pending if name in snapshot[1] or name == sheet_name]
+            try:
+                frames = self._workbook_cache.read_excel_sheets(path, pending, header=header)
+            except _MISSING_SHEET_ERRORS:
+                # A registered sheet is missing from a workbook that could not be listed; read only the one asked for
+                frames = self._workbook_cache.read_excel_sheets(path, [sheet_name], header=header)
+            self.parses += 1
+            self.__store(path, frames, header, snapshot)
+
+        df = self._frames[(path, sheet_name, header)]
+        return (df[list(usecols)] if usecols is not None else df).copy()
+
+    def preload(self, path, frames: dict, header=0) -> None:
+        """Hand the session sheets that were parsed elsewhere, e.g. by preload_workbooks"""
+        self.require(path, list(frames), header)
+        self.__store(path, frames, header, self.__snapshot(path))
+
+    def pending(self) -> dict:
+        """{(path, header): [sheet names]} registered but not yet parsed, leaving out sheets the workbook lacks"""
+        pending = {}
+        for (path, header), names in self.sheets.items():
+            names = [name for name in names if (path, name, header) not in self._frames]
+            available = self.__snapshot(path)[1] if names else {}
+            if available:
+                names = [name for name in names if name in available]
+            if names:
+                pending[(path, header)] = names
+        return pending
+
+    def clear(self) -> None:
+        self._frames.clear()
+        self._fingerprints.clear()
+        self._stats.clear()
+        self._removed.clear()
+
+    def version(self, path, sheet_name=0, header=0) -> int:
+        """How many times refresh has replaced a sheet with changed contents"""
+        return self._versions.get((path, sheet_name, header), 0)
+
+    def versions(self) -> dict:
+        return dict(self._versions)
+
+    def removed(self) -> set:
+        """(path, sheet_name, header) of the parsed sheets refresh found renamed or deleted"""
+        return set(self._removed)
+
+    def refresh(self, path=None) -> list:
+        """
+        Re-read the parsed sheets whose workbook sheet changed on disk
+        Parameters
+        __________
+        path: str
+            Only check this workbook (defaults to every workbook parsed so far)
+        Returns
+        _______
+        list of (path, sheet_name, header) whose contents changed or that were removed; their version is bumped
+
+        A workbook whose size and mtime are unchanged is skipped. Otherwise only the sheets whose
+        fingerprint (see WorkbookCache.sheet_fingerprints) changed are parsed again, and a sheet only
+        counts as changed if the re-parsed frame differs from the one held. A sheet the workbook no longer
+        has is dropped from the session and listed by removed() instead of failing the refresh.
+        """
+        loaded = collections.defaultdict(list)
+        for key in self._frames:
+            if path is None or key[0] == path:
+                loaded[(key[0], key[2])].append(key[1])
+
+        changed = []
+        for (workbook, header), names in loaded.items():
+            snapshot = self.__snapshot(workbook)
+            if self._stats.get(workbook) == snapshot[0]:
+                continue
+            fingerprints = snapshot[1]
+            stale = [
+                name for name in names
+                if not fingerprints or fingerprints.get(name) != self._fingerprints.get((workbook, name, header))
+            ]
+            fresh = [name for name in names if name not in stale]
+            frames, missing = {}, []
+            if stale:
+                frames, missing = self.__read_present(workbook, stale, header, fingerprints)
+                self.parses += 1
+            for name in missing:
+                key = (workbook, name, header)
+                del self._frames[key]
+                self._fingerprints.pop(key, None)
+                self._removed.add(key)
+                self._versions[key] = self._versions.get(key, 0) + 1
+                changed.append(key)
+            for name, df in frames.items():
+                key = (workbook, name, header)
+                if self._frame_digest(df) != self._frame_digest(self._frames[key]):
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                    changed.append(key)
+                else:
+                    fresh.append(name)
+            self._stats[workbook] = snapshot[0]
+            self.__store(workbook, frames, header, snapshot)
+            if fresh:
+                # Keep the on-disk entries of untouched sheets current instead of re-parsing them next run
+                self._workbook_cache.revalidate(workbook, fresh, header)
+            for name in fresh:
+                self._fingerprints[(workbook, name, header)] = fingerprints.get(name)
+
+        return changed
+
+    def __read_present(self, path, sheet_names, header, fingerprints) -> tuple:
+        """(frames, missing): the sheets the workbook still has, and the names of the ones it does not"""
+        if fingerprints:
+            missing = [name for name in sheet_names if name not in fingerprints]
+            sheet_names = [name for name in sheet_names if name in fingerprints]
+        else:
+            missing = []
+        try:
+            return self._workbook_cache.read_excel_sheets(path, sheet_names, header=header), missing
+        except _MISSING_SHEET_ERRORS:
+            # Sheets of a workbook that could not be listed: find the missing ones one by one
+            frames = {}
+            for name in sheet_names:
+                try:
+                    frames.update(self._workbook_cache.read_excel_sheets(path, [name], header=header))
+                except _MISSING_SHEET_ERRORS:
+                    missing.append(name)
+            return frames, missing
+
+    @staticmethod
+    def _frame_digest(df: pd.DataFrame) -> str:
+        """SHA-1 over a frame's column names and cell values"""
+        sha = hashlib.sha1(repr(list(df.columns)).encode())
+        sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return sha.hexdigest()
+
+    def __snapshot(self, path) -> tuple:
+        """(size / mtime, sheet fingerprints) of a workbook, taken before it is read"""
+        if not os.path.exists(path):
+            return None, {}
+        return self._workbook_cache.fingerprint(path), self._workbook_cache.sheet_fingerprints(path)
+
+    def __store(self, path, frames: dict, header, snapshot: tuple):
+        stat, fingerprints = snapshot
+        self._stats.setdefault(path, stat)
+        for name, df in frames.items():
+            self._frames[(path, name, header)] = df
+            self._fingerprints[(path, name, header)] = fingerprints.get(name)
+            self._removed.discard((path, name, header))
+
+
+def _parse_workbook(task):
+    """Worker: read some sheets of one workbook through a WorkbookCache and time it"""
+    path, sheet_names, header, cache_dir = task
+    start = time.perf_counter()
+    frames = WorkbookCache(cache_dir).read_excel_sheets(path, sheet_names, header=header)
+    return frames, time.perf_counter() - start
+
+
+def preload_workbooks(session, max_workers=None, split_sheets=False, verbose=False) -> dict:
+    """
+    Parse every sheet still pending in a WorkbookSession, one worker process per workbook
+    Parameters
+    __________
+    session: WorkbookSession
+    max_workers: int
+        Process pool size (defaults to one per task, capped at the CPU count)
+    split_sheets: bool
+        Parse each sheet in its own process instead of each workbook
+    Returns
+    _______
+    dict of seconds per workbook (or "workbook:sheet") and the overall "total"
+    """
+    start = time.perf_counter()
+    cache = session.workbook_cache
+    tasks, timings = [], {}
+    for (path, header), names in session.pending().items():
+        # Sheets already current in the on-disk cache load faster in-process than a worker can start
+        cached = [name for name in names if cache.is_current(path, name, header)]
+        if cached:
+            cached_start = time.perf_counter()
+            session.preload(path, cache.read_excel_sheets(path, cached, header=header), header)
+            timings[f"{path} (cached)"] = time.perf_counter() - cached_start
+        stale = [name for name in names if name not in cached]
+        groups = [[name] for name in stale] if split_sheets else ([stale] if stale else [])
+        tasks.extend((path, group, header, cache.cache_dir) for group in groups)
+
+    if len(tasks) == 1:
+        frames, seconds = _parse_workbook(tasks[0])
+        session.preload(tasks[0][0], frames, tasks[0][2])
+        timings[tasks[0][0]] = seconds
+    elif tasks:
+        workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = {executor.submit(_parse_workbook, task): task for task in tasks}
+            for future in as_completed(futures):
+                path, names, header = futures[future][:3]
+                frames, seconds = future.result()
+                session.preload(path, frames, header)
+                timings[f"{path}:{names[0]}" if split_sheets else path] = seconds
+    session.parses += len(tasks)
+    timings["total"] = time.perf_counter() - start
+
+    if verbose:
+        for name, seconds in timings.items():
+            print(f"{seconds:8.3f} s  {name}")
+    return timings
+
+
+class BoundsStore(collections.abc.Mapping):
+    """
+    Packed service-volume boundaries
+
+    Every ring's [lat, lon] vertices live in one contiguous (N, 2) float64 array (16 bytes per
+    vertex); ring r spans coords[offsets[r]:offsets[r + 1]]. Rings are grouped by SV ID, so the
+    store maps each ID to a contiguous range of rings, and store[sv_id] is a list of zero-copy
+    (n, 2) views, one per ring, in the order they were appended.
+    """
+
+    def __init__(self, coords=None, offsets=None, ring_ids=None):
+        self.coords = np.empty((0, 2)) if coords is None else np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.offsets = np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+        self.ring_ids = [] if ring_ids is None else list(ring_ids)
+        self._pending = []
+        self.__index()
+
+    def append(self, sv_id, ring) -> None:
+        """Add one [lat, lon] ring to sv_id; rings are packed on the next read"""
+        self._pending.append((sv_id, np.asarray(ring, dtype=np.float64).reshape(-1, 2)))
+
+    def __pack(self):
+        if not self._pending:
+            return
+        rings = [(sv_id, self.coords[start:stop]) for sv_id, start, stop in
+                 zip(self.ring_ids, self.offsets[:-1], self.offsets[1:])] + self._pending
+        self._pending = []
+        # Group rings by ID in first-appearance order, keeping ring order within each ID
+        order = {}
+        for sv_id, _ in rings:
+            order.setdefault(sv_id, len(order))
+        rings.sort(key=lambda item: order[item[0]])
+
+        self.coords = np.concatenate([ring for _, ring in rings]) if rings else np.empty((0, 2))
+        self.offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+        np.cumsum([ring.shape[0] for _, ring in rings], out=self.offsets[1:])
+        self.ring_ids = [sv_id for sv_id, _ in rings]
+        self.__index()
+
+    def __index(self):
+        self._slices = {}
+        for ring, sv_id in enumerate(self.ring_ids):
+            start = self._slices[sv_id].start if sv_id in self._slices else ring
+            self._slices[sv_id] = slice(start, ring + 1)
+
+    def __getitem__(self, sv_id) -> list:
+        self.__pack()
+        rings = self._slices[sv_id]
+        return [self.coords[self.offsets[ring]:self.offsets[ring + 1]] for ring in range(rings.start, rings.stop)]
+
+    def __iter__(self):
+        self.__pack()
+        return iter(self._slices)
+
+    def __len__(self):
+        self.__pack()
+        return len(self._slices)
+
+    def ring_slice(self, sv_id) -> slice:
+        """Range of ring numbers (into offsets / ring_ids) belonging to sv_id"""
+        self.__pack()
+        return self._slices[sv_id]
+
+    def vertices(self, sv_id) -> np.ndarray:
+        """Zero-copy (n, 2) view of every vertex of sv_id, all of its rings back to back"""
+        rings = self.ring_slice(sv_id)
+        return self.coords[self.offsets[rings.start]:self.offsets[rings.stop]]
+
+    @property
+    def num_rings(self) -> int:
+        self.__pack()
+        return len(self.ring_ids)
+
+    @property
+    def nbytes(self) -> int:
+        self.__pack()
+        return self.coords.nbytes + self.offsets.nbytes
+
+    def copy(self):
+        """New store over the same packed arrays; appending to either store leaves the other unchanged"""
+        self.__pack()
+        return BoundsStore(self.coords, self.offsets, self.ring_ids)
+
+    def save(self, file_path) -> None:
+        """Write the store to one uncompressed .npz file"""
+        self.__pack()
+        ring_ids = [sv_id.item() if isinstance(sv_id, np.generic) else sv_id for sv_id in self.ring_ids]
+        with open(file_path, "wb") as f:
+            np.savez(f, coords=self.coords, offsets=self.offsets, ring_ids=np.array(json.dumps(ring_ids)))
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as data:
+            return cls(data["coords"], data["offsets"], json.loads(str(data["ring_ids"])))
+
+
+class ArtccBoundaries(object):
+    """
+    ARTCC boundaries from the "EnRoute" sheet, built column-wise once per workbook version
+
+    Holds the packed BoundsStore (one ring per ARTCC), a shapely polygon per ARTCC, the
+    ARTCC -> SV ID map and a bounding-box table used to reject ARTCCs before any polygon test.
+    for_workbook memoizes the latest build per workbook path, keyed on its size and mtime, so every
+    EnRoute reading the same file shares one instance. The store's arrays are read-only; each EnRoute
+    gets its own BoundsStore.copy() over them.
+    """
+
+    # Absolute path -> (size, mtime_ns, ArtccBoundaries) of the latest build
+    _built = {}
+
+    def __init__(self, artcc_sites: pd.DataFrame):
+        # Only the first row of each ARTCC carries its ID; the rows below it continue the ring
+        artcc_ids = artcc_sites["ARTCC_ID"].ffill()
+        valid = artcc_ids.notna().to_numpy()
+        codes, self.ids = pd.factorize(artcc_ids[valid], sort=False)
+        self.ids = list(self.ids)
+        lat_lon = artcc_sites[["SV_Lat", "SV_Lon"]].to_numpy(dtype=float)[valid]
+        # Stable sort keeps each ARTCC's vertices in sheet order, even if its rows are split up
+        order = np.argsort(codes, kind="stable")
+        offsets = np.zeros(len(self.ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.ids)), out=offsets[1:])
+        self.store = BoundsStore(lat_lon[order], offsets, self.ids)
+        # Shared between every EnRoute on this workbook, so the packed arrays must not change in place
+        self.store.coords.flags.writeable = False
+        self.store.offsets.flags.writeable = False
+
+        self.polygons = {}
+        for artcc in self.ids:
+            polygon = Polygon(self.store.vertices(artcc)[:, ::-1])
+            self.polygons[artcc] = polygon if polygon.is_valid else polygon.buffer(0)
+        self._prepared = {artcc: prep(polygon) for artcc, polygon in self.polygons.items()}
+
+        starts = offsets[:-1]
+        self.bounding_boxes = pd.DataFrame(
+            {
+                # fmin / fmax skip NaN vertices instead of letting one spread over the whole box
+                "min_lat": np.fmin.reduceat(self.store.coords[:, 0], starts),
+                "min_lon": np.fmin.reduceat(self.store.coords[:, 1], starts),
+                "max_lat": np.fmax.reduceat(self.store.coords[:, 0], starts),
+                "max_lon": np.fmax.reduceat(self.store.coords[:, 1], starts),
+            },
+            index=pd.Index(self.ids, name="ARTCC_ID"),
+        ) if self.ids else pd.DataFrame(columns=["min_lat", "min_lon", "max_lat", "max_lon"])
+
+        # Map of ARTCC ID --> Service Volume ID
+        sv_ids = artcc_sites[["ARTCC_ID", "SV ID"]].dropna()
+        self.sv_map = dict(zip(sv_ids["ARTCC_ID"], sv_ids["SV ID"]))
+
+    @classmethod
+    def for_workbook(cls, path, workbooks):
+        """Shared build for the EnRoute sheet of path, rebuilt only when the workbook changes"""
+        stat = os.stat(path)
+        source = os.path.abspath(path)
+        built = cls._built.get(source)
+        if built is None or built[:2] != (stat.st_size, stat.st_mtime_ns):
+            artcc_sites = workbooks.read_excel(
+                path, sheet_name="EnRoute", usecols=["ARTCC_ID", "SV ID", "SV_Lat", "SV_Lon"]
+            )
+            # Replaces any stale build of this workbook
+            built = cls._built[source] = (stat.st_size, stat.st_mtime_ns, cls(artcc_sites))
+        return built[2]
+
+    def candidates(self, lat_lon) -> np.ndarray:
+        """(points, ARTCCs) mask of the ARTCC bounding boxes containing each [lat, lon] point"""
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        boxes = self.bounding_boxes.to_numpy(dtype=float)
+        lat, lon = lat_lon[:, :1], lat_lon[:, 1:]
+        return (lat >= boxes[:, 0]) & (lat <= boxes[:, 2]) & (lon >= boxes[:, 1]) & (lon <= boxes[:, 3])
+
+    def intersecting(self, min_lat, min_lon, max_lat, max_lon) -> list:
+        """ARTCCs whose bounding box overlaps the given region"""
+        boxes = self.bounding_boxes
+        overlap = (
+            (boxes["min_lat"] <= max_lat) & (boxes["max_lat"] >= min_lat)
+            & (boxes["min_lon"] <= max_lon) & (boxes["max_lon"] >= min_lon)
+        )
+        return boxes.index[overlap.to_numpy()].tolist()
+
+    def locate(self, lat_lon) -> np.ndarray:
+        """The first enclosing ARTCC for each [lat, lon] point, None where no boundary encloses it"""
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        located = np.full(lat_lon.shape[0], None, dtype=object)
+        unresolved = np.ones(lat_lon.shape[0], dtype=bool)
+        hits = self.candidates(lat_lon)
+        for column, artcc in enumerate(self.ids):
+            for row in np.flatnonzero(hits[:, column] & unresolved):
+                if self._prepared[artcc].contains(Point(lat_lon[row, 1], lat_lon[row, 0])):
+                    located[row] = artcc
+                    unresolved[row] = False
+
+        return located
+
+
+class SensorDiff(object):
+    """
+    Row-level differences between two loads of a sensor table
+    Parameters
+    __________
+    previous: pd.DataFrame
+        Table before the reload
+    current: pd.DataFrame
+        Table after the reload
+    key: str
+        Column identifying a sensor (Radar_ID / RSID); repeated keys are matched in order of appearance
+
+    added holds the current rows with no previous match, removed the previous rows with no current match,
+    and modified the current version of matched rows whose shared columns differ (before holds their
+    previous version, in the same order).
+    """
+
+    def __init__(self, previous: pd.DataFrame, current: pd.DataFrame, key: str):
+        self.key = key
+        self.current = current
+        previous_keys = self.__occurrences(previous, key)
+        current_keys = self.__occurrences(current, key)
+        matched = current_keys.isin(previous_keys)
+        self.added = current[~matched]
+        self.removed = previous[~previous_keys.isin(current_keys)]
+
+        columns = [column for column in current.columns if column in previous.columns]
+        before = previous.iloc[previous_keys.get_indexer(current_keys[matched])]
+        after = current[matched]
+        old_values = before[columns].astype(object).to_numpy()
+        new_values = after[columns].astype(object).to_numpy()
+        same = (old_values == new_values) | (pd.isna(old_values) & pd.isna(new_values))
+        differs = ~same.all(axis=1)
+        self.modified = after[differs]
+        self.before = before[differs]
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.modified)
+
+    @staticmethod
+    def __occurrences(df, key) -> pd.MultiIndex:
+        """(key, n) per row, where n counts earlier rows with the same key"""
+        keys = df[key].astype(object)
+        occurrence = keys.groupby(keys, sort=False, dropna=False).cumcount()
+        return pd.MultiIndex.from_arrays([keys.to_numpy(), occurrence.to_numpy()])
+
+    @property
+    def ids(self) -> set:
+        """Every key that was added, removed or modified"""
+        return set(self.added[self.key]) | set(self.removed[self.key]) | set(self.modified[self.key])
+
+    def summary(self) -> str:
+        return f"{self.key}: {len(self.added)} added, {len(self.removed)} removed, {len(self.modified)} modified"
+
+
+# What SurveillanceSystem.reload hands each subscriber; radars / radios are None when their sheet did not change
+ReloadDiff = collections.namedtuple("ReloadDiff", ["radars", "radios", "airspace", "sheets", "removed"])
+
+
+class SurveillanceSystem(abc.ABC):
+    """
+    Main parent class to carry all data for NAS Surveillance Systems
+
+    radars, radios, airspace_info and sv_bounds load on first access and are memoized; call
+    load_radars / load_radios directly to choose the columns (or radio filter) instead. reload picks up
+    workbook edits, re-deriving only what depends on the sheets that changed.
+
+    Parsed sheets are cached on disk under constants.WORKBOOK_CACHE unless told otherwise; pass
+    workbook_cache=WorkbookCache(cache_dir=None) (or a workbook_session built on one) to parse the
+    workbooks on every run and write nothing to disk.
+    """
+
+    RADAR_COLUMNS = []
+    RADAR_SHEET = None
+    AIRSPACE_SHEETS = []
+    RADIO_COLUMNS = [
+        "Operational Status",
+        "LID\n(GBT/[MRU])",
+        "Facility Location",
+        "RSID",
+        "Latitude\n(Degrees)",
+        "Longitude\n(Degrees)",
+        "Enclosed By SV.1",
+        "ADS-B/WAM Usage",
+        "Site Elevation (MSL)",
+        "Antenna Height (AGL)",
+        "1090ES Antenna",
+        "Radio Variant",
+    ]
+
+    # Low-cardinality columns held as Categoricals, seeded with the known values (others are appended)
+    CATEGORY_SEEDS = {
+        "PSR Type": list(RADAR_SHAPES),
+        "SSR Type": list(RADAR_COLORS),
+        "Radio Variant": list(RADIO_SHAPES),
+        "1090ES Antenna": list(RADIO_COLORS),
+        "Airspace_ID": list(dict.fromkeys(ERAM_SITES)),
+        "SDP1": [],
+        "Operational Status": [],
+        "ADS-B/WAM Usage": [],
+    }
+    # Positions stay float64 (float32 degrees only resolve ~1 m); these are downcast to float32
+    COORDINATE_COLUMNS = ["Radar_Lat", "Radar_Lon", "Latitude\n(Degrees)", "Longitude\n(Degrees)"]
+    COMPACT_COLUMNS = ["Site Elevation (MSL)", "Antenna Height (AGL)"]
 
     def __init__(
             self, sv_path=RADARS, radio_path=RADIOS, radar_path=RADARS,
-            radar_class_path=RADARS_WITH_CLASS
+            radar_class_path=RADARS_WITH_CLASS, geo=None, workbook_cache=None, workbook_session=None
     ):
-        # Public attributes
-        self.sv_bounds = collections.defaultdict(list)
-        self.airspace_info = collections.defaultdict(list)
-        self.radars = None
-        self.radios = None
+        # Public attributes (sv_bounds, airspace_info, radars and radios are lazy properties)
+        self._sv_bounds = BoundsStore()
+        self._airspace_info = collections.defaultdict(list)
+        self._radars = None
+        self._radios = None
+        self._radio_table = None
+        self._radio_site_index = None
+        # Arguments of the last load_radars / load_radios, repeated by reload
+        self._radar_columns = None
+        self._radio_load = (None, None)
+        self._subscribers = []
         # Radars
         self.psr_type = None
         self.ssr_type = None
         # Radios
         self.radio_variants = None
         self.radio_antennas = None
+        self.radios_by_site = {}
         # Private attributes
         self._sv_path = sv_path
         self._radio_path = radio_path
         self._radar_path = radar_path
         self._radar_class_path = radar_class_path
-        self._geo = GeoTools.Geo()
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        self._workbooks = (
+            workbook_session if workbook_session is not None else WorkbookSession(workbook_cache=workbook_cache)
+        )
+        self._sheet_versions = self._workbooks.versions()
+
+    @property
+    def radars(self) -> pd.DataFrame:
+        if self._radars is None:
+            self.load_radars()
+        return self._radars
+
+    @radars.setter
+    def radars(self, value):
+        self._radars = value
+
+    @property
+    def radios(self) -> pd.DataFrame:
+        if self._radios is None:
+            self.load_radios()
+        return self._radios
+
+    @radios.setter
+    def radios(self, value):
+        self._radios = value
+
+    @property
+    def airspace_info(self) -> collections.defaultdict:
+        self._load_airspace()
+        return self._airspace_info
+
+    @property
+    def sv_bounds(self) -> BoundsStore:
+        self._load_airspace()
+        return self._sv_bounds
+
+    def _load_airspace(self):
+        """Hook for subclasses whose airspace loads lazily"""
+        pass
+
+    def _reset_airspace(self) -> bool:
+        """Hook for subclasses to drop airspace derived from changed sheets; returns whether anything was dropped"""
+        return False
+
+    def subscribe(self, callback):
+        """Call callback(system, ReloadDiff) after every reload that found changed sheets; returns callback"""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        self._subscribers.remove(callback)
+
+    def reload(self) -> ReloadDiff:
+        """
+        Pick up edits to the workbooks, re-parsing only the sheets that changed
+        Returns
+        _______
+        ReloadDiff(radars, radios, airspace, sheets, removed): a SensorDiff for radars / radios when they were
+        loaded and their sheet changed (None otherwise), whether the airspace was reset to reload on next access,
+        the (path, sheet_name) pairs that changed and those that were renamed or deleted
+
+        Sheets changed by a reload through another system sharing the workbook session are picked up too.
+        Loaded tables are rebuilt with the arguments of the last load_radars / load_radios call; a table whose
+        sheet was removed keeps its last contents.
+        """
+        self._workbooks.refresh()
+        versions = self._workbooks.versions()
+        updated = {key for key, version in versions.items() if self._sheet_versions.get(key, 0) != version}
+        self._sheet_versions = versions
+        removed = updated & self._workbooks.removed()
+        changed = updated - removed
+
+        radars = None
+        if self._radars is not None and (self._radar_path, self.RADAR_SHEET, 0) in changed:
+            previous = self._radars
+            self.load_radars(self._radar_columns)
+            radars = SensorDiff(previous, self._radars, "Radar_ID")
+        radios = None
+        if (self._radio_path, 0, 6) in changed:
+            self._radio_table = None
+            self._radio_site_index = None
+            if self._radios is not None:
+                previous = self._radios
+                self.load_radios(*self._radio_load)
+                radios = SensorDiff(previous, self._radios, "RSID")
+        airspace = any((self._radar_path, name, 0) in changed for name in self.AIRSPACE_SHEETS)
+        if airspace:
+            airspace = self._reset_airspace()
+
+        diff = ReloadDiff(
+            radars, radios, airspace, sorted(((path, name) for path, name, _ in changed), key=str),
+            sorted(((path, name) for path, name, _ in removed), key=str),
+        )
+        if updated:
+            for callback in list(self._subscribers):
+                callback(self, diff)
+        return diff
+
+    @abc.abstractmethod
+    def load_radars(self, columns: list = None):
+        """Read RADAR_SHEET (only RADAR_COLUMNS, or columns when given) into radars, psr_type and ssr_type"""
+
+    @classmethod
+    def _compact(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Categorical sensor-type columns and decimal-degree coordinates (parsed from decimal or DMS text, with a
+        warning for values that cannot be parsed); columns already converted are left alone
+        """
+        df = df.copy()
+        for column in df.columns:
+            if not isinstance(column, str):
+                continue
+            if column in cls.CATEGORY_SEEDS or column.endswith(" eCTV"):
+                if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                    seeds = cls.CATEGORY_SEEDS.get(column, [])
+                    observed = [value for value in df[column].dropna().unique().tolist() if value not in seeds]
+                    df[column] = pd.Categorical(df[column], categories=seeds + observed)
+            elif column in cls.COORDINATE_COLUMNS:
+                # The workbooks mix decimal and DMS coordinates, so a plain numeric cast would drop the DMS rows
+                decimal, errors = GeoTools.Geo.parse_latlon_column(df[column])
+                if errors.any():
+                    bad = df.loc[errors, column]
+                    warnings.warn(
+                        f"{len(bad)} {column!r} value(s) could not be parsed as coordinates and are NaN: "
+                        f"{bad.astype(str).head(5).tolist()}"
+                    )
+                df[column] = decimal.astype(np.float64)
+            elif column in cls.COMPACT_COLUMNS:
+                df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float32)
+
+        return df
 
-    def load_radios(self, _filter: str = None):
-        radio_df = pd.read_excel(RADIOS, header=6)
+    @staticmethod
+    def _observed_values(column: pd.Series) -> list:
+        """Distinct values of a (categorical) column, with NaN included if present, like set(column)"""
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = column.cat.codes.to_numpy()
+            values = column.cat.categories[np.unique(codes[codes >= 0])].tolist()
+            return values + [np.nan] if (codes < 0).any() else values
+        return list(set(column.to_list()))
+
+    @staticmethod
+    def _usecols(columns, required) -> list:
+        """Requested columns plus the ones a loader needs for filtering, without repeats"""
+        return list(dict.fromkeys(list(columns) + list(required)))
+
+    def __radio_sheet(self) -> pd.DataFrame:
+        """Every column of the radio sheet, read once per instance for site filtering"""
+        if self._radio_table is None:
+            self._radio_table = self._compact(self._workbooks.read_excel(self._radio_path, header=6))
+        return self._radio_table
+
+    @property
+    def radio_site_index(self) -> dict:
+        """ERAM site -> row positions of the radios operational ("O") in its eCTV column"""
+        if self._radio_site_index is None:
+            sheet = self.__radio_sheet()
+            self._radio_site_index = {
+                column[:-len(" eCTV")]: np.flatnonzero((sheet[column] == "O").to_numpy(dtype=bool))
+                for column in sheet.columns
+                if isinstance(column, str) and column.endswith(" eCTV")
+            }
+        return self._radio_site_index
+
+    def load_radios(self, _filter=None, columns: list = None):
+        """
+        Parameters
+        __________
+        _filter: str or list
+            ERAM site(s); keeps radios operational ("O") in the site's eCTV column, with every column unless
+            columns is given. radios becomes the union of the sites and radios_by_site maps each site to its own
+            radios (it is empty when no filter is given)
+        columns: list
+            Radio sheet columns to read (defaults to RADIO_COLUMNS)
+        """
+        self._radio_load = (_filter, columns)
+        required = ["1090ES Antenna", "Radio Variant"]
         if _filter is None:
-            radio_df = radio_df[
-                [
-                    "Operational Status",
-                    "LID\n(GBT/[MRU])",
-                    "Facility Location",
-                    "RSID",
-                    "Latitude\n(Degrees)",
-                    "Longitude\n(Degrees)",
-                    "Enclosed By SV.1",
-                    "ADS-B/WAM Usage",
-                    "Site Elevation (MSL)",
-                    "Antenna Height (AGL)",
-                    "1090ES Antenna",
-                    "Radio Variant",
-                ]
-            ]
+            usecols = self._usecols(columns if columns is not None else self.RADIO_COLUMNS, required)
+            self.__set_radios(self._workbooks.read_excel(self._radio_path, header=6, usecols=usecols))
+            self.radios_by_site = {}
+            return
+
+        sheet = self.__radio_sheet()
+        if columns is not None:
+            sheet = sheet[self._usecols(columns, required)]
+        sites = [_filter] if isinstance(_filter, str) else list(_filter)
+        rows = {}
+        for site in sites:
+            if site not in self.radio_site_index:
+                # Matches the old mask-based filter, which kept every radio for an unknown site
+                print(f"{site} not found as a valid ERAM site")
+            rows[site] = self.radio_site_index.get(site)
+
+        known = [site_rows for site_rows in rows.values() if site_rows is not None]
+        if len(known) < len(rows):
+            self.__set_radios(sheet)
         else:
-            try:
-                filter_idx = radio_df.get(f"{_filter} eCTV", default="N/A")
-                radio_df = radio_df[filter_idx == "O"]
-            except KeyError as err:
-                print(f"{_filter} not found as a valid ERAM site")
+            self.__set_radios(sheet.iloc[np.unique(np.concatenate(known))] if known else sheet.iloc[:0])
+        self.radios_by_site = {
+            site: (sheet if site_rows is None else sheet.iloc[site_rows]).dropna(subset=["Radio Variant"])
+            for site, site_rows in rows.items()
+        }
 
-        radio_df = radio_df.dropna(subset=["Radio Variant"])
-        antennas = list(set(radio_df["1090ES Antenna"].to_list()))
-        variants = list(set(radio_df["Radio Variant"].to_list()))
+    def __set_radios(self, radio_df: pd.DataFrame):
+        radio_df = self._compact(radio_df.dropna(subset=["Radio Variant"]))
+        antennas = self._observed_values(radio_df["1090ES Antenna"])
+        variants = self._observed_values(radio_df["Radio Variant"])
 
         # Filter repeated variants (if they occur)
         repeat_index = [ix for ix, var in enumerate(variants) if "/" in var]
@@ -72,6 +1160,43 @@ class SurveillanceSystem(object):
         self.radio_antennas = antennas
         self.radio_variants = variants
 
+    def radar_index(self, follow=False):
+        """Spatial index over the radars keyed on Radar_ID; with follow, reloads update it in place (see unfollow)"""
+        index = SensorIndex.from_frame(self.radars, "Radar_Lat", "Radar_Lon", "Radar_ID", geo=self._geo)
+        if follow:
+            self.__follow(index, "radars", "Radar_Lat", "Radar_Lon")
+        return index
+
+    def radio_index(self, follow=False):
+        """Spatial index over the radios keyed on RSID; with follow, reloads update it in place (see unfollow)"""
+        index = SensorIndex.from_frame(
+            self.radios, "Latitude\n(Degrees)", "Longitude\n(Degrees)", "RSID", geo=self._geo
+        )
+        if follow:
+            self.__follow(index, "radios", "Latitude\n(Degrees)", "Longitude\n(Degrees)")
+        return index
+
+    def __follow(self, index, table, lat_col, lon_col):
+        """Subscribe an update for index, returning the callback; the index is only held weakly"""
+        index_ref = weakref.ref(index)
+
+        def update(system, diff):
+            followed = index_ref()
+            if followed is None:
+                # The caller dropped the index
+                system.unsubscribe(update)
+            elif getattr(diff, table) is not None:
+                followed.apply_diff(getattr(diff, table), lat_col, lon_col)
+
+        update.index = index_ref
+        return self.subscribe(update)
+
+    def unfollow(self, index) -> None:
+        """Stop reloads updating an index from radar_index / radio_index(follow=True)"""
+        self._subscribers = [
+            callback for callback in self._subscribers if getattr(callback, "index", lambda: None)() is not index
+        ]
+
     # TODO: Implement these two private methods below inside of the parent class
     @staticmethod
     def _map_radios():
@@ -87,67 +1212,93 @@ class SurveillanceSystem(object):
 class Terminal(SurveillanceSystem):
     """Terminal Service Volume Description"""
 
-    def __init__(self, airspace_class="all"):
+    RADAR_COLUMNS = [
+        "Radar_Name",
+        "Radar_ID",
+        "SDP1",
+        "Radar_Lat",
+        "Radar_Lon",
+        "SSR Type",
+        "PSR Type",
+        "Airspace_ID",
+    ]
+    AIRSPACE_COLUMNS = ["SV ID", "Arpt_Name", "SV_Lat", "SV_Lon", "SV_Range_NM"]
+    RADAR_SHEET = "Terminal Radars"
+    AIRSPACE_SHEETS = ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"]
+
+    def __init__(self, airspace_class="all", geo=None, workbook_cache=None, workbook_session=None, radar_path=RADARS,
+                 radio_path=RADIOS):
         # Initialize the SurveillanceSystem super class
-        super().__init__()
+        super().__init__(
+            radar_path=radar_path, radio_path=radio_path, geo=geo, workbook_cache=workbook_cache,
+            workbook_session=workbook_session,
+        )
         self.site_list = []
-        self.__load_airspace_info(airspace_class.upper())
+        self._airspace_class = airspace_class.upper()
+        if self._airspace_class not in ["ALL", "C", "B", "D"]:
+            raise ValueError(f"{self._airspace_class} is an incorrect class.")
+        self._airspace_loaded = False
+
+    def _load_airspace(self):
+        if not self._airspace_loaded:
+            # Flag first: loading fills sv_bounds through the property
+            self._airspace_loaded = True
+            self.__load_airspace_info(self._airspace_class)
+
+    def _reset_airspace(self) -> bool:
+        self._airspace_info = collections.defaultdict(list)
+        self._sv_bounds = BoundsStore()
+        self._airspace_loaded = False
+        return True
 
     def __load_airspace_info(self, airspace_class):
         valid_classes = ["C", "B", "D"]
         if airspace_class == "ALL":
             for _class in valid_classes:
-                self.airspace_info[_class].append(
+                self._airspace_info[_class].append(
                     self.__load_one_airspace_class(_class)
                 )
-        elif airspace_class not in valid_classes:
-            raise ValueError(f"{airspace_class} is an incorrect class.")
         else:
-            self.airspace_info[airspace_class].append(
+            self._airspace_info[airspace_class].append(
                 self.__load_one_airspace_class(airspace_class)
             )
 
     def __load_one_airspace_class(self, airspace_class):
-        airspace_df = pd.read_excel(
-            RADARS, sheet_name=f"Terminal Class{airspace_class}"
+        airspace_df = self._workbooks.read_excel(
+            self._radar_path, sheet_name=f"Terminal Class{airspace_class}", usecols=self.AIRSPACE_COLUMNS
         )
-        airspace_df = airspace_df[
-            ["SV ID", "Arpt_Name", "SV_Lat", "SV_Lon", "SV_Range_NM"]
-        ]
         airspace_df = airspace_df.dropna()
 
-        # Parse out the bounds for each sv region
-        for row, id in enumerate(airspace_df["SV ID"]):
-            self.sv_bounds[id].append(
-                self._geo.lat_lon_circle(
-                    airspace_df["SV_Lat"][row],
-                    airspace_df["SV_Lon"][row],
-                    int(airspace_df["SV_Range_NM"][row]),
-                )
-            )
+        # Parse out the bounds for each sv region (all rings in one vectorized pass)
+        circles = self._geo.lat_lon_circles(
+            airspace_df["SV_Lat"].to_numpy(dtype=float),
+            airspace_df["SV_Lon"].to_numpy(dtype=float),
+            airspace_df["SV_Range_NM"].to_numpy(dtype=float).astype(int),
+        )
+        for id, circle in zip(airspace_df["SV ID"], circles):
+            self._sv_bounds.append(id, circle)
 
         return airspace_df
 
-    def load_radars(self):
-        radar_df = pd.read_excel(self._radar_path, sheet_name="Terminal Radars")
-        radar_df = radar_df[
-            [
-                "Radar_Name",
-                "Radar_ID",
-                "SDP1",
-                "Radar_Lat",
-                "Radar_Lon",
-                "SSR Type",
-                "PSR Type",
-                "Airspace_ID",
-            ]
-        ]
+    def airspace_index(self):
+        """Spatial index over the loaded Terminal service volume centres keyed on SV ID"""
+        frames = [df for class_info in self.airspace_info.values() for df in class_info]
+        airspace_df = pd.concat(frames, ignore_index=True)
+        return SensorIndex.from_frame(airspace_df, "SV_Lat", "SV_Lon", "SV ID", geo=self._geo)
+
+    def load_radars(self, columns: list = None):
+        self._radar_columns = columns
+        usecols = self._usecols(
+            columns if columns is not None else self.RADAR_COLUMNS, ["SSR Type", "PSR Type", "SDP1"]
+        )
+        radar_df = self._workbooks.read_excel(self._radar_path, sheet_name=self.RADAR_SHEET, usecols=usecols)
 
         radar_df = radar_df[:256].dropna(how="all", subset=["SSR Type", "PSR Type"])
-        self.radars = radar_df[radar_df["SSR Type"] != "WAM"]
-        self.psr_type = list(set(self.radars["PSR Type"].to_list()))
-        self.ssr_type = list(set(self.radars["SSR Type"].to_list()))
-        self.site_list = set(self.radars["SDP1"].to_list())
+        radar_df = self._compact(radar_df[radar_df["SSR Type"] != "WAM"])
+        self.radars = radar_df
+        self.psr_type = self._observed_values(radar_df["PSR Type"])
+        self.ssr_type = self._observed_values(radar_df["SSR Type"])
+        self.site_list = set(self._observed_values(radar_df["SDP1"]))
 
     def load_radars_with_class(self):
         """might not be needed"""
@@ -176,57 +1327,389 @@ class Terminal(SurveillanceSystem):
 class EnRoute(SurveillanceSystem):
     """Enroute Service Volume Description (Includes ERAM info)"""
 
-    def __init__(self):
-        super().__init__()
-        self.sv_map = {}
-        self.__load_bounds()
+    RADAR_COLUMNS = [
+        "Radar_Name",
+        "Radar_ID",
+        "Radar_Lat",
+        "Radar_Lon",
+        "SSR Type",
+        "PSR Type",
+        "Airspace_ID",
+    ]
+    RADAR_SHEET = "En Route Radars"
+    AIRSPACE_SHEETS = ["EnRoute"]
+
+    def __init__(self, workbook_cache=None, workbook_session=None, boundaries=None, radar_path=RADARS,
+                 radio_path=RADIOS):
+        super().__init__(
+            radar_path=radar_path, radio_path=radio_path, workbook_cache=workbook_cache,
+            workbook_session=workbook_session,
+        )
+        # boundaries and sv_map are lazy properties, filled from the "EnRoute" sheet on first access
+        # unless boundaries are given; given boundaries are kept across reloads
+        self._sv_map = {}
+        self._boundaries = boundaries
+        self._boundaries_given = boundaries is not None
+        self._bounds_loaded = False
+
+    @property
+    def boundaries(self) -> ArtccBoundaries:
+        self._load_airspace()
+        return self._boundaries
+
+    @boundaries.setter
+    def boundaries(self, value):
+        self._boundaries = value
+        self._boundaries_given = value is not None
+        self._bounds_loaded = False
+
+    @property
+    def sv_map(self) -> dict:
+        self._load_airspace()
+        return self._sv_map
+
+    def _load_airspace(self):
+        if not self._bounds_loaded:
+            self._bounds_loaded = True
+            self.__load_bounds()
 
     def __load_bounds(self):
         """Load in the ERAM bounds"""
-        artcc_sites = pd.read_excel(self._radar_path, sheet_name="EnRoute")
-        current_id = None
-        for row, id in enumerate(artcc_sites.ARTCC_ID):
-            if isinstance(id, str):
-                current_id = id
-                self.sv_bounds[id].append(
-                    [artcc_sites.SV_Lat[row], artcc_sites.SV_Lon[row]]
-                )
-            else:
-                self.sv_bounds[current_id].append(
-                    [artcc_sites.SV_Lat[row], artcc_sites.SV_Lon[row]]
-                )
+        if self._boundaries is None:
+            self._boundaries = ArtccBoundaries.for_workbook(self._radar_path, self._workbooks)
+        self._sv_bounds = self._boundaries.store.copy()
+        self._sv_map = dict(self._boundaries.sv_map)
 
-        # Create a map of ARTCC ID --> Service Volume ID
-        artcc_sites = artcc_sites[["ARTCC_ID", "SV ID"]].dropna()
-        self.sv_map = dict(zip(artcc_sites["ARTCC_ID"], artcc_sites["SV ID"]))
+    def _reset_airspace(self) -> bool:
+        if self._boundaries_given:
+            return False
+        # ArtccBoundaries.for_workbook is keyed on the workbook mtime, so this builds from the new sheet
+        self._boundaries = None
+        self._bounds_loaded = False
+        return True
 
-    def load_radars(self):
-        radar_df = pd.read_excel(RADARS, sheet_name="En Route Radars")
-        radar_df = radar_df[
-            [
-                "Radar_Name",
-                "Radar_ID",
-                "Radar_Lat",
-                "Radar_Lon",
-                "SSR Type",
-                "PSR Type",
-                "Airspace_ID",
-            ]
-        ]
+    def sv_classifier(self):
+        """ServiceVolumeClassifier over the ARTCC boundaries"""
+        return ServiceVolumeClassifier(self.sv_bounds)
+
+    def enclosure_report(self, classifier=None) -> dict:
+        """
+        Recompute which ARTCC encloses every radar and radio and compare with the workbook columns
+        Returns
+        _______
+        dict with "radars" and "radios" frames holding the workbook value, the computed value and a match flag
+        """
+        locate = classifier.classify if classifier is not None else self.boundaries.locate
+        report = {}
+        if self.radars is not None:
+            computed = locate(self.radars[["Radar_Lat", "Radar_Lon"]].to_numpy(dtype=float))
+            report["radars"] = pd.DataFrame(
+                {"Radar_ID": self.radars["Radar_ID"], "Airspace_ID": self.radars["Airspace_ID"].astype(object),
+                 "Computed": computed},
+                index=self.radars.index,
+            )
+            report["radars"]["Match"] = report["radars"]["Airspace_ID"] == report["radars"]["Computed"]
+        if self.radios is not None:
+            computed = locate(
+                self.radios[["Latitude\n(Degrees)", "Longitude\n(Degrees)"]].to_numpy(dtype=float)
+            )
+            computed_sv = [self.sv_map.get(artcc) for artcc in computed]
+            report["radios"] = pd.DataFrame(
+                {"RSID": self.radios["RSID"], "Enclosed By SV.1": self.radios["Enclosed By SV.1"],
+                 "Computed": computed_sv},
+                index=self.radios.index,
+            )
+            report["radios"]["Match"] = (
+                pd.to_numeric(report["radios"]["Enclosed By SV.1"], errors="coerce")
+                == pd.to_numeric(report["radios"]["Computed"], errors="coerce")
+            )
+
+        return report
+
+    def load_radars(self, columns: list = None):
+        self._radar_columns = columns
+        usecols = self._usecols(columns if columns is not None else self.RADAR_COLUMNS, ["SSR Type", "PSR Type"])
+        radar_df = self._workbooks.read_excel(self._radar_path, sheet_name=self.RADAR_SHEET, usecols=usecols)
 
         radar_df = radar_df.dropna(how="all", subset=["SSR Type", "PSR Type"])
-        self.radars = radar_df[radar_df["SSR Type"] != "WAM"]
-        self.psr_type = list(set(self.radars["PSR Type"].to_list()))
-        self.ssr_type = list(set(self.radars["SSR Type"].to_list()))
+        radar_df = self._compact(radar_df[radar_df["SSR Type"] != "WAM"])
+        self.radars = radar_df
+        self.psr_type = self._observed_values(radar_df["PSR Type"])
+        self.ssr_type = self._observed_values(radar_df["SSR Type"])
+
+
+StartupData = collections.namedtuple("StartupData", ["terminal", "enroute", "session", "timings"])
+
+
+def load_surveillance(airspace_class="all", geo=None, workbook_cache=None, max_workers=None, split_sheets=False,
+                      verbose=False) -> StartupData:
+    """
+    Parse the radar and radio workbooks concurrently and return a Terminal and an EnRoute sharing them
+    Returns
+    _______
+    StartupData(terminal, enroute, session, timings) where timings comes from preload_workbooks
+    """
+    session = WorkbookSession(workbook_cache=workbook_cache)
+    timings = preload_workbooks(session, max_workers=max_workers, split_sheets=split_sheets, verbose=verbose)
+    terminal = Terminal(airspace_class, geo=geo, workbook_session=session)
+    enroute = EnRoute(workbook_session=session)
+    return StartupData(terminal, enroute, session, timings)
+
+
+class SensorIndex(object):
+    """
+    KD-tree over sensor ECEF positions for nearest-neighbour and radius queries
+
+    Points added after the tree is built sit in a pending buffer that is searched by brute
+    force until it grows past rebuild_fraction of the tree, at which point the tree is rebuilt.
+    Removed sensors are masked out of query results the same way until the tree is next rebuilt.
+    Distances are the ECEF chord converted to arc length on a sphere of Geo.earth_radius_nmi,
+    which stays within a fraction of a percent of the geodesic distance.
+    """
+
+    def __init__(self, lat_lon, ids=None, geo=None, leafsize=16, rebuild_fraction=0.1):
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        self._leafsize = leafsize
+        self._rebuild_fraction = rebuild_fraction
+        self._earth_radius_m = self._geo.earth_radius_nmi * NM_TO_METERS
+        self.lat_lon = np.empty((0, 2))
+        self.ids = np.empty(0, dtype=object)
+        self._ecef = np.empty((0, 3))
+        self._active = np.empty(0, dtype=bool)
+        self._tree = None
+        self._tree_size = 0
+        self.add(lat_lon, ids)
+
+    def __len__(self):
+        return int(self._active.sum())
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lat_col: str, lon_col: str, id_col: str = None, **kwargs):
+        df = df.dropna(subset=[lat_col, lon_col])
+        ids = df[id_col].to_numpy() if id_col is not None else None
+        return cls(df[[lat_col, lon_col]].to_numpy(dtype=float), ids=ids, **kwargs)
+
+    def add(self, lat_lon, ids=None):
+        """Add sensors to the index, rebuilding the tree only when the pending buffer is large"""
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        total = self.lat_lon.shape[0]
+        if ids is None:
+            ids = np.arange(total, total + lat_lon.shape[0])
+        self.lat_lon = np.vstack((self.lat_lon, lat_lon))
+        self.ids = np.concatenate((self.ids, np.asarray(ids, dtype=object)))
+        self._ecef = np.vstack((self._ecef, self.__to_ecef(lat_lon)))
+        self._active = np.concatenate((self._active, np.ones(lat_lon.shape[0], dtype=bool)))
+
+        pending = self.lat_lon.shape[0] - self._tree_size
+        if self._tree is None or pending > self._rebuild_fraction * self._tree_size:
+            self.rebuild()
+
+    def remove(self, ids) -> int:
+        """Drop every sensor with one of the given IDs, returning how many were dropped"""
+        ids = set(ids)
+        dropped = self._active & np.fromiter(
+            (sensor_id in ids for sensor_id in self.ids), dtype=bool, count=self.ids.size
+        )
+        self._active[dropped] = False
+        if (~self._active).sum() > self._rebuild_fraction * self._tree_size:
+            self.rebuild()
+        return int(dropped.sum())
+
+    def apply_diff(self, diff, lat_col: str, lon_col: str) -> None:
+        """Update the index in place from a SensorDiff keyed on its IDs, touching only the changed sensors"""
+        touched = diff.ids
+        self.remove(touched)
+        current = diff.current[diff.current[diff.key].isin(list(touched))].dropna(subset=[lat_col, lon_col])
+        self.add(current[[lat_col, lon_col]].to_numpy(dtype=float), current[diff.key].to_numpy())
+
+    def rebuild(self):
+        if not self._active.all():
+            # Compact out removed sensors; indexes returned by earlier queries no longer apply
+            self.lat_lon = self.lat_lon[self._active]
+            self.ids = self.ids[self._active]
+            self._ecef = self._ecef[self._active]
+            self._active = np.ones(self.lat_lon.shape[0], dtype=bool)
+        self._ecef = np.ascontiguousarray(self._ecef)
+        self._tree = cKDTree(self._ecef, leafsize=self._leafsize) if len(self) else None
+        self._tree_size = len(self)
+
+    @staticmethod
+    def __to_ecef(lat_lon):
+        x, y, z = GeoTools.Geo.lat_lon_to_ecef(lat_lon, np.zeros(lat_lon.shape[0]))
+        return np.ascontiguousarray(np.column_stack((x, y, z)))
+
+    def __chord_to_nmi(self, chord_m):
+        arc = 2 * np.arcsin(np.minimum(chord_m / (2 * self._earth_radius_m), 1.0))
+        return np.where(np.isinf(chord_m), np.inf, arc * self._geo.earth_radius_nmi)
+
+    def __nmi_to_chord(self, distance_nmi):
+        arc = np.minimum(distance_nmi / self._geo.earth_radius_nmi, np.pi)
+        return 2 * self._earth_radius_m * np.sin(arc / 2)
+
+    def __query(self, lat_lon, k, upper_bound=None) -> tuple:
+        """k closest (indexes, chords) per query from the tree and pending buffer, -1 / inf padded"""
+        query_ecef = self.__to_ecef(np.asarray(lat_lon, dtype=float).reshape(-1, 2))
+        n = query_ecef.shape[0]
+        idx_parts, chord_parts = [], []
+        if self._tree is not None:
+            # Ask for enough extra neighbours to cover removed sensors still in the tree
+            k_tree = min(k + int((~self._active[:self._tree_size]).sum()), self._tree_size)
+            chord, idx = self._tree.query(
+                query_ecef, k=k_tree, distance_upper_bound=np.inf if upper_bound is None else upper_bound
+            )
+            idx = idx.reshape(n, k_tree).astype(np.int64)
+            chord = chord.reshape(n, k_tree)
+            missing = idx >= self._tree_size
+            missing[~missing] = ~self._active[idx[~missing]]
+            idx[missing] = -1
+            chord[missing] = np.inf
+            idx_parts.append(idx)
+            chord_parts.append(chord)
+        pending = self._tree_size + np.flatnonzero(self._active[self._tree_size:])
+        if pending.size:
+            chord = np.linalg.norm(query_ecef[:, None, :] - self._ecef[None, pending, :], axis=2)
+            idx = np.tile(pending, (n, 1))
+            if upper_bound is not None:
+                idx[chord > upper_bound] = -1
+                chord[chord > upper_bound] = np.inf
+            idx_parts.append(idx)
+            chord_parts.append(chord)
+
+        if not idx_parts:
+            return np.full((n, k), -1, dtype=np.int64), np.full((n, k), np.inf)
+        idx = np.hstack(idx_parts)
+        chord = np.hstack(chord_parts)
+        order = np.argsort(chord, axis=1, kind='stable')[:, :k]
+        idx = np.take_along_axis(idx, order, axis=1)
+        chord = np.take_along_axis(chord, order, axis=1)
+        if idx.shape[1] < k:
+            pad = k - idx.shape[1]
+            idx = np.pad(idx, ((0, 0), (0, pad)), constant_values=-1)
+            chord = np.pad(chord, ((0, 0), (0, pad)), constant_values=np.inf)
+
+        return idx, chord
+
+    def nearest(self, lat_lon, k=1) -> tuple:
+        """
+        k nearest sensors for each query point
+        Returns
+        _______
+        (indexes, distances_nmi): np.ndarray of shape (n, k), closest first, -1 / inf when fewer than k sensors
+        """
+        idx, chord = self.__query(lat_lon, k)
+        return idx, self.__chord_to_nmi(chord)
+
+    def __query_radius(self, lat_lon, radius_chord) -> list:
+        """(indexes, chords) per query of every active sensor within radius_chord, closest first"""
+        query_ecef = self.__to_ecef(np.asarray(lat_lon, dtype=float).reshape(-1, 2))
+        n = query_ecef.shape[0]
+        tree_hits = self._tree.query_ball_point(query_ecef, radius_chord) if self._tree is not None else [[]] * n
+        pending = self._tree_size + np.flatnonzero(self._active[self._tree_size:])
+        results = []
+        for point, hits in zip(query_ecef, tree_hits):
+            idx = np.asarray(hits, dtype=np.int64)
+            idx = np.concatenate((idx[self._active[idx]], pending))
+            chord = np.linalg.norm(self._ecef[idx] - point, axis=1)
+            inside = chord <= radius_chord
+            order = np.argsort(chord[inside], kind='stable')
+            results.append((idx[inside][order], chord[inside][order]))
+
+        return results
+
+    def within(self, lat_lon, radius_nmi, max_results=None) -> list:
+        """
+        All sensors within radius_nmi of each query point (at most max_results of them when given)
+        Returns
+        _______
+        list of (indexes, distances_nmi) per query point, sorted closest first
+        """
+        radius_chord = self.__nmi_to_chord(radius_nmi)
+        if max_results is None:
+            return [(idx, self.__chord_to_nmi(chord)) for idx, chord in self.__query_radius(lat_lon, radius_chord)]
+
+        idx, chord = self.__query(lat_lon, max(max_results, 1), radius_chord)
+        dist = self.__chord_to_nmi(chord)
+        return [(row_idx[row_idx >= 0], row_dist[row_idx >= 0]) for row_idx, row_dist in zip(idx, dist)]
+
+    def nearest_ids(self, lat_lon, k=1) -> np.ndarray:
+        indexes, _ = self.nearest(lat_lon, k)
+        ids = np.full(indexes.shape, None, dtype=object)
+        ids[indexes >= 0] = self.ids[indexes[indexes >= 0]]
+        return ids
+
+    def within_ids(self, lat_lon, radius_nmi, max_results=None) -> list:
+        return [self.ids[idx].tolist() for idx, _ in self.within(lat_lon, radius_nmi, max_results)]
+
+
+class ServiceVolumeClassifier(object):
+    """
+    Assign points to the service volumes that enclose them
+
+    Polygons are built from an sv_bounds mapping (a BoundsStore, or a dict of one [lat, lon] ring or a
+    list of rings per SV ID). Like ArtccBoundaries, each polygon first rejects points outside its
+    bounding box with one array comparison; only the points inside are tested against the polygon,
+    in one vectorized containment call per polygon.
+    """
+
+    def __init__(self, sv_bounds: dict):
+        self.ids = []
+        self.polygons = []
+        for sv_id, bounds in sv_bounds.items():
+            for ring in self.__rings(bounds):
+                polygon = Polygon(np.asarray(ring, dtype=float)[:, ::-1])
+                if not polygon.is_valid:
+                    polygon = polygon.buffer(0)
+                self.ids.append(sv_id)
+                self.polygons.append(polygon)
+
+        # (polygons, 4) min_lon, min_lat, max_lon, max_lat; NaN rejects every point for an empty polygon
+        self.bounding_boxes = np.array(
+            [polygon.bounds if not polygon.is_empty else (np.nan,) * 4 for polygon in self.polygons], dtype=float
+        ).reshape(-1, 4)
+
+    @staticmethod
+    def __rings(bounds) -> list:
+        """Normalise a single ring or a list of rings to a list of rings with at least 3 vertices"""
+        if len(bounds) and np.ndim(bounds[0]) == 1 and len(bounds[0]) == 2 and np.isscalar(bounds[0][0]):
+            bounds = [bounds]
+        return [ring for ring in bounds if len(ring) >= 3]
+
+    def classify_all(self, lat_lon) -> list:
+        """Every enclosing SV ID for each [lat, lon] point, in sv_bounds order"""
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        lat, lon = lat_lon[:, 0], lat_lon[:, 1]
+        enclosing = [[] for _ in range(lat_lon.shape[0])]
+        for ix, (min_lon, min_lat, max_lon, max_lat) in enumerate(self.bounding_boxes):
+            # NaN points and boxes compare False, so they never become candidates
+            candidates = np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon))
+            if candidates.size == 0:
+                continue
+            inside = candidates[contains_xy(self.polygons[ix], lon[candidates], lat[candidates])]
+            sv_id = self.ids[ix]
+            for row in inside:
+                if sv_id not in enclosing[row]:
+                    enclosing[row].append(sv_id)
+
+        return enclosing
+
+    def classify(self, lat_lon) -> np.ndarray:
+        """The first enclosing SV ID for each [lat, lon] point, None where no volume encloses it"""
+        classified = np.full(np.asarray(lat_lon).reshape(-1, 2).shape[0], None, dtype=object)
+        for ix, matches in enumerate(self.classify_all(lat_lon)):
+            if matches:
+                classified[ix] = matches[0]
+
+        return classified
 
 
 class SurveillanceSource(object):
     """Gather all information for a given surveillance source"""
 
-    def __init__(self, path: str, sv: str, sheet_name: int = 0, header: int = 0):
+    def __init__(self, path: str, sv: str, sheet_name: int = 0, header: int = 0, workbook_cache=None):
         self._sv = sv
         self.sensor_df = None
         self._path = path
+        self._workbook_cache = workbook_cache if workbook_cache is not None else _workbook_cache
         self.__load_sensors(sheet_name, header)
 
     @property
@@ -257,14 +1740,14 @@ class SurveillanceSource(object):
 
     def __load_sensors(self, sheet_name, header):
         """Simple base function to load in sensor info"""
-        self.sensor_df = pd.read_excel(self._path, sheet_name=sheet_name, header=header)
+        self.sensor_df = self._workbook_cache.read_excel(self._path, sheet_name=sheet_name, header=header)
 
 
 class Radios(SurveillanceSource):
     """Gather all pertinent information for radios"""
 
-    def __init__(self, sv: str = "ALL"):
-        super().__init__(path=RADIOS, sv=sv, header=6)
+    def __init__(self, sv: str = "ALL", workbook_cache=None):
+        super().__init__(path=RADIOS, sv=sv, header=6, workbook_cache=workbook_cache)
         self.__filter_sensors()
 
     def __filter_sensors(self):
@@ -300,8 +1783,8 @@ class Radios(SurveillanceSource):
 class Radars(SurveillanceSource):
     """Gather all pertinent information for radars"""
 
-    def __init__(self, sv: str = "ALL"):
-        super().__init__(path=RADARS, sv=sv, sheet_name=0)
+    def __init__(self, sv: str = "ALL", workbook_cache=None):
+        super().__init__(path=RADARS, sv=sv, sheet_name=0, workbook_cache=workbook_cache)
 
 
 if __name__ == "__main__":
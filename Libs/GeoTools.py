@@ -4,13 +4,154 @@ from pygeodesy.ellipsoidalVincenty import LatLon
 import pandas as pd
 import matplotlib.pyplot as plt
 import warnings
+import os
+import re
+import pickle
+import collections
+import functools
 import numpy as np
 from Libs import constants
 
 
+class RingCache(object):
+    """
+    Bounded LRU cache for service-volume rings keyed on (lat, lon, radius_nmi, num_entries)
+    Parameters
+    __________
+    max_size: int
+        Maximum number of rings to hold before evicting the least recently used
+    cache_path: str
+        Optional pickle file used to persist rings between runs
+
+    Keys are quantised to KEY_DECIMALS decimal places (about 0.1 mm for 9), so the same reference reached
+    through different arithmetic or parsing hits the same entry. A cache file that cannot be read, is not a
+    ring cache or was written with another FORMAT_VERSION is ignored with a warning; the cache starts empty
+    and the next save replaces the file.
+    """
+
+    KEY_DECIMALS = 9
+    # Bump whenever the rings lat_lon_circle computes change, so rings persisted by older code are discarded
+    FORMAT_VERSION = 1
+
+    def __init__(self, max_size=4096, cache_path=None):
+        self.max_size = max_size
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self.__rings = collections.OrderedDict()
+        if cache_path is not None and os.path.exists(cache_path):
+            self.load()
+
+    def __len__(self):
+        return len(self.__rings)
+
+    def __contains__(self, key):
+        return self.key(*key) in self.__rings
+
+    @classmethod
+    def key(cls, ref_lat, ref_lon, radius_nmi, num_entries=180) -> tuple:
+        return (
+            round(float(ref_lat), cls.KEY_DECIMALS), round(float(ref_lon), cls.KEY_DECIMALS),
+            round(float(radius_nmi), cls.KEY_DECIMALS), num_entries,
+        )
+
+    def keys(self) -> list:
+        """Cached keys, least recently used first"""
+        return list(self.__rings)
+
+    def get(self, ref_lat, ref_lon, radius_nmi, num_entries=180):
+        key = self.key(ref_lat, ref_lon, radius_nmi, num_entries)
+        ring = self.__rings.get(key)
+        if ring is None:
+            self.misses += 1
+            return None
+        self.__rings.move_to_end(key)
+        self.hits += 1
+        return list(ring)
+
+    def put(self, ref_lat, ref_lon, radius_nmi, num_entries, ring: list) -> None:
+        key = self.key(ref_lat, ref_lon, radius_nmi, num_entries)
+        self.__rings[key] = tuple(ring)
+        self.__rings.move_to_end(key)
+        while len(self.__rings) > self.max_size:
+            self.__rings.popitem(last=False)
+
+    def clear(self) -> None:
+        self.__rings.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.__rings), 'max_size': self.max_size}
+
+    def load(self, cache_path=None) -> bool:
+        """Add the rings saved in cache_path, keeping their LRU order; returns False if the file was ignored"""
+        cache_path = cache_path or self.cache_path
+        if cache_path is None:
+            raise ValueError('No cache_path given to load the ring cache from.')
+        try:
+            with open(cache_path, 'rb') as f:
+                saved = pickle.load(f)
+        except Exception as err:
+            # Truncated or corrupted files can fail anywhere inside pickle.load, not only as UnpicklingError
+            warnings.warn(f'Ignoring unreadable ring cache {cache_path}: {err!r}')
+            return False
+
+        if not isinstance(saved, dict) or saved.get('version') != self.FORMAT_VERSION:
+            version = saved.get('version') if isinstance(saved, dict) else None
+            warnings.warn(f'Ignoring stale ring cache {cache_path} (format {version}, expected {self.FORMAT_VERSION})')
+            return False
+        try:
+            rings = [(self.key(*key), tuple(map(tuple, ring))) for key, ring in saved['rings'].items()]
+            if not all(all(len(vertex) == 2 for vertex in ring) for _, ring in rings):
+                raise ValueError('ring vertices must be (lat, lon) pairs')
+        except (AttributeError, KeyError, TypeError, ValueError) as err:
+            warnings.warn(f'Ignoring malformed ring cache {cache_path}: {err!r}')
+            return False
+
+        for key, ring in rings:
+            self.put(*key, ring)
+        return True
+
+    def save(self, cache_path=None) -> None:
+        cache_path = cache_path or self.cache_path
+        if cache_path is None:
+            raise ValueError('No cache_path given to save the ring cache to.')
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(
+                {'version': self.FORMAT_VERSION, 'rings': dict(self.__rings)}, f, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, cache_path)
+
+
 class Geo(object):
-    def __init__(self):
+    # [+/-] deg [min [sec]] [N/S/E/W] once ° ' " : separators are blanked out
+    _DMS_PATTERN = re.compile(
+        r'^(?P<sign>[+-])?\s*(?P<deg>\d+(?:\.\d*)?)'
+        r'(?:\s+(?P<min>\d+(?:\.\d*)?)(?:\s+(?P<sec>\d+(?:\.\d*)?))?)?'
+        r'\s*(?P<hem>[NSEW])?$'
+    )
+
+    # Points per float64 working chunk when a reduced precision dtype is requested
+    PRECISION_CHUNK = 1 << 16
+
+    def __init__(self, ring_cache: RingCache = None, dtype=np.float64):
         self.earth_radius_nmi = 6371*1000/1852
+        self.ring_cache = ring_cache
+        self.dtype = dtype
+
+    @property
+    def dtype(self):
+        return self.__dtype
+
+    @dtype.setter
+    def dtype(self, value):
+        value = np.dtype(value)
+        if value not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError(f'{value} is not a supported precision. Use float32 or float64.')
+        self.__dtype = value
 
     @property
     def earth_radius_nmi(self):
@@ -47,7 +188,10 @@ class Geo(object):
     @staticmethod
     def __validate_az_acps(az_acps):
         err = None
-        if (az_acps < 0) or (az_acps > 4096):
+        if isinstance(az_acps, np.ndarray):
+            if (az_acps < 0).any() or (az_acps > 4096).any():
+                err = f'Invalid azimuth ACPs specified {az_acps}'
+        elif (az_acps < 0) or (az_acps > 4096):
             err = f'Invalid azimuth ACPs specified {az_acps}'
         assert (err is None), err
 
@@ -84,6 +228,8 @@ class Geo(object):
                 decimal = float(coordinate)
             except ValueError:
                 coordinate = coordinate.strip().upper()
+                if not coordinate:
+                    return None
                 translater = str.maketrans({
                     '"': " ",
                     "'": " ",
@@ -100,36 +246,33 @@ class Geo(object):
                     coordinate = coordinate[0:-1].strip()
                 elif firstchar == '-':
                     sign = -1
-                    coordinate = coordinate[0:-1].strip()
+                    coordinate = coordinate[1:].strip()
                 elif firstchar == '+':
                     sign = 1
                     coordinate = coordinate[1:].strip()
                 else:
                     sign = 1
 
+                # Degrees, optionally followed by minutes and seconds
                 components = coordinate.split()
-                if len(components) == 3:
-                    degrees = int(components[0])
-                    minutes = int(components[1])
-                    seconds = float(components[2])
-                    decimal = (degrees + minutes / 60 + seconds / 3600) * sign
-                elif len(components):
-                    decimal = float(components[0]) * sign
+                if 1 <= len(components) <= 3:
+                    decimal = sum(float(value) / 60 ** ix for ix, value in enumerate(components)) * sign
                 else:
                     raise ValueError()
 
             return Geo.parse_latlon(decimal)
 
     def latlon_dec_to_hhmmss(self, lat: float, lon: float) -> list:
+        # abs rather than negation, so 0.0 does not become -0.0 and print as '-0.000' seconds
         if lat > 0:
             lat_ns = 'N'
         else:
-            lat = -lat
+            lat = abs(lat)
             lat_ns = 'S'
         if lon > 0:
             lon_ew = 'E'
         else:
-            lon = -lon
+            lon = abs(lon)
             lon_ew = 'W'
 
         hhmmss_lat = self.__decimal_to_hhmmss(lat) + ' ' + lat_ns
@@ -159,11 +302,80 @@ class Geo(object):
 
         return decimal_val
 
+    @staticmethod
+    def parse_latlon_column(coordinates) -> tuple:
+        """
+        Vectorized parse_latlon for a whole column of mixed decimal / DMS / hh:mm:ss strings
+        Parameters
+        __________
+        coordinates: pd.Series, np.ndarray or list
+            Numbers or strings such as '38.5', '-121.25', '38 30 15.2N', '121°15'30"W', '38:30:15.250 N'
+        Returns
+        _______
+        (decimal, error_mask): float values (NaN where missing or unparseable) and a boolean mask of the
+        rows that could not be parsed; both are Series sharing the input index when given a Series
+        """
+        series = coordinates if isinstance(coordinates, pd.Series) else pd.Series(np.asarray(coordinates, dtype=object))
+        missing = series.isna() | (series.astype(str).str.strip() == '')
+        decimal = pd.to_numeric(series, errors='coerce').astype(float)
+
+        text_rows = decimal.isna() & ~missing
+        if text_rows.any():
+            text = series[text_rows].astype(str).str.strip().str.upper()
+            text = text.str.replace(r'[°\'":]', ' ', regex=True).str.strip()
+            parts = text.str.extract(Geo._DMS_PATTERN)
+            degrees = parts['deg'].astype(float)
+            degrees += parts['min'].astype(float).fillna(0.0) / 60.0
+            degrees += parts['sec'].astype(float).fillna(0.0) / 3600.0
+            sign = np.where(parts['sign'] == '-', -1.0, 1.0) * np.where(parts['hem'].isin(['S', 'W']), -1.0, 1.0)
+            # A sign and a hemisphere letter together is ambiguous, as it is for parse_latlon
+            ambiguous = parts['sign'].notna() & parts['hem'].notna()
+            decimal[text_rows] = np.where(ambiguous, np.nan, degrees * sign)
+
+        decimal[(decimal < -180) | (decimal > 180)] = np.nan
+        errors = decimal.isna() & ~missing
+        if isinstance(coordinates, pd.Series):
+            return decimal, errors
+        return decimal.to_numpy(), errors.to_numpy()
+
+    @staticmethod
+    def hhmmss_to_decimal_column(hhmmss) -> tuple:
+        """
+        Vectorized hhmmss_to_decimal for a column of 'hh:mm:ss[.sss] N' strings
+        Unlike the scalar version the fractional seconds are kept. See parse_latlon_column for the return values.
+        """
+        return Geo.parse_latlon_column(hhmmss)
+
+    @staticmethod
+    def latlon_dec_to_hhmmss_column(lats, lons) -> tuple:
+        """
+        Vectorized latlon_dec_to_hhmmss for whole columns of decimal degrees
+        Returns
+        _______
+        (hhmmss_lats, hhmmss_lons): arrays of 'hh:mm:ss.sss H' strings, or Series when given Series
+        """
+        def to_hhmmss(values, positive, negative):
+            dec = np.asarray(values, dtype=float)
+            hemisphere = np.where(dec > 0, positive, negative)
+            dec = np.abs(dec)
+            hh = np.trunc(dec)
+            x1_dec = dec - hh
+            mm = np.trunc(x1_dec * 60)
+            ss = (x1_dec - mm / 60.0) * 3600
+            rollover = ss > 59.99999
+            mm[rollover] += 1
+            ss[rollover] -= 59.99999
+            text = np.char.add(np.char.mod('%02d:', hh.astype(np.int64)), np.char.mod('%02d:', mm.astype(np.int64)))
+            text = np.char.add(np.char.add(text, np.char.mod('%05.3f ', ss)), hemisphere)
+            return pd.Series(text, index=values.index) if isinstance(values, pd.Series) else text
+
+        return to_hhmmss(lats, 'N', 'S'), to_hhmmss(lons, 'E', 'W')
+
     def distance_between_two_lat_lon(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         self.__validate_lat_lon(lat1, lon1)
         self.__validate_lat_lon(lat2, lon2)
         dlat = np.radians(lat2 - lat1)
-        dlon = np.radians(lon2 - lat2)
+        dlon = np.radians(lon2 - lon1)
         # Great Circle Formula
         a = (np.sin(dlat / 2) * np.sin(dlat / 2)) + \
             (np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) * np.sin(dlon / 2))
@@ -201,12 +413,13 @@ class Geo(object):
         return (d.lat, d.lon)
 
     def lat_lon_from_reference_multiple_range_az_degrees(self, ref_lat, ref_lon, range_az_list) -> list:
-        lat_lon_list = []
-        for range_az in range_az_list:
-            lat_lon = self.lat_lon_from_reference_given_range_az_degrees(ref_lat, ref_lon, range_az[0], range_az[1])
-            lat_lon_list.append(lat_lon)
-
-        return lat_lon_list
+        if len(range_az_list) == 0:
+            return []
+        range_az = np.asarray(range_az_list, dtype=float)
+        lats, lons = self.lat_lon_from_reference_batch_range_az_degrees(
+            ref_lat, ref_lon, range_az[:, 0], range_az[:, 1]
+        )
+        return list(zip(lats.tolist(), lons.tolist()))
 
     def lat_lon_from_reference_given_range_az_acps(self, ref_lat, ref_lon, range_nmi, az_acps) -> list:
         self.__validate_az_acps(az_acps)
@@ -214,28 +427,173 @@ class Geo(object):
         return self.lat_lon_from_reference_given_range_az_degrees(ref_lat, ref_lon, range_nmi, az_degrees)
 
     def lat_lon_from_reference_multiple_range_az_acps(self, ref_lat, ref_lon, range_az_list) -> list:
-        lat_lon_list = []
-        for range_az in range_az_list:
-            lat_lon = self.lat_lon_from_reference_given_range_az_acps(ref_lat, ref_lon, range_az[0], range_az[1])
-            lat_lon_list.append(lat_lon)
-        return lat_lon_list
+        if len(range_az_list) == 0:
+            return []
+        range_az = np.asarray(range_az_list, dtype=float)
+        self.__validate_az_acps(range_az[:, 1])
+        az_degrees = (360.0 * range_az[:, 1]) / 4096.0
+        lats, lons = self.lat_lon_from_reference_batch_range_az_degrees(
+            ref_lat, ref_lon, range_az[:, 0], az_degrees
+        )
+        return list(zip(lats.tolist(), lons.tolist()))
+
+    @staticmethod
+    def lat_lon_from_reference_batch_range_az_degrees(ref_lat, ref_lon, range_nmi, az_degrees) -> tuple:
+        """
+        Vectorized Vincenty direct solution on the WGS-84 ellipsoid
+        Parameters
+        __________
+        ref_lat, ref_lon: float or np.ndarray
+            Reference point(s) in decimal degrees
+        range_nmi: float or np.ndarray
+            Geodesic range(s) from the reference in nautical miles
+        az_degrees: float or np.ndarray
+            Initial bearing(s) from true north in degrees
+
+        All inputs are broadcast against each other, so one reference can be paired with many
+        range/azimuth values or many references with one range. Agrees with the pygeodesy
+        ellipsoidalVincenty destination to well below a millimetre.
+        Returns
+        _______
+        (lats, lons): tuple of np.ndarray
+        """
+        a = constants.SEMI_MAJOR_AXIS_A
+        f = constants.RECIPROCAL_FLATTENING
+        b = a * (1 - f)
+
+        phi1, lam1, s, alpha1 = np.broadcast_arrays(
+            np.radians(np.asarray(ref_lat, dtype=float)),
+            np.radians(np.asarray(ref_lon, dtype=float)),
+            np.asarray(range_nmi, dtype=float) * constants.NM_TO_METERS,
+            np.radians(np.asarray(az_degrees, dtype=float)),
+        )
+        sin_alpha1 = np.sin(alpha1)
+        cos_alpha1 = np.cos(alpha1)
+
+        tan_u1 = (1 - f) * np.tan(phi1)
+        cos_u1 = 1 / np.sqrt(1 + tan_u1 ** 2)
+        sin_u1 = tan_u1 * cos_u1
+        sigma1 = np.arctan2(tan_u1, cos_alpha1)
+        sin_alpha = cos_u1 * sin_alpha1
+        cos_sq_alpha = 1 - sin_alpha ** 2
+        u_sq = cos_sq_alpha * (a ** 2 - b ** 2) / (b ** 2)
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+
+        sigma_0 = s / (b * big_a)
+        sigma = sigma_0
+        k = 0
+        while True:
+            k += 1
+            cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+            sin_sigma = np.sin(sigma)
+            cos_sigma = np.cos(sigma)
+            delta_sigma = big_b * sin_sigma * (
+                cos_2sigma_m + big_b / 4 * (
+                    cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                    - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+                )
+            )
+            sigma_prev = sigma
+            sigma = sigma_0 + delta_sigma
+            if k >= 200 or not (np.abs(sigma - sigma_prev) > 1e-12).any():
+                break
+
+        cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+        sin_sigma = np.sin(sigma)
+        cos_sigma = np.cos(sigma)
+        x = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+        phi2 = np.arctan2(
+            sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+            (1 - f) * np.sqrt(sin_alpha ** 2 + x ** 2),
+        )
+        lam = np.arctan2(sin_sigma * sin_alpha1, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+        c = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+        big_l = lam - (1 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        lon2 = np.degrees(lam1 + big_l)
+        lon2 = (lon2 + 180.0) % 360.0 - 180.0
+
+        return np.degrees(phi2), lon2
 
     def lat_lon_circle(self, ref_lat, ref_lon, radius_nmi, num_entries=180) -> list:
-        lat_lon_list = []
-        az_degrees = 0.0
-        delta_az_degree = 360.0/num_entries
-        while az_degrees < 360.0:
-            (lat_lon) = self.lat_lon_from_reference_given_range_az_degrees(ref_lat, ref_lon, radius_nmi, az_degrees)
-            lat_lon_list.append(lat_lon)
-            az_degrees += delta_az_degree
+        if self.ring_cache is not None:
+            lat_lon_list = self.ring_cache.get(ref_lat, ref_lon, radius_nmi, num_entries)
+            if lat_lon_list is None:
+                lat_lon_list = self.__compute_circle(ref_lat, ref_lon, radius_nmi, num_entries)
+                self.ring_cache.put(ref_lat, ref_lon, radius_nmi, num_entries, lat_lon_list)
+            return lat_lon_list
+
+        return self.__compute_circle(ref_lat, ref_lon, radius_nmi, num_entries)
+
+    def __compute_circle(self, ref_lat, ref_lon, radius_nmi, num_entries) -> list:
+        az_degrees = self.__circle_azimuths(num_entries)
+        lats, lons = self.lat_lon_from_reference_batch_range_az_degrees(ref_lat, ref_lon, radius_nmi, az_degrees)
+        lat_lon_list = list(zip(lats.tolist(), lons.tolist()))
         num_items = len(lat_lon_list)
         if num_items > 0 and (lat_lon_list[0] != lat_lon_list[num_items -1]):
             lat_lon_list.append(lat_lon_list[0])
 
         return lat_lon_list
 
+    def lat_lon_circles(self, ref_lats, ref_lons, radii_nmi, num_entries=180) -> list:
+        """
+        Build one closed ring per reference point in a single vectorized pass
+        Parameters
+        __________
+        ref_lats, ref_lons, radii_nmi: array-like
+            Centre points and ring radii, one entry per ring
+        num_entries: int
+            Number of azimuth steps around each ring
+        Returns
+        _______
+        list of lists of (lat, lon) tuples, in the same format as lat_lon_circle
+        """
+        ref_lats = np.asarray(ref_lats, dtype=float).ravel()
+        ref_lons = np.asarray(ref_lons, dtype=float).ravel()
+        radii_nmi = np.asarray(radii_nmi, dtype=float).ravel()
+        circles = [None] * ref_lats.size
+        if self.ring_cache is not None:
+            for ix in range(ref_lats.size):
+                circles[ix] = self.ring_cache.get(ref_lats[ix], ref_lons[ix], radii_nmi[ix], num_entries)
+        missing = np.array([ix for ix, circle in enumerate(circles) if circle is None], dtype=int)
+        if missing.size == 0:
+            return circles
+
+        az_degrees = self.__circle_azimuths(num_entries).reshape(1, -1)
+        lats, lons = self.lat_lon_from_reference_batch_range_az_degrees(
+            ref_lats[missing].reshape(-1, 1),
+            ref_lons[missing].reshape(-1, 1),
+            radii_nmi[missing].reshape(-1, 1),
+            az_degrees,
+        )
+
+        for ix, lat_row, lon_row in zip(missing.tolist(), lats.tolist(), lons.tolist()):
+            lat_lon_list = list(zip(lat_row, lon_row))
+            if lat_lon_list and (lat_lon_list[0] != lat_lon_list[-1]):
+                lat_lon_list.append(lat_lon_list[0])
+            circles[ix] = lat_lon_list
+            if self.ring_cache is not None:
+                self.ring_cache.put(ref_lats[ix], ref_lons[ix], radii_nmi[ix], num_entries, lat_lon_list)
+
+        return circles
+
+    @staticmethod
+    def __circle_azimuths(num_entries) -> np.ndarray:
+        # Accumulate the step the same way the original while loop did so the ring vertices are unchanged
+        delta_az_degree = 360.0 / num_entries
+        steps = np.full(int(np.ceil(num_entries)) + 2, delta_az_degree)
+        steps[0] = 0.0
+        az_degrees = np.cumsum(steps)
+        return az_degrees[az_degrees < 360.0]
+
     @staticmethod
-    def lat_lon_to_ecef(lat_lon_array: np.ndarray, alt: np.ndarray) -> tuple:
+    def lat_lon_to_ecef(lat_lon_array: np.ndarray, alt: np.ndarray, dtype=None) -> tuple:
+        """
+        dtype=np.float32 returns float32 ECEF arrays computed in float64 chunks of PRECISION_CHUNK points,
+        halving output memory; rounding adds at most 0.25 m per axis (half a float32 ulp at 6.4e6 m).
+        """
         if (not isinstance(lat_lon_array, np.ndarray)) or (not isinstance(alt, np.ndarray)):
             raise ValueError(f'Inputs are of  \'{type(lat_lon_array)}\' and \'{type(alt)}\''
                              f'. They must be \'<class np.ndarray>\'')
@@ -247,10 +605,24 @@ class Geo(object):
             lats = lat_lon_array[0]
             lons = lat_lon_array[1]
 
+        if dtype is None or np.dtype(dtype) == np.float64 or np.ndim(lats) == 0:
+            return Geo.__lat_lon_to_ecef(lats, lons, alt)
+
+        alt = np.broadcast_to(np.asarray(alt, dtype=np.float64).ravel(), lats.shape)
+        ecef = np.empty((3, lats.size), dtype=dtype)
+        for start in range(0, lats.size, Geo.PRECISION_CHUNK):
+            chunk = slice(start, start + Geo.PRECISION_CHUNK)
+            ecef[:, chunk] = Geo.__lat_lon_to_ecef(
+                lats[chunk].astype(np.float64), lons[chunk].astype(np.float64), alt[chunk]
+            )
+        return ecef[0], ecef[1], ecef[2]
+
+    @staticmethod
+    def __lat_lon_to_ecef(lats, lons, alt) -> tuple:
         f = (constants.SEMI_MAJOR_AXIS_A - constants.SEMI_MAJOR_AXIS_B) / constants.SEMI_MAJOR_AXIS_A
         e = np.sqrt(f * (2 - f))
         # Calculate the length of ellipsoid normal
-        eqn1 = np.power(np.sin(np.degrees(lats)), 2)
+        eqn1 = np.power(np.sin(np.radians(lats)), 2)
         bottom_n = np.sqrt(1 - (e**2 * eqn1))
         n = np.divide(constants.SEMI_MAJOR_AXIS_A, bottom_n).ravel()
         # Calculate output values
@@ -265,42 +637,113 @@ class Geo(object):
         z_ecef = eqn3 * sin_lat
         return x_ecef, y_ecef, z_ecef
 
-    def enu_to_lat_lon_alt(self, enu, system_ref):
+    def enu_to_lat_lon_alt(self, enu, system_ref, method='heikkinen', dtype=None):
+        """
+        dtype (defaulting to the instance dtype) selects the output precision. With float32 the ENU input
+        and the (3, n) result stay float32 while the ECEF offset and geodetic solve run in float64 chunks;
+        rounding error is then under 1e-5 deg (< 1 m) in lat/lon and a few millimetres in altitude.
+        """
         if enu.shape[1] != 3:
             raise ValueError(f'Size of enu must be nx3, not nx{enu.shape[1]}')
 
-        lat_ref, lon_ref, alt_ref = system_ref
-        lat_ref = np.deg2rad(lat_ref)
-        lon_ref = np.deg2rad(lon_ref)
-        xr, yr, zr, e = self.__reference_values(system_ref, lon_ref, lat_ref, alt_ref)
-
-        x = -np.sin(lon_ref)*enu[:, 0] - np.cos(lon_ref) * np.sin(lat_ref)*enu[:, 1] + np.cos(lon_ref) * \
-            np.cos(lat_ref)*enu[:, 2] + xr
-        y = np.cos(lon_ref)*enu[:, 0] - np.sin(lon_ref) * np.sin(lat_ref)*enu[:, 1] + np.cos(lat_ref) * \
-            np.sin(lon_ref)*enu[:, 2] + yr
-        z = np.cos(lat_ref)*enu[:, 1] + np.sin(lat_ref)*enu[:, 2] + zr
-
-        p = np.sqrt(np.power(x, 2) + np.power(y, 2)).T
-        phi_loop = np.arctan2(z, p * (1 - e**2))
-        lam = np.arctan2(y, x)
-        n_loop = n_loop = (constants.SEMI_MAJOR_AXIS_A) / (np.sqrt(1 - (e * np.sin(phi_loop))**2))
-
-        # Iterate through until you find the correct values
-        done_test = 1000
-        k = 1
-        while done_test > (1*10**-10) and (k < 100):
-            k += 1
-            h_loop = p / (np.cos(phi_loop) - n_loop)
-            phi_loop_tmp = np.arctan2(z, (p * (1-e**2)*np.divide(n_loop, (n_loop + h_loop))))
-            phi_loop_delta = phi_loop_tmp - phi_loop
-            phi_loop = phi_loop_tmp
+        dtype = self.dtype if dtype is None else dtype
+        return LocalTangentPlane.for_site(*system_ref).enu_to_lla(enu, method=method, dtype=dtype)
+
+    @staticmethod
+    def ecef_to_lat_lon_alt(x, y, z, method='heikkinen') -> tuple:
+        """
+        Convert WGS-84 ECEF coordinates to geodetic latitude, longitude (degrees) and height (m)
+        Parameters
+        __________
+        x, y, z: np.ndarray
+            ECEF coordinates in metres
+        method: str
+            'heikkinen' is the closed-form, non-iterative solution (sub-millimetre for terrestrial
+            heights) and 'iterative' is the fixed-point latitude iteration
+        Returns
+        _______
+        (lat, lon, alt): tuple of np.ndarray
+        """
+        methods = {'heikkinen': Geo.__heikkinen, 'iterative': Geo.__iterative_latitude}
+        if method not in methods:
+            raise ValueError(f'{method} is not a valid solver. Choose from {list(methods)}')
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        z = np.asarray(z, dtype=float)
+        phi, h = methods[method](x, y, z)
+        return np.rad2deg(phi), np.rad2deg(np.arctan2(y, x)), h
+
+    @staticmethod
+    def __heikkinen(x, y, z) -> tuple:
+        a = constants.SEMI_MAJOR_AXIS_A
+        b = a * (1 - constants.RECIPROCAL_FLATTENING)
+        e2 = (a ** 2 - b ** 2) / a ** 2
+        ep2 = (a ** 2 - b ** 2) / b ** 2
+
+        # Work buffers are reused in place so only a handful of full-size arrays are alive at once
+        p = np.hypot(x, y)
+        p2 = np.square(p)
+        z2 = np.square(z)
+        f = 54 * b ** 2 * z2
+        g = p2 + (1 - e2) * z2
+        g -= e2 * (a ** 2 - b ** 2)
+        c = e2 ** 2 * f * p2
+        c /= g ** 3
+        s = np.square(c)
+        s += 2 * c
+        np.sqrt(s, out=s)
+        s += 1 + c
+        np.cbrt(s, out=s)
+        k = s + 1
+        k += 1 / s
+        big_p = f
+        big_p /= 3 * np.square(k) * np.square(g)
+        q = np.sqrt(1 + 2 * e2 ** 2 * big_p)
+        r0 = (a ** 2 / 2) * (1 + 1 / q)
+        r0 -= big_p * (1 - e2) * z2 / (q * (1 + q))
+        r0 -= big_p * p2 / 2
+        np.maximum(r0, 0.0, out=r0)
+        np.sqrt(r0, out=r0)
+        r0 -= big_p * e2 * p / (1 + q)
+        u = p - e2 * r0
+        np.square(u, out=u)
+        v = u + (1 - e2) * z2
+        u += z2
+        np.sqrt(u, out=u)
+        np.sqrt(v, out=v)
+
+        h = u * (1 - b ** 2 / (a * v))
+        z0 = b ** 2 * z / (a * v)
+        phi = np.arctan2(z + ep2 * z0, p)
+        return phi, h
 
-            top = (constants.SEMI_MAJOR_AXIS_A * np.ones((enu.shape[0], 1))).T
-            bot = np.sqrt(1 - np.power(e * np.sin(phi_loop), 2))
-            n_loop = np.divide(top, bot).flatten()
-            done_test = max(np.abs(phi_loop_delta))
+    @staticmethod
+    def __iterative_latitude(x, y, z, tolerance=1e-12, max_iterations=100) -> tuple:
+        a = constants.SEMI_MAJOR_AXIS_A
+        e2 = (2 * constants.RECIPROCAL_FLATTENING) - (constants.RECIPROCAL_FLATTENING ** 2)
 
-        return np.array((np.rad2deg(phi_loop), np.rad2deg(lam), h_loop))
+        p = np.hypot(x, y)
+        phi = np.arctan2(z, p * (1 - e2))
+        n = np.empty_like(phi)
+        h = np.empty_like(phi)
+        phi_tmp = np.empty_like(phi)
+        for _ in range(max_iterations):
+            np.sin(phi, out=n)
+            np.square(n, out=n)
+            n *= -e2
+            n += 1
+            np.sqrt(n, out=n)
+            np.divide(a, n, out=n)
+            np.cos(phi, out=h)
+            np.divide(p, h, out=h)
+            h -= n
+            np.arctan2(z, p * (1 - e2 * n / (n + h)), out=phi_tmp)
+            phi, phi_tmp = phi_tmp, phi
+            if not (np.abs(phi - phi_tmp) > tolerance).any():
+                break
+
+        return phi, h
 
     def great_circle_distance(self, lat0, lon0, lat1, lon1):
         lat0 = np.deg2rad(lat0)
@@ -308,25 +751,224 @@ class Geo(object):
         lat1 = np.deg2rad(lat1)
         lon1 = np.deg2rad(lon1)
 
-        dist = np.arccos(
-            np.cos(lat0) * np.sin(lat1) + np.cos(lat0) * np.cos(lat1) * np.cos(lon0 - lon1)
-        ) * self.__earth_radius_nmi
+        # Spherical law of cosines; rounding can push the cosine just past +/-1 for (near) coincident points
+        dist = np.arccos(np.clip(
+            np.sin(lat0) * np.sin(lat1) + np.cos(lat0) * np.cos(lat1) * np.cos(lon0 - lon1), -1.0, 1.0
+        )) * self.__earth_radius_nmi
         return dist
 
     @staticmethod
-    def __reference_values(system, lon_ref, lat_ref, alt_ref):
-        b = constants.SEMI_MAJOR_AXIS_A * (1 - constants.RECIPROCAL_FLATTENING)
-        e = np.sqrt((constants.SEMI_MAJOR_AXIS_A ** 2 - b ** 2) / (constants.SEMI_MAJOR_AXIS_A ** 2))
-        e2 = (2 * constants.RECIPROCAL_FLATTENING) - (constants.RECIPROCAL_FLATTENING ** 2)
+    def __as_lat_lon_columns(lat_lon) -> tuple:
+        lat_lon = np.asarray(lat_lon, dtype=float)
+        if lat_lon.size == 0:
+            # An empty set, e.g. [], has no rows rather than one malformed one
+            lat_lon = lat_lon.reshape(0, 2)
+        elif lat_lon.ndim == 1:
+            lat_lon = lat_lon.reshape(1, 2)
+        if lat_lon.ndim != 2 or lat_lon.shape[1] != 2:
+            raise ValueError(f'Coordinate sets must be nx2 [lat, lon], not {lat_lon.shape}')
+        return np.radians(lat_lon[:, 0]), np.radians(lat_lon[:, 1])
+
+    def __haversine_nmi(self, lat0, lon0, lat1, lon1):
+        """Haversine distance in nmi between broadcastable radian arrays"""
+        a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+        return 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))) * self.__earth_radius_nmi
 
-        chi_ref = np.sqrt(1 - e2 * np.power(np.sin(lat_ref), 2))
-        part_one = np.multiply(np.divide(constants.SEMI_MAJOR_AXIS_A, chi_ref) + alt_ref, np.cos(lat_ref))
+    @staticmethod
+    def __vincenty_nmi(lat0, lon0, lat1, lon1):
+        """Vincenty inverse distance in nmi on WGS-84 between broadcastable radian arrays"""
+        a = constants.SEMI_MAJOR_AXIS_A
+        f = constants.RECIPROCAL_FLATTENING
+        b = a * (1 - f)
+        lat0, lon0, lat1, lon1 = np.broadcast_arrays(lat0, lon0, lat1, lon1)
+
+        big_l = lon1 - lon0
+        u1 = np.arctan((1 - f) * np.tan(lat0))
+        u2 = np.arctan((1 - f) * np.tan(lat1))
+        sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+        sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+        lam = big_l
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for _ in range(200):
+                sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+                sin_sigma = np.sqrt((cos_u2 * sin_lam) ** 2 + (cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam) ** 2)
+                cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+                sigma = np.arctan2(sin_sigma, cos_sigma)
+                sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+                cos_sq_alpha = 1 - sin_alpha ** 2
+                cos_2sigma_m = np.where(cos_sq_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha)
+                c = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+                lam_prev = lam
+                lam = big_l + (1 - c) * f * sin_alpha * (
+                    sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+                )
+                if not (np.abs(lam - lam_prev) > 1e-12).any():
+                    break
+
+        u_sq = cos_sq_alpha * (a ** 2 - b ** 2) / (b ** 2)
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = big_b * sin_sigma * (
+            cos_2sigma_m + big_b / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+            )
+        )
+        return b * big_a * (sigma - delta_sigma) / constants.NM_TO_METERS
+
+    def iter_pairwise_distance(self, lat_lon_a, lat_lon_b, method='haversine', chunk_size=2048):
+        """
+        Yield the N x M distance matrix between two coordinate sets one block of rows at a time
+        Parameters
+        __________
+        lat_lon_a, lat_lon_b: np.ndarray or pd.DataFrame
+            nx2 and mx2 sets of [lat, lon] in decimal degrees
+        method: str
+            'haversine' (spherical, earth_radius_nmi) or 'vincenty' (WGS-84 ellipsoid)
+        chunk_size: int
+            Rows of lat_lon_a per block; peak memory is roughly chunk_size * m * 8 bytes per temporary
+        Yields
+        ______
+        (row_start, distances_nmi): int, np.ndarray of shape (<= chunk_size, m)
+        """
+        methods = {'haversine': self.__haversine_nmi, 'vincenty': self.__vincenty_nmi}
+        if method not in methods:
+            raise ValueError(f'{method} is not a valid distance method. Choose from {list(methods)}')
+        distance = methods[method]
+
+        lat_a, lon_a = self.__as_lat_lon_columns(lat_lon_a)
+        lat_b, lon_b = self.__as_lat_lon_columns(lat_lon_b)
+        lat_b = lat_b.reshape(1, -1)
+        lon_b = lon_b.reshape(1, -1)
+        chunk_size = max(int(chunk_size), 1)
+        for start in range(0, lat_a.size, chunk_size):
+            stop = start + chunk_size
+            yield start, distance(lat_a[start:stop, None], lon_a[start:stop, None], lat_b, lon_b)
+
+    def pairwise_distance(self, lat_lon_a, lat_lon_b, method='haversine', chunk_size=2048) -> np.ndarray:
+        """Full N x M distance matrix in nmi (see iter_pairwise_distance)"""
+        n = self.__as_lat_lon_columns(lat_lon_a)[0].size
+        m = self.__as_lat_lon_columns(lat_lon_b)[0].size
+        distances = np.empty((n, m))
+        for start, block in self.iter_pairwise_distance(lat_lon_a, lat_lon_b, method, chunk_size):
+            distances[start:start + block.shape[0]] = block
+
+        return distances
+
+    def pairwise_within(self, lat_lon_a, lat_lon_b, max_nmi, method='haversine', chunk_size=2048) -> tuple:
+        """
+        Sparse result of every pair closer than max_nmi
+        Returns
+        _______
+        (rows, cols, distances_nmi): indexes into lat_lon_a and lat_lon_b with their separation
+        """
+        rows, cols, dists = [], [], []
+        for start, block in self.iter_pairwise_distance(lat_lon_a, lat_lon_b, method, chunk_size):
+            row, col = np.nonzero(block <= max_nmi)
+            rows.append(row + start)
+            cols.append(col)
+            dists.append(block[row, col])
+
+        if not rows:
+            return np.empty(0, dtype=int), np.empty(0, dtype=int), np.empty(0)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(dists)
+
+    def pairwise_nearest(self, lat_lon_a, lat_lon_b, k=1, method='haversine', chunk_size=2048) -> tuple:
+        """
+        The k nearest members of lat_lon_b for each row of lat_lon_a, closest first
+        Returns
+        _______
+        (indexes, distances_nmi): np.ndarray of shape (n, k)
+        """
+        m = self.__as_lat_lon_columns(lat_lon_b)[0].size
+        if not 0 < k <= m:
+            raise ValueError(f'k must be between 1 and {m}, not {k}')
+        indexes, distances = [], []
+        for start, block in self.iter_pairwise_distance(lat_lon_a, lat_lon_b, method, chunk_size):
+            if k < m:
+                part = np.argpartition(block, k - 1, axis=1)[:, :k]
+            else:
+                part = np.tile(np.arange(m), (block.shape[0], 1))
+            part_dist = np.take_along_axis(block, part, axis=1)
+            order = np.argsort(part_dist, axis=1)
+            indexes.append(np.take_along_axis(part, order, axis=1))
+            distances.append(np.take_along_axis(part_dist, order, axis=1))
+
+        if not indexes:
+            return np.empty((0, k), dtype=int), np.empty((0, k))
+        return np.concatenate(indexes), np.concatenate(distances)
+
+
+class LocalTangentPlane(object):
+    """
+    East-North-Up frame anchored at a sensor reference (lat, lon in degrees, alt in metres)
+
+    The ECEF->ENU rotation and the reference ECEF position are computed once, so every conversion
+    is a single matrix multiply (plus the geodetic solve for enu_to_lla). Use for_site to share
+    projectors between callers working on the same sensor.
+    """
+
+    def __init__(self, lat, lon, alt=0.0):
+        self.reference = (float(lat), float(lon), float(alt))
+        x, y, z = Geo.lat_lon_to_ecef(np.array([float(lat), float(lon)]), np.array([float(alt)]))
+        self.reference_ecef = np.array([x[0], y[0], z[0]])
+
+        sin_lat, cos_lat = np.sin(np.radians(lat)), np.cos(np.radians(lat))
+        sin_lon, cos_lon = np.sin(np.radians(lon)), np.cos(np.radians(lon))
+        # Rows are the east, north and up unit vectors expressed in ECEF
+        self.rotation = np.array([
+            [-sin_lon, cos_lon, 0.0],
+            [-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat],
+            [cos_lat * cos_lon, cos_lat * sin_lon, sin_lat],
+        ])
+        # for_site hands the same projector to every caller, so its frame must not change in place
+        self.reference_ecef.flags.writeable = False
+        self.rotation.flags.writeable = False
 
-        xr = np.multiply(part_one, np.cos(lon_ref))
-        yr = np.multiply(part_one, np.sin(lon_ref))
-        zr = np.multiply(np.divide(constants.SEMI_MAJOR_AXIS_A * (1 - e2), chi_ref) + alt_ref, np.sin(lat_ref))
+    @staticmethod
+    def for_site(lat, lon, alt=0.0):
+        """Cached projector for a sensor reference; any float-convertible values (e.g. 0-d arrays) are accepted"""
+        return LocalTangentPlane.__cached(float(lat), float(lon), float(alt))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def __cached(lat, lon, alt):
+        return LocalTangentPlane(lat, lon, alt)
 
-        return xr, yr, zr, e
+    def enu_to_ecef(self, enu) -> np.ndarray:
+        """nx3 ENU metres to nx3 ECEF metres"""
+        ecef = np.asarray(enu, dtype=float).reshape(-1, 3) @ self.rotation
+        ecef += self.reference_ecef
+        return ecef
+
+    def ecef_to_enu(self, ecef) -> np.ndarray:
+        """nx3 ECEF metres to nx3 ENU metres"""
+        return (np.asarray(ecef, dtype=float).reshape(-1, 3) - self.reference_ecef) @ self.rotation.T
+
+    def enu_to_lla(self, enu, method='heikkinen', dtype=np.float64) -> np.ndarray:
+        """
+        nx3 ENU metres to a (3, n) array of lat, lon (degrees) and alt (metres)
+        Reduced precision dtypes are solved in float64 chunks of Geo.PRECISION_CHUNK points.
+        """
+        if np.dtype(dtype) == np.float64:
+            ecef = self.enu_to_ecef(enu)
+            return np.array(Geo.ecef_to_lat_lon_alt(ecef[:, 0], ecef[:, 1], ecef[:, 2], method=method))
+
+        enu = np.asarray(enu).reshape(-1, 3)
+        lla = np.empty((3, enu.shape[0]), dtype=dtype)
+        for start in range(0, enu.shape[0], Geo.PRECISION_CHUNK):
+            chunk = slice(start, start + Geo.PRECISION_CHUNK)
+            ecef = self.enu_to_ecef(enu[chunk].astype(np.float64))
+            lla[:, chunk] = Geo.ecef_to_lat_lon_alt(ecef[:, 0], ecef[:, 1], ecef[:, 2], method=method)
+        return lla
+
+    def lla_to_enu(self, lat_lon, alt) -> np.ndarray:
+        """nx2 [lat, lon] degrees and n altitudes in metres to nx3 ENU metres"""
+        lat_lon = np.asarray(lat_lon, dtype=float).reshape(-1, 2)
+        alt = np.broadcast_to(np.asarray(alt, dtype=float), (lat_lon.shape[0],))
+        x, y, z = Geo.lat_lon_to_ecef(lat_lon, alt)
+        return self.ecef_to_enu(np.column_stack((x, y, z)))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,291 @@
+import os
+import numpy as np
+import pandas as pd
+from Libs import GeoTools
+
+ACPS_PER_SCAN = 4096
+
+PLOT_COLUMNS = ["time", "radar_id", "range_nmi", "az_acps"]
+# Fixed-size little-endian record used by binary plot recordings
+PLOT_RECORD = np.dtype([("time", "<f8"), ("radar_id", "S8"), ("range_nmi", "<f4"), ("az_acps", "<f4")])
+
+
+class AcpConverter(object):
+    """
+    Fast (range, ACP) -> (lat, lon) conversion for a single radar
+
+    Exact Vincenty positions are tabulated once for every ACP and every range_step_nmi out to
+    max_range_nmi; conversions then bilinearly interpolate that table, so each return costs a
+    few array gathers instead of an iterative geodesic solve. Interpolating lat/lon is not uniform
+    over the globe: longitude stretches by 1 / cos(lat), so the error grows toward the poles. With
+    the default 1 NM step and 256 NM range the largest error against
+    Geo.lat_lon_from_reference_batch_range_az_degrees is about 0.15 m at the equator, 0.2 m at 60 deg,
+    0.3 m at 72 deg (northern Alaska), 0.5 m at 78 deg and over 1 m above 83 deg, reaching hundreds of
+    metres once the coverage spans a pole. A smaller range_step_nmi only helps at high latitude
+    (0.25 m at 80 deg with 0.5 NM); the 0.14 m floor comes from interpolating between ACPs. Use
+    estimate_error_m to check a given site and settings. Fractional ACPs are interpolated in azimuth;
+    ranges outside [0, max_range_nmi] and ACPs outside [0, 4096] come back as NaN.
+    """
+
+    def __init__(self, lat, lon, max_range_nmi=256.0, range_step_nmi=1.0, geo=None):
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        self.lat = float(lat)
+        self.lon = float(lon)
+        self.max_range_nmi = float(max_range_nmi)
+        self.range_step_nmi = float(range_step_nmi)
+        num_ranges = int(np.ceil(self.max_range_nmi / self.range_step_nmi)) + 1
+
+        # Row ACPS_PER_SCAN repeats ACP 0 so interpolation wraps through north without a modulo
+        acps = np.arange(ACPS_PER_SCAN + 1)
+        ranges = np.arange(num_ranges) * self.range_step_nmi
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.lat, self.lon, ranges[None, :], (360.0 * acps[:, None] / ACPS_PER_SCAN) % 360.0
+        )
+        self._lat_table = lats
+        # Longitudes are stored as offsets so the table is continuous across the antimeridian
+        self._lon_table = (lons - self.lon + 180.0) % 360.0 - 180.0
+
+    @classmethod
+    def from_radars(cls, radars, lat_col="Radar_Lat", lon_col="Radar_Lon", id_col="Radar_ID", **kwargs) -> dict:
+        """One converter per radar in a Terminal.radars / EnRoute.radars frame, keyed on Radar_ID"""
+        radars = radars.dropna(subset=[lat_col, lon_col])
+        return {
+            radar_id: cls(lat, lon, **kwargs)
+            for radar_id, lat, lon in zip(radars[id_col], radars[lat_col], radars[lon_col])
+        }
+
+    def convert(self, range_nmi, az_acps) -> tuple:
+        """
+        Parameters
+        __________
+        range_nmi: np.ndarray
+            Ground ranges in nautical miles
+        az_acps: np.ndarray
+            Azimuths in ACPs (0 - 4096), integer or fractional
+        Returns
+        _______
+        (lats, lons): np.ndarray
+        """
+        range_nmi, az_acps = np.broadcast_arrays(
+            np.asarray(range_nmi, dtype=float), np.asarray(az_acps, dtype=float)
+        )
+        range_pos = range_nmi / self.range_step_nmi
+        # A corrupt return is dropped to NaN rather than failing the whole block
+        valid = (range_nmi >= 0) & (range_nmi <= self.max_range_nmi) & (az_acps >= 0) & (az_acps <= ACPS_PER_SCAN)
+        last_range = self._lat_table.shape[1] - 2
+        r0 = np.clip(np.floor(np.where(valid, range_pos, 0.0)).astype(np.int64), 0, last_range)
+        tr = np.where(valid, range_pos, 0.0) - r0
+
+        acp_pos = np.where(valid & (az_acps < ACPS_PER_SCAN), az_acps, 0.0)
+        a0 = np.floor(acp_pos).astype(np.int64)
+        ta = acp_pos - a0
+
+        lats = self.__bilinear(self._lat_table, a0, r0, ta, tr)
+        lons = self.__bilinear(self._lon_table, a0, r0, ta, tr) + self.lon
+        lons = (lons + 180.0) % 360.0 - 180.0
+        lats[~valid] = np.nan
+        lons[~valid] = np.nan
+        return lats, lons
+
+    @staticmethod
+    def __bilinear(table, a0, r0, ta, tr):
+        near = table[a0, r0] + (table[a0, r0 + 1] - table[a0, r0]) * tr
+        far = table[a0 + 1, r0] + (table[a0 + 1, r0 + 1] - table[a0 + 1, r0]) * tr
+        return near + (far - near) * ta
+
+    def estimate_error_m(self, num_samples=20000, seed=0) -> float:
+        """Largest distance (metres) between convert() and the exact solution over random returns"""
+        rng = np.random.default_rng(seed)
+        range_nmi = rng.uniform(0.0, self.max_range_nmi, num_samples)
+        az_acps = rng.uniform(0.0, ACPS_PER_SCAN, num_samples)
+        lats, lons = self.convert(range_nmi, az_acps)
+        exact_lats, exact_lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.lat, self.lon, range_nmi, 360.0 * az_acps / ACPS_PER_SCAN
+        )
+        zeros = np.zeros(num_samples)
+        approx = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.column_stack((lats, lons)), zeros))
+        exact = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.column_stack((exact_lats, exact_lons)), zeros))
+        return float(np.linalg.norm(approx - exact, axis=1).max())
+
+    @property
+    def table_bytes(self) -> int:
+        return self._lat_table.nbytes + self._lon_table.nbytes
+
+
+def iter_plot_records(file_path, block_size=100000, record_dtype=PLOT_RECORD):
+    """
+    Read a radar plot recording in blocks of at most block_size records
+    Parameters
+    __________
+    file_path: str
+        .csv/.txt file with time, radar_id, range_nmi, az_acps columns, or a binary file of record_dtype records
+    block_size: int
+        Records per block; memory use is bounded by this, not by the recording length
+    Returns
+    _______
+    generator of pd.DataFrame with PLOT_COLUMNS
+    """
+    if os.path.splitext(file_path)[1].lower() in (".csv", ".txt"):
+        for block in pd.read_csv(file_path, usecols=PLOT_COLUMNS, dtype={"radar_id": str}, chunksize=block_size):
+            yield block[PLOT_COLUMNS].reset_index(drop=True)
+        return
+
+    with open(file_path, "rb") as f:
+        while True:
+            records = np.fromfile(f, dtype=record_dtype, count=block_size)
+            if records.size == 0:
+                break
+            yield pd.DataFrame({
+                "time": records["time"],
+                "radar_id": np.char.decode(np.char.strip(records["radar_id"]), "ascii"),
+                "range_nmi": records["range_nmi"].astype(float),
+                "az_acps": records["az_acps"].astype(float),
+            })
+
+
+class PlotIngestor(object):
+    """
+    Convert streamed (time, radar_id, range_nmi, az_acps) plot records to lat/lon
+    Parameters
+    __________
+    radars: pd.DataFrame or list of pd.DataFrame
+        Radar reference positions, e.g. [EnRoute.radars, Terminal.radars]; the first row per Radar_ID wins
+    method: str
+        'lookup' for per-radar AcpConverter tables (fast, sub-metre error below about 80 deg latitude) or
+        'exact' for the Vincenty solver
+    max_range_nmi: float
+        Returns beyond this range are dropped to NaN by both methods
+    """
+
+    def __init__(self, radars, method="lookup", geo=None, lat_col="Radar_Lat", lon_col="Radar_Lon",
+                 id_col="Radar_ID", max_range_nmi=256.0):
+        if method not in ("lookup", "exact"):
+            raise ValueError(f"{method} is not a valid method. Use 'lookup' or 'exact'.")
+        if isinstance(radars, pd.DataFrame):
+            radars = [radars]
+        radars = pd.concat([frame[[id_col, lat_col, lon_col]] for frame in radars], ignore_index=True)
+        radars = radars.dropna().drop_duplicates(subset=id_col)
+        self.positions = pd.DataFrame(
+            {"lat": radars[lat_col].to_numpy(dtype=float), "lon": radars[lon_col].to_numpy(dtype=float)},
+            index=radars[id_col].astype(str).str.strip(),
+        )
+        self.method = method
+        self.max_range_nmi = float(max_range_nmi)
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        self._converters = {}
+
+    def converter(self, radar_id) -> AcpConverter:
+        """Lookup table for one radar, built on first use"""
+        if radar_id not in self._converters:
+            lat, lon = self.positions.loc[radar_id]
+            self._converters[radar_id] = AcpConverter(lat, lon, max_range_nmi=self.max_range_nmi, geo=self._geo)
+        return self._converters[radar_id]
+
+    def convert(self, block: pd.DataFrame) -> pd.DataFrame:
+        """Add lat/lon columns to a block of plot records (any index); records from unknown radars get NaN"""
+        lats = np.full(len(block), np.nan)
+        lons = np.full(len(block), np.nan)
+        radar_ids = block["radar_id"].astype(str).str.strip()
+        known = radar_ids.isin(self.positions.index).to_numpy()
+        range_nmi = block["range_nmi"].to_numpy(dtype=float)
+        az_acps = block["az_acps"].to_numpy(dtype=float)
+
+        if self.method == "exact":
+            # Returns AcpConverter would reject (range or ACP out of bounds) stay NaN here too
+            rows = known & (range_nmi >= 0) & (range_nmi <= self.max_range_nmi)
+            rows &= (az_acps >= 0) & (az_acps <= ACPS_PER_SCAN)
+            reference = self.positions.loc[radar_ids[rows]]
+            lats[rows], lons[rows] = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+                reference["lat"].to_numpy(), reference["lon"].to_numpy(), range_nmi[rows],
+                360.0 * az_acps[rows] / ACPS_PER_SCAN,
+            )
+        else:
+            # Codes are positional, so the block's own index never matters
+            codes, radar_names = pd.factorize(radar_ids.to_numpy()[known])
+            known_rows = np.flatnonzero(known)
+            for code, radar_id in enumerate(radar_names):
+                rows = known_rows[codes == code]
+                lats[rows], lons[rows] = self.converter(radar_id).convert(range_nmi[rows], az_acps[rows])
+
+        block = block.copy()
+        block["lat"] = lats
+        block["lon"] = lons
+        return block
+
+    def iter_batches(self, file_path, block_size=100000, record_dtype=PLOT_RECORD):
+        """Generator of converted blocks from a plot recording"""
+        for block in iter_plot_records(file_path, block_size=block_size, record_dtype=record_dtype):
+            yield self.convert(block)
+
+    def ingest(self, file_path, consumers, block_size=100000, record_dtype=PLOT_RECORD):
+        """
+        Stream a plot recording through one or more consumers
+        Parameters
+        __________
+        consumers: callable or list of callables
+            Each is called with every converted block; a close() method is called once the file is done
+        Returns
+        _______
+        list of the consumers
+        """
+        if callable(consumers):
+            consumers = [consumers]
+        for batch in self.iter_batches(file_path, block_size=block_size, record_dtype=record_dtype):
+            for consumer in consumers:
+                consumer(batch)
+
+        for consumer in consumers:
+            close = getattr(consumer, "close", None)
+            if close is not None:
+                close()
+
+        return consumers
+
+
+class CsvPlotWriter(object):
+    """Append converted plot batches to a CSV file"""
+
+    def __init__(self, file_path, drop_unknown=True):
+        self.file_path = file_path
+        self.drop_unknown = drop_unknown
+        self.count = 0
+        self._file = open(file_path, "w", newline="")
+        self._header_written = False
+
+    def __call__(self, batch: pd.DataFrame):
+        if self.drop_unknown:
+            batch = batch.dropna(subset=["lat", "lon"])
+        # A batch that was dropped entirely still writes the header, so track it separately from count
+        batch.to_csv(self._file, header=not self._header_written, index=False)
+        self._header_written = True
+        self.count += len(batch)
+
+    def close(self):
+        self._file.close()
+
+
+class KmlPlotWriter(object):
+    """
+    Add converted plots to a KmlTools.KmlCreator as points
+    KML documents are built in memory, so every_nth / max_points keep long recordings to a viewable size
+    """
+
+    def __init__(self, kml, parent_node=None, shape=None, color=None, every_nth=1, max_points=None):
+        self.kml = kml
+        self.parent_node = parent_node
+        self.shape = shape
+        self.color = color
+        self.every_nth = every_nth
+        self.max_points = max_points
+        self.count = 0
+        self._seen = 0
+
+    def __call__(self, batch: pd.DataFrame):
+        offset = (-self._seen) % self.every_nth
+        self._seen += len(batch)
+        batch = batch.iloc[offset::self.every_nth].dropna(subset=["lat", "lon"])
+        if self.max_points is not None:
+            batch = batch.iloc[:max(self.max_points - self.count, 0)]
+        for lat, lon in zip(batch["lat"].tolist(), batch["lon"].tolist()):
+            self.kml.add_point(lat, lon, parent_node=self.parent_node, shape=self.shape, color=self.color)
+        self.count += len(batch)
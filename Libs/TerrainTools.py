@@ -0,0 +1,229 @@
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+from Libs import constants, GeoTools
+
+
+class DemSampler(object):
+    """
+    Sample a geographic (lat/lon) DEM at arbitrary points using block-sized windowed reads
+
+    Only the DEM blocks that contain sample points are read, so a 250 NM viewshed against a
+    CONUS-sized raster touches a few hundred small windows instead of loading the whole file.
+    Points outside the raster or on nodata cells are returned as fill_value.
+    """
+
+    def __init__(self, dem_path, band=1, block_size=512, fill_value=0.0):
+        self.dem_path = dem_path
+        self.band = band
+        self.block_size = block_size
+        self.fill_value = fill_value
+        self._dataset = rasterio.open(dem_path)
+        if self._dataset.crs is not None and not self._dataset.crs.is_geographic:
+            self._dataset.close()
+            raise ValueError(f"{dem_path} must be in a geographic (lat/lon) CRS, not {self._dataset.crs}")
+        self._inverse = ~self._dataset.transform
+
+    def close(self):
+        self._dataset.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def sample(self, lats, lons) -> np.ndarray:
+        """Elevations (metres) at broadcastable lat/lon arrays"""
+        lats, lons = np.broadcast_arrays(np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+        inv = self._inverse
+        cols = np.floor(inv.a * lons + inv.b * lats + inv.c).astype(np.int64).ravel()
+        rows = np.floor(inv.d * lons + inv.e * lats + inv.f).astype(np.int64).ravel()
+        elevation = np.full(rows.size, self.fill_value, dtype=float)
+
+        inside = (rows >= 0) & (rows < self._dataset.height) & (cols >= 0) & (cols < self._dataset.width)
+        points = np.nonzero(inside)[0]
+        block_rows = rows[points] // self.block_size
+        block_cols = cols[points] // self.block_size
+        num_block_cols = self._dataset.width // self.block_size + 1
+        block_ids = block_rows * num_block_cols + block_cols
+        order = np.argsort(block_ids, kind="stable")
+        points, block_ids = points[order], block_ids[order]
+        splits = np.nonzero(np.diff(block_ids))[0] + 1
+
+        nodata = self._dataset.nodata
+        for block in np.split(points, splits):
+            if block.size == 0:
+                continue
+            row_off = (rows[block[0]] // self.block_size) * self.block_size
+            col_off = (cols[block[0]] // self.block_size) * self.block_size
+            window = Window(
+                col_off, row_off,
+                min(self.block_size, self._dataset.width - col_off),
+                min(self.block_size, self._dataset.height - row_off),
+            )
+            data = self._dataset.read(self.band, window=window)
+            values = data[rows[block] - row_off, cols[block] - col_off].astype(float)
+            if nodata is not None:
+                values[values == nodata] = self.fill_value
+            elevation[block] = values
+
+        return elevation.reshape(lats.shape)
+
+
+class Viewshed(object):
+    """
+    Terrain-aware radial line-of-sight coverage for a sensor against a DEM
+    Parameters
+    __________
+    dem: str or DemSampler
+        Path to a geographic GeoTIFF (or an open DemSampler to share between sensors)
+    num_azimuths: int
+        Radials swept around the sensor
+    range_step_nmi: float
+        Sample spacing along each radial
+    max_range_nmi: float
+        Length of each radial
+    k_factor: float
+        Effective earth radius factor used for the curvature drop
+    """
+
+    def __init__(self, dem, num_azimuths=360, range_step_nmi=0.25, max_range_nmi=250.0, k_factor=4.0 / 3.0,
+                 geo=None):
+        self._dem = dem if isinstance(dem, DemSampler) else DemSampler(dem)
+        self._geo = geo if geo is not None else GeoTools.Geo()
+        self.azimuths = np.arange(num_azimuths) * (360.0 / num_azimuths)
+        self.ranges_nmi = np.arange(1, int(np.floor(max_range_nmi / range_step_nmi)) + 1) * range_step_nmi
+        self.effective_radius_m = k_factor * self._geo.earth_radius_nmi * constants.NM_TO_METERS
+
+    def compute(self, lat, lon, antenna_height_ft, altitudes_ft=(1500.0,), altitude_reference="msl"):
+        """
+        Parameters
+        __________
+        lat, lon: float
+            Sensor position
+        antenna_height_ft: float
+            Antenna height above the DEM ground elevation at the sensor
+        altitudes_ft: array-like
+            Target altitudes
+        altitude_reference: str
+            'msl' for altitudes above mean sea level, 'agl' for altitudes above the local terrain
+        Returns
+        _______
+        ViewshedResult
+        """
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            lat, lon, self.ranges_nmi[None, :], self.azimuths[:, None]
+        )
+        terrain = self._dem.sample(lats, lons)
+        antenna_m = float(self._dem.sample(lat, lon)) + antenna_height_ft * constants.FEET_TO_METERS
+
+        distance_m = self.ranges_nmi * constants.NM_TO_METERS
+        drop_m = np.square(distance_m) / (2 * self.effective_radius_m)
+        # Elevation angle (as a slope) to each terrain sample and the running maximum along each radial
+        terrain_slope = (terrain - drop_m - antenna_m) / distance_m
+        horizon_slope = np.maximum.accumulate(terrain_slope, axis=1)
+        # Targets are blocked by terrain strictly before them on the radial
+        blocking_slope = np.full_like(horizon_slope, -np.inf)
+        blocking_slope[:, 1:] = horizon_slope[:, :-1]
+
+        altitudes_m = np.atleast_1d(np.asarray(altitudes_ft, dtype=float)) * constants.FEET_TO_METERS
+        if altitude_reference.lower() == "agl":
+            target_m = terrain[None, :, :] + altitudes_m[:, None, None]
+        elif altitude_reference.lower() == "msl":
+            target_m = np.broadcast_to(altitudes_m[:, None, None], (altitudes_m.size,) + terrain.shape)
+        else:
+            raise ValueError(f"{altitude_reference} is not a valid altitude reference. Use 'msl' or 'agl'.")
+        target_slope = (target_m - drop_m - antenna_m) / distance_m
+        visible = (target_slope >= blocking_slope[None]) & (target_m >= terrain[None])
+
+        return ViewshedResult(
+            (lat, lon), self.azimuths, self.ranges_nmi, np.atleast_1d(altitudes_ft), lats, lons, terrain,
+            np.degrees(np.arctan(horizon_slope)), visible, self._geo,
+        )
+
+    def compute_radars(self, radars, antenna_height_ft=50.0, altitudes_ft=(1500.0,), lat_col="Radar_Lat",
+                       lon_col="Radar_Lon", id_col="Radar_ID", **kwargs) -> dict:
+        """Viewsheds for every radar in a Terminal.radars / EnRoute.radars frame, keyed on Radar_ID"""
+        radars = radars.dropna(subset=[lat_col, lon_col])
+        return {
+            radar_id: self.compute(lat, lon, antenna_height_ft, altitudes_ft, **kwargs)
+            for radar_id, lat, lon in zip(radars[id_col], radars[lat_col], radars[lon_col])
+        }
+
+
+class ViewshedResult(object):
+    """Output of Viewshed.compute; arrays are (azimuths, ranges) or (altitudes, azimuths, ranges)"""
+
+    def __init__(self, observer, azimuths, ranges_nmi, altitudes_ft, lats, lons, terrain_m, horizon_deg, visible,
+                 geo):
+        self.observer = observer
+        self.azimuths = azimuths
+        self.ranges_nmi = ranges_nmi
+        self.altitudes_ft = altitudes_ft
+        self.lats = lats
+        self.lons = lons
+        self.terrain_m = terrain_m
+        self.horizon_deg = horizon_deg
+        self.visible = visible
+        self._geo = geo
+
+    @property
+    def max_range_nmi(self) -> np.ndarray:
+        """
+        (altitudes, azimuths) range to the first blocked sample on each radial, i.e. the extent of
+        unbroken coverage; see azimuth_limits_nmi for a HorizonCoverage row
+        """
+        blocked = ~self.visible
+        first_blocked = np.where(blocked.any(axis=2), blocked.argmax(axis=2), self.ranges_nmi.size)
+        padded = np.concatenate(([0.0], self.ranges_nmi))
+        return padded[first_blocked]
+
+    def azimuth_limits_nmi(self, altitude_index=0) -> np.ndarray:
+        """(azimuths,) unbroken coverage at one altitude: this radar's row of HorizonCoverage azimuth_limits_nmi"""
+        return self.max_range_nmi[altitude_index]
+
+    def polygon(self, altitude_index=0) -> list:
+        """Unbroken coverage outline at one altitude as [(lat, lon), ...] for KmlCreator.add_polygon"""
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.observer[0], self.observer[1], self.max_range_nmi[altitude_index], self.azimuths
+        )
+        return list(zip(np.append(lats, lats[0]).tolist(), np.append(lons, lons[0]).tolist()))
+
+    def kml_tiles(self, altitude_index=0) -> list:
+        """
+        One wedge per visible run along each radial, as [(lon, lat, alt), ...] rings for KmlCreator.add_tiles
+        """
+        visible = self.visible[altitude_index]
+        half_step = (self.azimuths[1] - self.azimuths[0]) / 2 if self.azimuths.size > 1 else 180.0
+        step = self.ranges_nmi[0]
+        padded = np.zeros((visible.shape[0], visible.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = visible
+        edges = np.diff(padded, axis=1)
+        az_start, run_start = np.nonzero(edges == 1)
+        _, run_stop = np.nonzero(edges == -1)
+        if az_start.size == 0:
+            return []
+        # Runs cover samples [start, stop); each sample is the cell ending at its range
+        inner = self.ranges_nmi[run_start] - step
+        outer = self.ranges_nmi[run_stop - 1]
+        azimuth = self.azimuths[az_start]
+        ranges = np.stack((inner, inner, outer, outer, inner), axis=1)
+        bearings = np.stack((azimuth - half_step, azimuth + half_step, azimuth + half_step, azimuth - half_step,
+                             azimuth - half_step), axis=1) % 360.0
+        lats, lons = self._geo.lat_lon_from_reference_batch_range_az_degrees(
+            self.observer[0], self.observer[1], ranges, bearings
+        )
+        alt_m = float(self.altitudes_ft[altitude_index]) * constants.FEET_TO_METERS
+        return [[(lon, lat, alt_m) for lat, lon in zip(lat_row, lon_row)]
+                for lat_row, lon_row in zip(lats.tolist(), lons.tolist())]
+
+
+def horizon_azimuth_limits(viewsheds, altitude_index=0) -> np.ndarray:
+    """
+    Stack viewsheds (a list, or the dict from Viewshed.compute_radars, in radar order) into the (radars, azimuths)
+    azimuth_limits_nmi of a HorizonCoverage built with the same num_azimuths, for the altitude at altitude_index
+    """
+    if isinstance(viewsheds, dict):
+        viewsheds = viewsheds.values()
+    return np.stack([viewshed.azimuth_limits_nmi(altitude_index) for viewshed in viewsheds])
@@ -4,6 +4,8 @@ RADARS_WITH_CLASS = (
 )
 RADARS= DATA_PATH + "/Radars_ALL.xlsx"
 RADIOS = DATA_PATH + "/radio_locations.xlsx"
+RING_CACHE = DATA_PATH + "/ring_cache.pkl"
+WORKBOOK_CACHE = DATA_PATH + "/workbook_cache"
 
 """ Constants """
 METERS_TO_FEET = 3.2808399
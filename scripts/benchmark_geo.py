@@ -0,0 +1,240 @@
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from Libs import GeoTools, RadarTools, constants
+
+_geo = GeoTools.Geo()
+_rng = np.random.default_rng(0)
+
+# Methods that only take one value per call are looped in Python, so cap their sizes
+_SCALAR_MAX_SIZE = 10 ** 5
+
+
+def _lat_lon(n):
+    return np.column_stack((_rng.uniform(25.0, 48.0, n), _rng.uniform(-125.0, -70.0, n)))
+
+
+def _setup_lat_lon_circle(n):
+    return (38.5, -121.3, 50.0, n)
+
+
+def _run_lat_lon_circle(args):
+    return _geo.lat_lon_circle(*args)
+
+
+def _setup_pairs(n):
+    a, b = _lat_lon(n), _lat_lon(n)
+    return a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+
+
+def _run_distance_between_two_lat_lon(args):
+    return _geo.distance_between_two_lat_lon(*args)
+
+
+def _run_great_circle_distance(args):
+    return _geo.great_circle_distance(*args)
+
+
+def _setup_lat_lon_to_ecef(n):
+    return _lat_lon(n), _rng.uniform(0.0, 3000.0, n)
+
+
+def _run_lat_lon_to_ecef(args):
+    return GeoTools.Geo.lat_lon_to_ecef(*args)
+
+
+def _setup_enu_to_lat_lon_alt(n):
+    enu = np.empty((n, 3))
+    enu[:, :2] = _rng.uniform(-150.0, 150.0, (n, 2)) * constants.NM_TO_METERS
+    enu[:, 2] = 1500 * constants.FEET_TO_METERS
+    return enu, (38.5, -121.3, 20.0)
+
+
+def _run_enu_to_lat_lon_alt(args):
+    return _geo.enu_to_lat_lon_alt(*args)
+
+
+def _setup_parse_latlon(n):
+    lats = _lat_lon(n)[:, 0]
+    return _geo.latlon_dec_to_hhmmss_column(lats, lats)[0].tolist()
+
+
+def _run_parse_latlon(args):
+    return [GeoTools.Geo.parse_latlon(value) for value in args]
+
+
+def _run_hhmmss_to_decimal(args):
+    return [GeoTools.Geo.hhmmss_to_decimal(value) for value in args]
+
+
+def _run_parse_latlon_column(args):
+    return GeoTools.Geo.parse_latlon_column(args)
+
+
+def _setup_acp_returns(n):
+    return _rng.uniform(0.0, 250.0, n), _rng.integers(0, RadarTools.ACPS_PER_SCAN, n)
+
+
+def _run_lat_lon_from_reference_batch(args):
+    return _geo.lat_lon_from_reference_batch_range_az_degrees(
+        38.5, -121.3, args[0], 360.0 * args[1] / RadarTools.ACPS_PER_SCAN
+    )
+
+
+_acp_converter = []
+
+
+def _setup_acp_converter(n):
+    # The lookup table is built once, outside the timed call
+    if not _acp_converter:
+        _acp_converter.append(RadarTools.AcpConverter(38.5, -121.3, geo=_geo))
+    return (_acp_converter[0],) + _setup_acp_returns(n)
+
+
+def _run_acp_converter(args):
+    return args[0].convert(args[1], args[2])
+
+
+# name -> (setup(n), run(args), maximum input size)
+BENCHMARKS = {
+    "lat_lon_circle": (_setup_lat_lon_circle, _run_lat_lon_circle, 10 ** 7),
+    "distance_between_two_lat_lon": (_setup_pairs, _run_distance_between_two_lat_lon, 10 ** 7),
+    "great_circle_distance": (_setup_pairs, _run_great_circle_distance, 10 ** 7),
+    "lat_lon_to_ecef": (_setup_lat_lon_to_ecef, _run_lat_lon_to_ecef, 10 ** 7),
+    "enu_to_lat_lon_alt": (_setup_enu_to_lat_lon_alt, _run_enu_to_lat_lon_alt, 10 ** 7),
+    "parse_latlon": (_setup_parse_latlon, _run_parse_latlon, _SCALAR_MAX_SIZE),
+    "hhmmss_to_decimal": (_setup_parse_latlon, _run_hhmmss_to_decimal, _SCALAR_MAX_SIZE),
+    "parse_latlon_column": (_setup_parse_latlon, _run_parse_latlon_column, 10 ** 6),
+    "lat_lon_from_reference_batch": (_setup_acp_returns, _run_lat_lon_from_reference_batch, 10 ** 7),
+    "acp_converter": (_setup_acp_converter, _run_acp_converter, 10 ** 7),
+}
+
+
+def measure(run, args, repeats=5, min_time=0.2) -> dict:
+    """Best-of-repeats latency and the peak traced allocation of one call"""
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        run(args)
+        latencies.append(time.perf_counter() - t0)
+        # Large inputs are slow enough that one sample is representative
+        if latencies[-1] > min_time:
+            break
+
+    # Memory is traced in its own call so tracing overhead does not skew the timings
+    tracemalloc.start()
+    run(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"latency_s": min(latencies), "median_s": float(np.median(latencies)), "peak_bytes": peak}
+
+
+def run_benchmarks(names=None, max_size=10 ** 7, repeats=5, verbose=True) -> dict:
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, run, method_max = BENCHMARKS[name]
+        results[name] = {}
+        n = 1
+        while n <= min(max_size, method_max):
+            stats = measure(run, setup(n), repeats=repeats)
+            stats["throughput_per_s"] = n / stats["latency_s"] if stats["latency_s"] else float("inf")
+            results[name][str(n)] = stats
+            if verbose:
+                print(
+                    f"{name:30s} n={n:>9d} latency={stats['latency_s'] * 1e3:10.3f} ms "
+                    f"throughput={stats['throughput_per_s']:14.0f}/s peak={stats['peak_bytes'] / 2 ** 20:9.2f} MiB"
+                )
+            n *= 10
+
+    return results
+
+
+# (absolute, relative) noise per metric: a change must exceed both the absolute floor, which
+# absorbs timer / allocator jitter on tiny inputs, and the relative share of the baseline,
+# which absorbs run-to-run variance on large ones
+NOISE_FLOOR = {"latency_s": (1e-4, 0.10), "peak_bytes": (64 * 1024, 0.10)}
+
+
+def compare(results: dict, baseline: dict, threshold=1.25) -> list:
+    """Return (name, n, metric, ratio) for every latency or memory value worse than threshold x baseline
+
+    Differences within max(absolute, relative x baseline) of NOISE_FLOOR are never reported, whatever the threshold
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for n, stats in sizes.items():
+            base = baseline.get("results", {}).get(name, {}).get(n)
+            if base is None:
+                continue
+            for metric, (absolute, relative) in NOISE_FLOOR.items():
+                if stats[metric] - base[metric] <= max(absolute, relative * base[metric]):
+                    continue
+                if base[metric] > 0 and stats[metric] / base[metric] > threshold:
+                    regressions.append((name, n, metric, stats[metric] / base[metric]))
+
+    return regressions
+
+
+def plot_scaling(results: dict, file_name: str):
+    import matplotlib.pyplot as plt
+
+    fig, (ax_latency, ax_memory) = plt.subplots(1, 2, figsize=(12, 5))
+    for name, sizes in results.items():
+        n = [int(size) for size in sizes]
+        ax_latency.loglog(n, [stats["latency_s"] for stats in sizes.values()], marker="o", label=name)
+        ax_memory.loglog(n, [max(stats["peak_bytes"], 1) for stats in sizes.values()], marker="o", label=name)
+    ax_latency.set(xlabel="input size", ylabel="latency (s)", title="Geo latency")
+    ax_memory.set(xlabel="input size", ylabel="peak bytes", title="Geo peak memory")
+    ax_latency.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(file_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for GeoTools.Geo")
+    parser.add_argument("--methods", nargs="*", choices=list(BENCHMARKS), help="subset of benchmarks to run")
+    parser.add_argument("--max-size", type=int, default=10 ** 7, help="largest input size (powers of 10)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="geo_benchmark.json", help="where to write this run")
+    parser.add_argument("--baseline", help="baseline JSON to compare this run against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="ratio above baseline counted as a regression")
+    parser.add_argument("--plot", help="save latency/memory scaling curves to this image file")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": run_benchmarks(args.methods, args.max_size, args.repeats),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.plot:
+        plot_scaling(report["results"], args.plot)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline, args.threshold)
+        for name, n, metric, ratio in regressions:
+            print(f"REGRESSION {name} n={n} {metric} x{ratio:.2f}")
+        if regressions:
+            return 1
+        print("No regressions against", args.baseline)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,15 +42,17 @@ def get_radars(enroute_df: pd.DataFrame, term_df: pd.DataFrame, site: str) -> li
 
 
 def create_sensor_list():
-    enroute = DataTools.EnRoute()
-    enroute.load_radars()
-    term = DataTools.Terminal()
-    term.load_radars()
+    startup = DataTools.load_surveillance(verbose=True)
+    enroute = startup.enroute
+    enroute.load_radars(columns=["Radar_ID", "Airspace_ID"])
+    term = startup.terminal
+    term.load_radars(columns=["Radar_ID", "Airspace_ID"])
     writer = ExcelWriter("sensor_list.xlsx")
+    # Every site's radios from one read of the radio workbook
+    enroute.load_radios(_filter=constants.ERAM_SITES, columns=["RSID"])
     for site in constants.ERAM_SITES:
         print(site)
-        enroute.load_radios(_filter=site)
-        curr_radios = enroute.radios["RSID"].to_list()
+        curr_radios = enroute.radios_by_site[site]["RSID"].to_list()
         curr_radars = get_radars(enroute.radars, term.radars, site)
 
         radar_df = pd.DataFrame({'radars': curr_radars})
@@ -1,7 +1,9 @@
 import pandas as pd
 from Libs import DataTools, KmlTools, GeoTools, constants
 
-_geo = GeoTools.Geo()
+_geo = GeoTools.Geo(ring_cache=GeoTools.RingCache(cache_path=constants.RING_CACHE))
+# Every Terminal / EnRoute shares one parse of each workbook
+_workbooks = DataTools.WorkbookSession()
 
 
 def _get_radar_shape_color(row: pd.Series):
@@ -34,7 +36,8 @@ def _get_radio_shape_color(row: pd.Series):
 def get_indexes(sensor_data: pd.DataFrame, sensor_type: str) -> dict:
     """return the indexes for the given sensor type"""
     filter_idx = {}
-    all_types = set(sensor_data[sensor_type].to_list())
+    # Categorical columns give their observed categories here, and the masks below compare integer codes
+    all_types = sensor_data[sensor_type].unique()
     for _type in all_types:
         if pd.isna(_type):
             filter_idx["N/A"] = pd.isna(sensor_data[sensor_type])
@@ -139,10 +142,13 @@ def plot_eram(data, kml, parent):
     eram_folder = kml.add_folder(parent, name="ERAM Sites")
     data.load_radars()
     data.load_radios()
+    # Split the sensors by ARTCC once instead of masking the full tables for every site
+    radars_by_site = dict(tuple(data.radars.groupby("Airspace_ID", observed=True)))
+    radios_by_sv = dict(tuple(data.radios.groupby("Enclosed By SV.1")))
     for site in constants.ERAM_SITES:
         curr_sv = int(data.sv_map[site])
-        curr_radars = data.radars[data.radars.Airspace_ID == site]
-        curr_radios = data.radios[data.radios["Enclosed By SV.1"] == curr_sv]
+        curr_radars = radars_by_site.get(site, data.radars.iloc[:0])
+        curr_radios = radios_by_sv.get(curr_sv, data.radios.iloc[:0])
         temp_node = kml.add_folder(eram_folder, name=site)
         # Plot the radars for the current ARTCC region
         radar_node = kml.add_folder(temp_node, name="Radars")
@@ -251,7 +257,7 @@ def plot_sv_bounds(sv_regions, kml, parent):
 def create_terminal_data(kml_obj):
     terminal_folder = kml_obj.add_folder(name="Terminal")
 
-    terminal = DataTools.Terminal()
+    terminal = DataTools.Terminal(geo=_geo, workbook_session=_workbooks)
     terminal.load_radars()
     terminal.load_radios()
 
@@ -275,13 +281,16 @@ def main(file_name):
     """Main function"""
     kml_obj = KmlTools.KmlCreator()
     kml_obj.create_kml(file_name)
+    # Parse the radar and radio workbooks side by side before anything reads them
+    DataTools.preload_workbooks(_workbooks, verbose=True)
     # Terminal
     kml_obj = create_terminal_data(kml_obj)
     # EnRoute
-    en_route = DataTools.EnRoute()
+    en_route = DataTools.EnRoute(workbook_session=_workbooks)
     en_route_folder = kml_obj.add_folder(name="En Route")
     kml_obj = plot_eram(en_route, kml_obj, en_route_folder)
     kml_obj.save()
+    _geo.ring_cache.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Libs modules import each other through the Libs package, as the scripts do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def artcc_rings():
+    return {
+        "ZDC": (20, [(37.0, -78.0), (40.0, -78.0), (40.0, -75.0), (37.0, -75.0)]),
+        "ZKC": (30, [(38.0, -102.0), (41.0, -102.0), (41.0, -98.0), (38.0, -98.0)]),
+    }
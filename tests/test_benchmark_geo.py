@@ -0,0 +1,53 @@
+from scripts import benchmark_geo
+
+
+def _stats(latency_s, peak_bytes=0):
+    return {"latency_s": latency_s, "median_s": latency_s, "peak_bytes": peak_bytes}
+
+
+BASELINE = {
+    "meta": {},
+    "results": {
+        "lat_lon_to_ecef": {"1": _stats(2e-6, 1024), "1000000": _stats(2.0, 200 * 2 ** 20)},
+        "parse_latlon": {"1000": _stats(1e-3)},
+    },
+}
+
+
+def test_compare_ignores_noise_on_small_and_large_inputs():
+    results = {
+        "lat_lon_to_ecef": {
+            # Triple the latency and memory, but well inside the absolute floors
+            "1": _stats(6e-6, 3072),
+            # 5% slower and larger: beyond the absolute floors but inside the relative ones
+            "1000000": _stats(2.1, 210 * 2 ** 20),
+        },
+    }
+
+    assert benchmark_geo.compare(results, BASELINE, threshold=1.0) == []
+
+
+def test_compare_reports_regressions_beyond_the_noise_floor():
+    results = {
+        "lat_lon_to_ecef": {"1": _stats(2e-6, 1024), "1000000": _stats(3.0, 300 * 2 ** 20)},
+        "parse_latlon": {"1000": _stats(1.2e-3)},
+    }
+
+    regressions = benchmark_geo.compare(results, BASELINE, threshold=1.25)
+    assert [(name, n, metric) for name, n, metric, _ in regressions] == [
+        ("lat_lon_to_ecef", "1000000", "latency_s"),
+        ("lat_lon_to_ecef", "1000000", "peak_bytes"),
+    ]
+    assert regressions[0][3] == 1.5
+    # 20% slower clears the noise floor, so a lower threshold reports it
+    assert benchmark_geo.compare(results, BASELINE, threshold=1.1)[-1][:3] == ("parse_latlon", "1000", "latency_s")
+
+
+def test_compare_skips_methods_and_sizes_missing_from_the_baseline():
+    results = {
+        "lat_lon_to_ecef": {"10": _stats(10.0)},
+        "acp_converter": {"1": _stats(10.0)},
+    }
+
+    assert benchmark_geo.compare(results, BASELINE) == []
+    assert benchmark_geo.compare(results, {}) == []
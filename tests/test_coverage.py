@@ -0,0 +1,78 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from Libs import CoverageTools
+
+# Three radars so that batch_size=2 needs two batches, the second one partly filled
+OBSERVERS = np.array([[38.85, -77.04, 0.0], [39.5, -76.5, 120.0], [64.8, -147.9, 130.0]])
+# 11 x 11 points in 4 x 4 tiles: tiles along the right and bottom edges are partial
+SPEC = CoverageTools.GridSpec(half_width_nmi=5.0, spacing_nmi=1.0, alt_ft=1500.0, tile_size=4)
+
+# Captured at import so workers forked after a test patches CoverageTools still reach the real shard
+_coverage_shard = CoverageTools._coverage_shard
+
+
+def _serial_grid(observer):
+    grid = np.full((3,) + SPEC.shape, np.nan)
+
+    def collect(tile):
+        rows, cols = tile.shape
+        grid[:, tile.row:tile.row + rows, tile.col:tile.col + cols] = tile.lla.reshape(3, rows, cols)
+
+    CoverageTools.run_coverage_grid(tuple(observer), SPEC, collect)
+    return grid
+
+
+def _crash_once_shard(task):
+    """Kill the worker the first time any shard runs, so the pool breaks mid-batch"""
+    marker = os.environ["COVERAGE_CRASH_MARKER"]
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return _coverage_shard(task)
+
+
+def test_parallel_grids_match_serial_tiles():
+    coverage = CoverageTools.ParallelCoverage(SPEC, workers=2, batch_size=2)
+    grids = coverage.run(OBSERVERS, ids=["A", "B", "C"])
+
+    assert list(grids) == ["A", "B", "C"]
+    for radar_id, observer in zip(grids, OBSERVERS):
+        assert grids[radar_id].shape == (3,) + SPEC.shape
+        np.testing.assert_array_equal(grids[radar_id], _serial_grid(observer))
+    assert sum(stats["points"] for stats in coverage.worker_stats.values()) == 3 * 11 * 11
+
+
+def test_shards_are_retried_after_the_pool_breaks(tmp_path, monkeypatch):
+    monkeypatch.setenv("COVERAGE_CRASH_MARKER", str(tmp_path / "crashed"))
+    monkeypatch.setattr(CoverageTools, "_coverage_shard", _crash_once_shard)
+    grids = CoverageTools.ParallelCoverage(SPEC, workers=2, batch_size=2, retries=1).run(OBSERVERS)
+
+    assert (tmp_path / "crashed").exists()
+    for radar, observer in enumerate(OBSERVERS):
+        np.testing.assert_array_equal(grids[radar], _serial_grid(observer))
+
+
+def test_shared_memory_is_unlinked_when_a_consumer_raises(monkeypatch):
+    created = []
+
+    class RecordingSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, name=None, create=False, size=0, **kwargs):
+            super().__init__(name=name, create=create, size=size, **kwargs)
+            if create:
+                created.append(self.name)
+
+    def consumer(radar_id, lla):
+        raise RuntimeError("consumer failed")
+
+    monkeypatch.setattr(CoverageTools.shared_memory, "SharedMemory", RecordingSharedMemory)
+    with pytest.raises(RuntimeError, match="consumer failed"):
+        CoverageTools.ParallelCoverage(SPEC, workers=2, batch_size=2).run(OBSERVERS, consumer=consumer)
+
+    assert len(created) == 3
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
@@ -0,0 +1,302 @@
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point, Polygon
+
+from Libs import DataTools, GeoTools
+from workbooks import RADIOS, artcc_sheet, write_radio_workbook, write_workbook
+
+
+def test_compact_parses_mixed_decimal_and_dms_coordinates():
+    df = pd.DataFrame({
+        "Radar_ID": ["AAA", "BBB", "CCC", "DDD"],
+        "Radar_Lat": [38.5, "39 30 00N", "40:15:00.000 N", None],
+        "Radar_Lon": ["-77.25", "100 30 00W", -101.0, None],
+    })
+    compact = DataTools.EnRoute._compact(df)
+
+    assert compact["Radar_Lat"].dtype == np.float64
+    np.testing.assert_allclose(compact["Radar_Lat"], [38.5, 39.5, 40.25, np.nan])
+    np.testing.assert_allclose(compact["Radar_Lon"], [-77.25, -100.5, -101.0, np.nan])
+
+
+def test_compact_warns_about_unparseable_coordinates():
+    df = pd.DataFrame({"Latitude\n(Degrees)": [38.5, "junk", None]})
+    with pytest.warns(UserWarning, match="1 .* could not be parsed"):
+        compact = DataTools.EnRoute._compact(df)
+
+    assert compact["Latitude\n(Degrees)"].isna().tolist() == [False, True, True]
+
+
+def test_enroute_instances_get_their_own_bounds_store(artcc_rings):
+    boundaries = DataTools.ArtccBoundaries(artcc_sheet(artcc_rings))
+    first = DataTools.EnRoute(boundaries=boundaries)
+    second = DataTools.EnRoute(boundaries=boundaries)
+    first.sv_bounds.append("ZXX", [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)])
+
+    assert "ZXX" in first.sv_bounds
+    assert list(second.sv_bounds) == ["ZDC", "ZKC"]
+    assert list(boundaries.store) == ["ZDC", "ZKC"]
+    # The packed arrays are shared, not copied, and cannot be edited through a view
+    assert np.shares_memory(second.sv_bounds.coords, boundaries.store.coords)
+    with pytest.raises(ValueError):
+        second.sv_bounds["ZDC"][0][0, 0] = 0.0
+
+
+def test_artcc_bounding_boxes_skip_nan_vertices(artcc_rings):
+    sv_id, ring = artcc_rings["ZDC"]
+    artcc_rings["ZDC"] = (sv_id, ring[:2] + [(np.nan, np.nan)] + ring[2:])
+    boundaries = DataTools.ArtccBoundaries(artcc_sheet(artcc_rings))
+
+    assert boundaries.bounding_boxes.loc["ZDC"].tolist() == [37.0, -78.0, 40.0, -75.0]
+    assert boundaries.candidates([[38.5, -76.5]]).tolist() == [[True, False]]
+
+
+def test_for_workbook_keeps_only_the_latest_build_per_path(tmp_path, artcc_rings):
+    path = write_workbook(tmp_path / "Radars_ALL.xlsx", {"EnRoute": artcc_sheet(artcc_rings)})
+    session = DataTools.WorkbookSession(sheets={}, workbook_cache=DataTools.WorkbookCache(None))
+    first = DataTools.ArtccBoundaries.for_workbook(path, session)
+    assert DataTools.ArtccBoundaries.for_workbook(path, session) is first
+
+    del artcc_rings["ZKC"]
+    write_workbook(path, {"EnRoute": artcc_sheet(artcc_rings)})
+    session.refresh()
+    rebuilt = DataTools.ArtccBoundaries.for_workbook(path, session)
+
+    assert rebuilt is not first and rebuilt.ids == ["ZDC"]
+    # The stale build was replaced, not kept alongside
+    assert DataTools.ArtccBoundaries._built[path][2] is rebuilt
+
+
+def test_bounds_store_groups_rings_by_sv_id():
+    store = DataTools.BoundsStore()
+    store.append(20, [(37.0, -78.0), (40.0, -78.0), (40.0, -75.0)])
+    store.append(np.int64(30), [[38.0, -102.0, 41.0, -102.0, 41.0, -98.0]])
+    store.append(20, np.empty((0, 2)))
+    store.append(20, [(1.0, 2.0), (np.nan, np.nan), (3.0, 4.0), (5.0, 6.0)])
+
+    # SV 20's rings are packed together, ahead of SV 30, in the order they were appended
+    assert list(store) == [20, 30] and len(store) == 2 and store.num_rings == 4
+    assert store.offsets.tolist() == [0, 3, 3, 7, 10]
+    assert store.ring_ids == [20, 20, 20, 30]
+    assert store.ring_slice(20) == slice(0, 3) and store.ring_slice(30) == slice(3, 4)
+    assert store.nbytes == 10 * 16 + 5 * 8
+
+    rings = store[20]
+    assert [ring.shape for ring in rings] == [(3, 2), (0, 2), (4, 2)]
+    assert all(np.shares_memory(ring, store.coords) for ring in rings if ring.size)
+    # NaN vertices are stored as they are
+    np.testing.assert_array_equal(rings[2], [[1.0, 2.0], [np.nan, np.nan], [3.0, 4.0], [5.0, 6.0]])
+    np.testing.assert_array_equal(store[30][0], [[38.0, -102.0], [41.0, -102.0], [41.0, -98.0]])
+    np.testing.assert_array_equal(store.vertices(20), np.concatenate(rings))
+    with pytest.raises(KeyError):
+        store[40]
+
+
+def test_bounds_store_copies_and_round_trips(tmp_path):
+    empty = DataTools.BoundsStore()
+    assert len(empty) == 0 and empty.num_rings == 0 and empty.offsets.tolist() == [0] and dict(empty) == {}
+
+    store = DataTools.BoundsStore()
+    store.append(np.int64(30), [(38.0, -102.0), (41.0, -102.0), (41.0, -98.0)])
+    store.append("ZDC", np.empty((0, 2)))
+    copy = store.copy()
+    copy.append("ZDC", [(1.0, 2.0), (3.0, 4.0), (5.0, 6.0)])
+    assert store.num_rings == 2 and copy.num_rings == 3
+    assert [ring.shape[0] for ring in store["ZDC"]] == [0]
+
+    path = str(tmp_path / "bounds.npz")
+    copy.save(path)
+    loaded = DataTools.BoundsStore.load(path)
+    # numpy integer IDs are saved as plain ints
+    assert list(loaded) == [30, "ZDC"] and loaded.ring_ids == [30, "ZDC", "ZDC"]
+    np.testing.assert_array_equal(loaded.coords, copy.coords)
+    np.testing.assert_array_equal(loaded.offsets, copy.offsets)
+    assert [ring.shape[0] for ring in loaded["ZDC"]] == [0, 3]
+
+
+def _haversine_nmi(lat_lon, points):
+    """Brute-force (queries, points) great-circle distances on the Geo sphere"""
+    lat0, lon0 = np.radians(lat_lon[:, :1]), np.radians(lat_lon[:, 1:])
+    lat1, lon1 = np.radians(points[:, 0]), np.radians(points[:, 1])
+    a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(a)) * GeoTools.Geo().earth_radius_nmi
+
+
+def _conus(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.uniform(25.0, 49.0, n), rng.uniform(-125.0, -67.0, n)))
+
+
+# SensorIndex measures ECEF chords on the ellipsoid; they agree with the spherical scan to a fraction of a percent
+INDEX_RTOL = 5e-3
+
+
+def test_sensor_index_nearest_matches_a_brute_force_scan():
+    sensors, queries = _conus(300, 0), _conus(50, 1)
+    index = DataTools.SensorIndex(sensors, ids=[f"S{n}" for n in range(300)])
+    scan = _haversine_nmi(queries, sensors)
+
+    indexes, distances = index.nearest(queries, k=5)
+    assert indexes.shape == distances.shape == (50, 5)
+    assert (np.diff(distances, axis=1) >= 0).all()
+    np.testing.assert_allclose(distances, np.take_along_axis(scan, indexes, axis=1), rtol=INDEX_RTOL)
+    np.testing.assert_allclose(distances, np.sort(scan, axis=1)[:, :5], rtol=INDEX_RTOL)
+    # The single nearest is unambiguous for these points
+    assert index.nearest_ids(queries)[:, 0].tolist() == [f"S{n}" for n in scan.argmin(axis=1)]
+
+    # Asking for more than there are pads with -1 / inf
+    indexes, distances = DataTools.SensorIndex(sensors[:3]).nearest(queries[:2], k=5)
+    assert (indexes[:, 3:] == -1).all() and np.isinf(distances[:, 3:]).all()
+
+
+@pytest.mark.parametrize("radius_nmi", [50.0, 150.0, 5000.0])
+def test_sensor_index_within_matches_a_brute_force_scan(radius_nmi):
+    sensors, queries = _conus(300, 2), _conus(40, 3)
+    index = DataTools.SensorIndex(sensors)
+    scan = _haversine_nmi(queries, sensors)
+
+    for (indexes, distances), row in zip(index.within(queries, radius_nmi), scan):
+        assert (np.diff(distances) >= 0).all()
+        np.testing.assert_allclose(distances, row[indexes], rtol=INDEX_RTOL)
+        # Sensors near the edge of the radius may fall either side of it
+        certain = np.abs(row / radius_nmi - 1) > INDEX_RTOL
+        assert set(indexes) & set(np.flatnonzero(certain)) == set(np.flatnonzero(certain & (row <= radius_nmi)))
+
+    # max_results keeps the closest of the same sensors
+    for (indexes, _), (bounded, _) in zip(index.within(queries, radius_nmi), index.within(queries, radius_nmi, 3)):
+        assert bounded.tolist() == indexes[:3].tolist()
+
+
+def test_sensor_index_incremental_updates_match_a_fresh_index():
+    sensors, queries = _conus(200, 4), _conus(30, 5)
+    ids = [f"S{n}" for n in range(200)]
+    # A large rebuild_fraction keeps the additions in the pending buffer and the removals masked
+    index = DataTools.SensorIndex(sensors[:150], ids=ids[:150], rebuild_fraction=10.0)
+    index.add(sensors[150:], ids[150:])
+    assert index.remove(ids[:20:2] + ids[180:]) == 30
+    assert index.ids.size == 200 and len(index) == 170
+
+    keep = np.isin(ids, ids[:20:2] + ids[180:], invert=True)
+    fresh = DataTools.SensorIndex(sensors[keep], ids=np.array(ids)[keep])
+    np.testing.assert_array_equal(index.nearest_ids(queries, k=4), fresh.nearest_ids(queries, k=4))
+    np.testing.assert_allclose(index.nearest(queries, k=4)[1], fresh.nearest(queries, k=4)[1])
+    within = [sorted(found) for found in index.within_ids(queries, 200.0)]
+    assert within == [sorted(found) for found in fresh.within_ids(queries, 200.0)]
+
+    index.rebuild()
+    assert index.ids.size == 170
+    np.testing.assert_array_equal(index.nearest_ids(queries, k=4), fresh.nearest_ids(queries, k=4))
+
+
+# ZDC and ZNY share the lon -75 edge and ZNY / ZBW the lat 41 edge; ZBW is concave and
+# the terminal-style SV has two rings, one of them overlapping ZDC
+SERVICE_VOLUMES = {
+    "ZDC": [(37.0, -78.0), (40.0, -78.0), (40.0, -75.0), (37.0, -75.0)],
+    "ZNY": [(39.0, -75.0), (41.0, -75.0), (41.0, -72.0), (39.0, -72.0)],
+    "ZBW": [(41.0, -74.0), (45.0, -74.0), (45.0, -69.0), (43.0, -71.5), (41.0, -69.0)],
+    "PCT": [[(38.5, -77.8), (39.2, -77.8), (39.2, -76.8), (38.5, -76.8)],
+            [(35.0, -80.0), (35.5, -80.0), (35.5, -79.5), (35.0, -79.5)]],
+}
+
+
+def _contains_loop(sv_bounds, lat_lon):
+    """Reference classification: one Polygon.contains call per point, ring and SV"""
+    polygons = []
+    for sv_id, bounds in sv_bounds.items():
+        rings = bounds if np.ndim(bounds[0][0]) == 1 else [bounds]
+        polygons.extend((sv_id, Polygon([(lon, lat) for lat, lon in ring])) for ring in rings)
+    enclosing = []
+    for lat, lon in lat_lon:
+        matches = []
+        for sv_id, polygon in polygons:
+            if sv_id not in matches and polygon.contains(Point(lon, lat)):
+                matches.append(sv_id)
+        enclosing.append(matches)
+    return enclosing
+
+
+def test_service_volume_classifier_matches_a_contains_loop():
+    # Points on the shared edges and corners, and points outside every SV
+    on_borders = np.array([(lat, -75.0) for lat in np.linspace(37.0, 41.0, 40)]
+                          + [(41.0, lon) for lon in np.linspace(-75.0, -69.0, 40)] + [(40.0, -75.0), (41.0, -74.0)])
+    outside = np.array([(30.0, -90.0), (47.0, -70.0), (43.0, -70.5), (36.0, -76.0), (40.5, -77.0), (50.0, -100.0)]
+                       + [(np.nan, -75.0)] * 8 + [(36.0, -79.0)] * 10)
+    rng = np.random.default_rng(6)
+    n = 5000 - len(on_borders) - len(outside)
+    random = np.column_stack((rng.uniform(34.0, 46.0, n), rng.uniform(-81.0, -68.0, n)))
+    lat_lon = np.vstack((random, on_borders, outside))
+    assert lat_lon.shape == (5000, 2)
+
+    classifier = DataTools.ServiceVolumeClassifier(SERVICE_VOLUMES)
+    enclosing = classifier.classify_all(lat_lon)
+    assert enclosing == _contains_loop(SERVICE_VOLUMES, lat_lon)
+
+    # Boundary points belong to neither neighbour, as with Polygon.contains
+    assert all(not matches for matches in enclosing[n:n + len(on_borders)])
+    assert classifier.classify(outside).tolist() == [None] * len(outside)
+    # Overlapping volumes are reported in sv_bounds order, and classify keeps the first
+    assert classifier.classify_all([(38.8, -77.0)]) == [["ZDC", "PCT"]]
+    assert classifier.classify([(38.8, -77.0), (35.2, -79.8), (42.0, -72.0)]).tolist() == ["ZDC", "PCT", "ZBW"]
+
+
+@pytest.fixture
+def enroute_radios(tmp_path):
+    radio_path = write_radio_workbook(tmp_path / "radio_locations.xlsx")
+    return DataTools.EnRoute(radio_path=radio_path, workbook_cache=DataTools.WorkbookCache(None))
+
+
+def _rsids(df):
+    return df["RSID"].tolist()
+
+
+def test_radio_site_index_lists_operational_rows_per_site(enroute_radios):
+    index = enroute_radios.radio_site_index
+    assert {site: rows.tolist() for site, rows in index.items()} == {"ZDC": [0, 2, 4], "ZKC": [1, 2, 3], "ZNY": [4]}
+    assert enroute_radios.radio_site_index is index
+
+
+def test_load_radios_for_one_site_matches_the_ectv_mask(enroute_radios):
+    assert enroute_radios.load_radios("ZDC") is None
+    # R5 is operational for ZDC but has no Radio Variant, so it is dropped like before
+    mask = RADIOS[(RADIOS["ZDC eCTV"] == "O") & RADIOS["Radio Variant"].notna()]
+    assert _rsids(enroute_radios.radios) == _rsids(mask) == ["R1", "R3"]
+    assert list(enroute_radios.radios_by_site) == ["ZDC"]
+    assert _rsids(enroute_radios.radios_by_site["ZDC"]) == ["R1", "R3"]
+    assert sorted(enroute_radios.radio_variants) == ["GBT", "MRU"]
+
+    enroute_radios.load_radios("ZNY")
+    assert enroute_radios.radios.empty and enroute_radios.radios_by_site["ZNY"].empty
+
+
+def test_load_radios_for_several_sites_is_their_union(enroute_radios):
+    enroute_radios.load_radios(["ZKC", "ZDC"])
+    # Row order follows the sheet, and R3 (in both sites) appears once
+    assert _rsids(enroute_radios.radios) == ["R1", "R2", "R3", "R4"]
+    assert list(enroute_radios.radios_by_site) == ["ZKC", "ZDC"]
+    assert _rsids(enroute_radios.radios_by_site["ZKC"]) == ["R2", "R3", "R4"]
+    assert _rsids(enroute_radios.radios_by_site["ZDC"]) == ["R1", "R3"]
+    # GBT/MRU is a repeat of GBT and MRU, so it is left out of the variants
+    assert sorted(enroute_radios.radio_variants) == ["GBT", "MRU"]
+
+
+def test_load_radios_keeps_every_radio_for_an_unknown_site(enroute_radios, capsys):
+    enroute_radios.load_radios(["ZDC", "XYZ"])
+    assert "XYZ not found as a valid ERAM site" in capsys.readouterr().out
+    assert _rsids(enroute_radios.radios) == ["R1", "R2", "R3", "R4"]
+    assert _rsids(enroute_radios.radios_by_site["XYZ"]) == ["R1", "R2", "R3", "R4"]
+    assert _rsids(enroute_radios.radios_by_site["ZDC"]) == ["R1", "R3"]
+
+
+def test_load_radios_projects_columns(enroute_radios):
+    expected = ["RSID", "Latitude\n(Degrees)", "1090ES Antenna", "Radio Variant"]
+    enroute_radios.load_radios("ZKC", columns=["RSID", "Latitude\n(Degrees)"])
+    assert list(enroute_radios.radios.columns) == expected
+    assert list(enroute_radios.radios_by_site["ZKC"].columns) == expected
+    # DMS text is parsed to decimal degrees
+    assert enroute_radios.radios["Latitude\n(Degrees)"].tolist() == [39.5, 39.0, 40.0]
+
+    enroute_radios.load_radios(columns=["RSID"])
+    assert list(enroute_radios.radios.columns) == ["RSID", "1090ES Antenna", "Radio Variant"]
+    assert _rsids(enroute_radios.radios) == ["R1", "R2", "R3", "R4"]
+    assert enroute_radios.radios_by_site == {}
@@ -0,0 +1,373 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from Libs import GeoTools, constants
+
+AZIMUTHS = [0.0, 45.0, 90.0, 179.5, 180.0, 270.0, 359.9]
+
+
+def _separation_m(lat_lon_a, lat_lon_b):
+    """Straight-line ECEF distance in metres between matching rows of two [lat, lon] sets"""
+    a = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.asarray(lat_lon_a, dtype=float), np.zeros(len(lat_lon_a))))
+    b = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.asarray(lat_lon_b, dtype=float), np.zeros(len(lat_lon_b))))
+    return np.linalg.norm(a - b, axis=1)
+
+
+@pytest.mark.parametrize("reference", [
+    (38.85, -77.04), (0.0, 0.0), (-45.0, 179.9), (71.0, -156.8),
+    # Polar references
+    (89.9, 30.0), (-89.9, -150.0), (90.0, 0.0),
+])
+@pytest.mark.parametrize("range_nmi", [0.0, 1.0, 250.0, 5000.0, 10790.0, 10800.0])
+def test_batch_destination_matches_pygeodesy_vincenty(reference, range_nmi):
+    # 10790 - 10800 NM is within a few kilometres of the antipode
+    geo = GeoTools.Geo()
+    lats, lons = geo.lat_lon_from_reference_batch_range_az_degrees(*reference, range_nmi, AZIMUTHS)
+    exact = [geo.lat_lon_from_reference_given_range_az_degrees(*reference, range_nmi, az) for az in AZIMUTHS]
+
+    assert _separation_m(np.column_stack((lats, lons)), exact).max() < 1e-3
+
+
+def test_lat_lon_circles_match_the_scalar_destination():
+    geo = GeoTools.Geo()
+    refs = [(38.85, -77.04, 60.0), (89.5, 10.0, 120.0), (-12.0, 179.8, 250.0)]
+    circles = geo.lat_lon_circles(*zip(*refs), num_entries=36)
+
+    for (ref_lat, ref_lon, radius), circle in zip(refs, circles):
+        assert circle == geo.lat_lon_circle(ref_lat, ref_lon, radius, num_entries=36)
+        assert circle[0] == circle[-1] and len(circle) == 37
+        exact = [
+            geo.lat_lon_from_reference_given_range_az_degrees(ref_lat, ref_lon, radius, az)
+            for az in np.arange(36) * 10.0
+        ]
+        assert _separation_m(circle[:-1], exact).max() < 1e-3
+
+
+def test_ring_cache_evicts_least_recently_used():
+    cache = GeoTools.RingCache(max_size=3)
+    for lat in (1.0, 2.0, 3.0):
+        cache.put(lat, 0.0, 10.0, 180, [(lat, 0.0)])
+    assert cache.get(1.0, 0.0, 10.0) == [(1.0, 0.0)]
+    cache.put(4.0, 0.0, 10.0, 180, [(4.0, 0.0)])
+
+    # 2.0 was the least recently used once 1.0 was read back
+    assert [key[0] for key in cache.keys()] == [3.0, 1.0, 4.0]
+    assert cache.get(2.0, 0.0, 10.0) is None
+    assert cache.stats == {"hits": 1, "misses": 1, "size": 3, "max_size": 3}
+
+
+def test_ring_cache_quantises_keys():
+    cache = GeoTools.RingCache()
+    cache.put(0.1 + 0.2, np.float64(-77.04), 60, 180, [(0.3, -77.04)])
+
+    assert (0.3, -77.04, 60.0, 180) in cache
+    assert cache.get(np.array(0.3), -77.04 + 1e-12, 60.0) == [(0.3, -77.04)]
+    assert cache.get(0.3, -77.04, 60.0, num_entries=90) is None
+    assert (0.3 + 1e-6, -77.04, 60.0, 180) not in cache
+
+
+def test_ring_cache_round_trips_through_its_file(tmp_path):
+    path = str(tmp_path / "rings.pkl")
+    geo = GeoTools.Geo(ring_cache=GeoTools.RingCache(cache_path=path))
+    rings = [geo.lat_lon_circle(38.0 + n, -77.0, 30.0, num_entries=36) for n in range(3)]
+    geo.lat_lon_circle(38.0, -77.0, 30.0, num_entries=36)
+    geo.ring_cache.save()
+
+    loaded = GeoTools.RingCache(cache_path=path)
+    assert loaded.keys() == geo.ring_cache.keys()
+    assert [loaded.get(38.0 + n, -77.0, 30.0, 36) for n in range(3)] == rings
+    # A smaller cache keeps the most recently used rings of the file
+    assert [key[0] for key in GeoTools.RingCache(max_size=1, cache_path=path).keys()] == [38.0]
+
+
+@pytest.mark.parametrize("contents", [
+    b"",
+    b"\x80\x05not a pickle",
+    # Rings saved before the file format was versioned
+    pickle.dumps({(1.0, 2.0, 3.0, 180): ((1.0, 2.0),)}),
+])
+def test_ring_cache_ignores_unreadable_and_stale_files(tmp_path, contents):
+    path = tmp_path / "rings.pkl"
+    path.write_bytes(contents)
+    with pytest.warns(UserWarning, match="Ignoring"):
+        cache = GeoTools.RingCache(cache_path=str(path))
+    assert len(cache) == 0
+
+    cache.put(1.0, 2.0, 3.0, 180, [(1.0, 2.0)])
+    cache.save()
+    assert GeoTools.RingCache(cache_path=str(path)).get(1.0, 2.0, 3.0) == [(1.0, 2.0)]
+
+
+def test_ring_cache_ignores_malformed_rings(tmp_path):
+    path = tmp_path / "rings.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"version": GeoTools.RingCache.FORMAT_VERSION, "rings": {(1.0, 2.0, 3.0, 180): [1.0, 2.0]}}, f)
+    with pytest.warns(UserWarning, match="malformed"):
+        assert len(GeoTools.RingCache(cache_path=str(path))) == 0
+
+
+@pytest.mark.parametrize("distance", ["distance_between_two_lat_lon", "great_circle_distance"])
+def test_scalar_distances_match_known_arcs(distance):
+    geo = GeoTools.Geo()
+    distance = getattr(geo, distance)
+    one_degree = geo.earth_radius_nmi * np.pi / 180.0
+
+    np.testing.assert_allclose(distance(0.0, 0.0, 0.0, 1.0), one_degree)
+    np.testing.assert_allclose(distance(10.0, 20.0, 11.0, 20.0), one_degree)
+    # A degree of longitude shrinks with the cosine of the latitude
+    np.testing.assert_allclose(distance(60.0, -77.0, 60.0, -76.0), 0.5 * one_degree, rtol=1e-4)
+    np.testing.assert_allclose(distance(0.0, -90.0, 0.0, 90.0), 180.0 * one_degree)
+    np.testing.assert_allclose(distance(38.85, -77.04, 38.85, -77.04), 0.0, atol=1e-6)
+
+
+def _random_lat_lon(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack((rng.uniform(-80.0, 80.0, n), rng.uniform(-180.0, 180.0, n)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 23, 2048])
+def test_pairwise_distance_matches_scalar_distances(chunk_size):
+    geo = GeoTools.Geo()
+    lat_lon_a, lat_lon_b = _random_lat_lon(23, 1), _random_lat_lon(7, 2)
+    a = np.repeat(lat_lon_a, 7, axis=0)
+    b = np.tile(lat_lon_b, (23, 1))
+
+    distances = geo.pairwise_distance(lat_lon_a, lat_lon_b, chunk_size=chunk_size)
+    assert distances.shape == (23, 7)
+    expected = geo.distance_between_two_lat_lon(a[:, 0], a[:, 1], b[:, 0], b[:, 1]).reshape(23, 7)
+    np.testing.assert_allclose(distances, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(
+        distances, geo.great_circle_distance(a[:, 0], a[:, 1], b[:, 0], b[:, 1]).reshape(23, 7), rtol=1e-6, atol=1e-6
+    )
+
+    # Blocks cover every row once, in order, even when chunk_size does not divide the row count
+    blocks = list(geo.iter_pairwise_distance(lat_lon_a, lat_lon_b, chunk_size=chunk_size))
+    assert [start for start, _ in blocks] == list(range(0, 23, chunk_size))
+    assert sum(block.shape[0] for _, block in blocks) == 23
+
+
+def test_pairwise_vincenty_matches_pygeodesy():
+    from pygeodesy.ellipsoidalVincenty import LatLon
+
+    geo = GeoTools.Geo()
+    lat_lon_a, lat_lon_b = _random_lat_lon(9, 3), _random_lat_lon(4, 4)
+    distances = geo.pairwise_distance(lat_lon_a, lat_lon_b, method="vincenty", chunk_size=4)
+    expected = [[LatLon(*a).distanceTo(LatLon(*b)) / 1852.0 for b in lat_lon_b] for a in lat_lon_a]
+    np.testing.assert_allclose(distances, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("chunk_size", [3, 2048])
+def test_pairwise_within_and_nearest_match_the_full_matrix(chunk_size):
+    geo = GeoTools.Geo()
+    lat_lon_a = np.column_stack((np.linspace(35.0, 42.0, 17), np.linspace(-80.0, -70.0, 17)))
+    lat_lon_b = np.column_stack((np.linspace(36.0, 41.0, 6), np.linspace(-78.0, -72.0, 6)))
+    full = geo.pairwise_distance(lat_lon_a, lat_lon_b)
+
+    rows, cols, dists = geo.pairwise_within(lat_lon_a, lat_lon_b, 60.0, chunk_size=chunk_size)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == sorted(zip(*np.nonzero(full <= 60.0)))
+    np.testing.assert_allclose(dists, full[rows, cols])
+
+    for k in (1, 3, 6):
+        indexes, distances = geo.pairwise_nearest(lat_lon_a, lat_lon_b, k=k, chunk_size=chunk_size)
+        np.testing.assert_array_equal(indexes, np.argsort(full, axis=1, kind="stable")[:, :k])
+        np.testing.assert_allclose(distances, np.sort(full, axis=1)[:, :k])
+
+
+def test_pairwise_handles_empty_inputs():
+    geo = GeoTools.Geo()
+    points = _random_lat_lon(3, 5)
+    for empty in ([], np.empty((0, 2))):
+        assert geo.pairwise_distance(empty, points).shape == (0, 3)
+        assert geo.pairwise_distance(points, empty).shape == (3, 0)
+        assert [part.size for part in geo.pairwise_within(empty, points, 100.0)] == [0, 0, 0]
+        assert [part.size for part in geo.pairwise_within(points, empty, 100.0)] == [0, 0, 0]
+        assert [part.shape for part in geo.pairwise_nearest(empty, points, k=2)] == [(0, 2), (0, 2)]
+        with pytest.raises(ValueError, match="k must be between"):
+            geo.pairwise_nearest(points, empty)
+
+
+def test_lat_lon_to_ecef_matches_known_points():
+    # WGS-84 positions, as given by pygeodesy's toCartesian
+    lat_lon = np.array([[0.0, 0.0], [90.0, 0.0], [45.0, 0.0], [-33.8568, 151.2153], [38.8895, -77.0352]])
+    alt = np.array([0.0, 0.0, 0.0, 58.0, 5000.0])
+    expected = np.array([
+        [6378137.0, 0.0, 0.0],
+        [0.0, 0.0, 6356752.3142],
+        [4517590.8788, 0.0, 4487348.4089],
+        [-4647010.8509, 2553100.1126, -3533299.4404],
+        [1116137.4646, -4848109.3549, 3985915.3638],
+    ])
+
+    np.testing.assert_allclose(np.column_stack(GeoTools.Geo.lat_lon_to_ecef(lat_lon, alt)), expected, atol=1e-3)
+
+
+FL600_M = 60000.0 * constants.FEET_TO_METERS
+# Equator, mid-latitudes, the antimeridian and both poles
+GEODETIC_LATS = np.array([0.0, 0.001, -0.001, 12.5, 38.85, 45.0, -45.0, 64.8, 89.99, 89.9999, 90.0, -90.0])
+GEODETIC_LONS = np.array([0.0, -77.0, 33.0, 179.999, -180.0, 45.0, -179.5, -147.9, 10.0, 120.0, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("method", ["heikkinen", "iterative"])
+@pytest.mark.parametrize("alt", [-100.0, 0.0, 1500.0 * constants.FEET_TO_METERS, FL600_M])
+def test_ecef_round_trip_recovers_geodetic_coordinates(method, alt):
+    alts = np.full(GEODETIC_LATS.size, alt)
+    x, y, z = GeoTools.Geo.lat_lon_to_ecef(np.column_stack((GEODETIC_LATS, GEODETIC_LONS)), alts)
+    lat, lon, h = GeoTools.Geo.ecef_to_lat_lon_alt(x, y, z, method=method)
+
+    assert np.abs(lat - GEODETIC_LATS).max() < 1e-9
+    # Longitude is undefined at the poles
+    d_lon = (lon - GEODETIC_LONS + 180.0) % 360.0 - 180.0
+    assert np.abs(d_lon[np.abs(GEODETIC_LATS) < 90.0]).max() < 1e-9
+    assert np.abs(h - alts).max() < 1e-4
+
+
+def test_heikkinen_matches_the_iterative_solver():
+    rng = np.random.default_rng(6)
+    lat_lon = np.column_stack((rng.uniform(-90.0, 90.0, 5000), rng.uniform(-180.0, 180.0, 5000)))
+    x, y, z = GeoTools.Geo.lat_lon_to_ecef(lat_lon, rng.uniform(-100.0, FL600_M, 5000))
+    closed = GeoTools.Geo.ecef_to_lat_lon_alt(x, y, z, method="heikkinen")
+    iterative = GeoTools.Geo.ecef_to_lat_lon_alt(x, y, z, method="iterative")
+
+    np.testing.assert_allclose(closed[0], iterative[0], rtol=0, atol=1e-10)
+    np.testing.assert_allclose(closed[1], iterative[1], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(closed[2], iterative[2], rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize("method", ["heikkinen", "iterative"])
+def test_ecef_to_lat_lon_alt_matches_pygeodesy(method):
+    from pygeodesy.datums import Datums
+    from pygeodesy.ecef import EcefKarney
+
+    ecef = EcefKarney(Datums.WGS84)
+    points = [(0.0, 0.0, 0.0), (38.8895, -77.0352, 5000.0), (-33.8568, 151.2153, 58.0), (89.5, 45.0, FL600_M)]
+    xyz = np.array([ecef.forward(*point).xyz for point in points])
+    lat, lon, h = GeoTools.Geo.ecef_to_lat_lon_alt(*xyz.T, method=method)
+
+    np.testing.assert_allclose(np.column_stack((lat, lon)), np.array(points)[:, :2], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(h, np.array(points)[:, 2], rtol=0, atol=1e-4)
+
+
+def test_enu_to_lat_lon_alt_matches_pygeodesy_local_tangent_plane():
+    from pygeodesy.datums import Datums
+    from pygeodesy.ecef import EcefKarney
+    from pygeodesy.ltp import Ltp
+
+    reference = (38.85, -77.04, 100.0)
+    enu = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 1500.0], [200000.0, -150000.0, 3000.0], [-400000.0, 400000.0, 0.0]])
+    lla = GeoTools.Geo().enu_to_lat_lon_alt(enu, reference)
+
+    ltp = Ltp(*reference, ecef=EcefKarney(Datums.WGS84))
+    expected = [ltp.reverse(*point) for point in enu]
+    np.testing.assert_allclose(lla[:2].T, [(point.lat, point.lon) for point in expected], rtol=0, atol=1e-9)
+    np.testing.assert_allclose(lla[2], [point.height for point in expected], rtol=0, atol=1e-4)
+    # Straight up from the sensor keeps its position and adds to its altitude
+    np.testing.assert_allclose(lla[:, 1], [38.85, -77.04, 1600.0], rtol=0, atol=1e-4)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("38.5", 38.5),
+    ("38 30 15.5N", 38.5043055556),
+    ("121 15 30 W", -121.2583333333),
+    ("-121 15 30", -121.2583333333),
+    ("+38 30 00", 38.5),
+    # Degrees and minutes only
+    ("38 30S", -38.5),
+    ("77°02'W", -77.0333333333),
+    ("38.5 E", 38.5),
+    ("38:30:15.000 n", 38.5041666667),
+    ("  ", None),
+])
+def test_parse_latlon_reads_degrees_minutes_and_seconds(text, expected):
+    if expected is None:
+        assert GeoTools.Geo.parse_latlon(text) is None
+    else:
+        assert GeoTools.Geo.parse_latlon(text) == pytest.approx(expected, abs=1e-9)
+
+
+COORDINATE_TEXT = [
+    "38.5", "-121.25", 45, -77.04, "38 30 15.2N", "38 30 15.2 S", "121 15 30E", "121°15'30\"W", "-121 15 30",
+    "+38 30 00", "38:30:15.250 N", "38 30N", "77°02'W", "38.75W", "38 30 15.2n",
+    # Malformed: the scalar parser raises and the column parser gives NaN
+    "abc", "38 30 00 00N", "+38 30N", "-38.5S", "N", "38,5N", "200", "38 30 15.2X",
+]
+
+
+def test_parse_latlon_column_matches_scalar_parse_latlon():
+    decimal, errors = GeoTools.Geo.parse_latlon_column(COORDINATE_TEXT + ["", None])
+
+    for text, value, error in zip(COORDINATE_TEXT, decimal, errors):
+        try:
+            expected = GeoTools.Geo.parse_latlon(text)
+        except ValueError:
+            assert np.isnan(value) and error, text
+        else:
+            assert value == pytest.approx(expected, abs=1e-12) and not error, text
+    # Missing values are NaN without being reported as errors
+    assert np.isnan(decimal[-2:]).all() and not errors[-2:].any()
+
+
+def test_hhmmss_to_decimal_column_matches_scalar_hhmmss_to_decimal():
+    values = ["38:30:15 N", "38:30:15 S", "121:15:30 E", "121:15:30 W", "00:00:59 S", "05:07:00 N"]
+    decimal, errors = GeoTools.Geo.hhmmss_to_decimal_column(values)
+
+    assert not errors.any()
+    np.testing.assert_allclose(decimal, [GeoTools.Geo.hhmmss_to_decimal(value) for value in values], atol=1e-12)
+    # The column version keeps fractional seconds (the scalar one drops them) and accepts missing seconds
+    decimal, errors = GeoTools.Geo.hhmmss_to_decimal_column(["38:30:15.500 W", "38:30 N", "38:xx:15 N"])
+    np.testing.assert_allclose(decimal[:2], [-(38 + 30 / 60 + 15.5 / 3600), 38.5])
+    assert np.isnan(decimal[2]) and errors.tolist() == [False, False, True]
+
+
+def test_latlon_dec_to_hhmmss_column_matches_scalar_formatting():
+    rng = np.random.default_rng(7)
+    lats = np.concatenate((rng.uniform(-90.0, 90.0, 200), [0.0, 38.5, -0.5, 45.9999999, 12.0 + 59.999999 / 3600]))
+    lons = np.concatenate((rng.uniform(-180.0, 180.0, 200), [0.0, -77.04, 179.9999999, -0.25, 100.0]))
+    hhmmss_lats, hhmmss_lons = GeoTools.Geo.latlon_dec_to_hhmmss_column(lats, lons)
+
+    geo = GeoTools.Geo()
+    expected = [geo.latlon_dec_to_hhmmss(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+    assert list(zip(hhmmss_lats.tolist(), hhmmss_lons.tolist())) == [tuple(pair) for pair in expected]
+    # The formatted text parses back to the same position
+    np.testing.assert_allclose(GeoTools.Geo.hhmmss_to_decimal_column(hhmmss_lats)[0], lats, atol=1e-6)
+
+
+@pytest.mark.parametrize("reference", [(38.85, -77.04, 100.0), (0.0, 179.99, 0.0), (-89.5, 45.0, 2800.0)])
+def test_local_tangent_plane_round_trips_lla(reference):
+    rng = np.random.default_rng(8)
+    lat_lon = np.column_stack((
+        np.clip(reference[0] + rng.uniform(-3.0, 3.0, 500), -90.0, 90.0), reference[1] + rng.uniform(-3.0, 3.0, 500)
+    ))
+    lat_lon[:, 1] = (lat_lon[:, 1] + 180.0) % 360.0 - 180.0
+    alt = rng.uniform(0.0, FL600_M, 500)
+    ltp = GeoTools.LocalTangentPlane.for_site(*reference)
+
+    lla = ltp.enu_to_lla(ltp.lla_to_enu(lat_lon, alt))
+    np.testing.assert_allclose(lla[0], lat_lon[:, 0], rtol=0, atol=1e-9)
+    # Longitude is compared as a ground distance, since it is ill-conditioned next to the pole
+    lon_error = (lla[1] - lat_lon[:, 1] + 180.0) % 360.0 - 180.0
+    np.testing.assert_allclose(np.radians(lon_error) * np.cos(np.radians(lat_lon[:, 0])) * 6.4e6, 0.0, atol=1e-6)
+    np.testing.assert_allclose(lla[2], alt, rtol=0, atol=1e-4)
+    # The reference itself is the ENU origin
+    np.testing.assert_allclose(ltp.lla_to_enu(reference[:2], reference[2]), [[0.0, 0.0, 0.0]], atol=1e-6)
+
+
+def test_local_tangent_plane_cache_is_per_site():
+    first = GeoTools.LocalTangentPlane.for_site(38.85, -77.04, 100.0)
+    second = GeoTools.LocalTangentPlane.for_site(64.8, -147.9, 130.0)
+
+    # Any float-convertible reference reaches the same cached projector
+    assert GeoTools.LocalTangentPlane.for_site(np.float64(38.85), np.array(-77.04), 100) is first
+    assert second is not first
+    assert second.reference == (64.8, -147.9, 130.0)
+    assert not np.shares_memory(first.rotation, second.rotation)
+    np.testing.assert_allclose(first.rotation, GeoTools.LocalTangentPlane(38.85, -77.04, 100.0).rotation)
+    np.testing.assert_allclose(second.rotation, GeoTools.LocalTangentPlane(64.8, -147.9, 130.0).rotation)
+    # A site differing only in altitude has its own origin
+    higher = GeoTools.LocalTangentPlane.for_site(38.85, -77.04, 1100.0)
+    assert higher is not first
+    np.testing.assert_allclose(np.linalg.norm(higher.reference_ecef - first.reference_ecef), 1000.0)
+    # Cached frames are shared between callers, so they cannot be edited through one of them
+    with pytest.raises(ValueError):
+        first.rotation[0, 0] = 1.0
@@ -0,0 +1,39 @@
+import numpy as np
+
+from Libs import GeoTools
+from Libs.constants import NM_TO_METERS
+
+
+def _lat_lon_grid():
+    lats, lons = np.meshgrid(np.linspace(-89.5, 89.5, 73), np.linspace(-179.5, 179.5, 145), indexing="ij")
+    return np.column_stack((lats.ravel(), lons.ravel()))
+
+
+def test_lat_lon_to_ecef_float32_error_bound():
+    lat_lon = _lat_lon_grid()
+    alt = np.tile([0.0, 1500.0, 12000.0], lat_lon.shape[0] // 3 + 1)[:lat_lon.shape[0]]
+    exact = GeoTools.Geo.lat_lon_to_ecef(lat_lon, alt)
+    reduced = GeoTools.Geo.lat_lon_to_ecef(lat_lon, alt, dtype=np.float32)
+
+    for axis_exact, axis_reduced in zip(exact, reduced):
+        assert axis_reduced.dtype == np.float32
+        # Documented bound: half a float32 ulp at the earth's radius
+        assert np.abs(axis_reduced.astype(np.float64) - axis_exact).max() <= 0.25
+
+
+def test_enu_to_lat_lon_alt_float32_error_bound():
+    axis = np.linspace(-250.0, 250.0, 41) * NM_TO_METERS
+    east, north = np.meshgrid(axis, axis)
+    for up in (0.0, 1500.0, 18000.0):
+        enu = np.column_stack((east.ravel(), north.ravel(), np.full(east.size, up))).astype(np.float32)
+        for reference in ((38.85, -77.04, 0.0), (64.8, -147.9, 130.0), (-33.9, 151.2, 20.0), (0.5, 179.9, 0.0)):
+            geo = GeoTools.Geo(dtype=np.float32)
+            reduced = geo.enu_to_lat_lon_alt(enu, reference)
+            exact = geo.enu_to_lat_lon_alt(enu.astype(np.float64), reference, dtype=np.float64)
+
+            assert reduced.dtype == np.float32
+            error = np.abs(reduced.astype(np.float64) - exact)
+            # Documented bounds: under 1e-5 deg in lat/lon and a few millimetres in altitude
+            assert error[0].max() < 1e-5
+            assert np.abs((error[1] + 180.0) % 360.0 - 180.0).max() < 1e-5
+            assert error[2].max() < 5e-3
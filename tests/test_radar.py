@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Libs import GeoTools, RadarTools
+
+
+# (radar lat, documented error bound in metres) with the default 1 NM step out to 256 NM
+@pytest.mark.parametrize("lat, bound_m", [(0.0, 0.15), (38.9, 0.2), (-45.0, 0.2), (71.3, 0.3), (-71.3, 0.3)])
+def test_acp_converter_error_bound_by_latitude(lat, bound_m):
+    converter = RadarTools.AcpConverter(lat, -156.8)
+    assert converter.estimate_error_m() < bound_m
+
+
+def test_acp_converter_finer_range_step_tightens_high_latitudes():
+    coarse = RadarTools.AcpConverter(80.0, 15.0).estimate_error_m()
+    fine = RadarTools.AcpConverter(80.0, 15.0, range_step_nmi=0.5).estimate_error_m()
+    assert fine < 0.3 < coarse < 1.0
+
+
+def test_acp_converter_matches_exact_solver_on_the_grid_and_masks_invalid_returns():
+    geo = GeoTools.Geo()
+    converter = RadarTools.AcpConverter(38.9, 179.9, max_range_nmi=60.0, geo=geo)
+    range_nmi = np.array([0.0, 10.0, 60.0, 25.0, 61.0, -1.0, 10.0, 10.0, 10.0])
+    az_acps = np.array([0.0, 1024.0, 4095.0, 4096.0, 0.0, 0.0, -1.0, 4097.0, np.nan])
+
+    lats, lons = converter.convert(range_nmi, az_acps)
+    exact_lats, exact_lons = geo.lat_lon_from_reference_batch_range_az_degrees(
+        38.9, 179.9, range_nmi[:4], 360.0 * (az_acps[:4] % 4096) / 4096
+    )
+    # Table nodes are exact, including across the antimeridian and at ACP 4096 == ACP 0
+    np.testing.assert_allclose(lats[:4], exact_lats, atol=1e-9)
+    np.testing.assert_allclose((lons[:4] - exact_lons + 180.0) % 360.0 - 180.0, 0.0, atol=1e-9)
+    assert np.isnan(lats[4:]).all() and np.isnan(lons[4:]).all()
+
+
+RADARS = pd.DataFrame({"Radar_ID": ["QEA", "JFK "], "Radar_Lat": [38.9, 40.64], "Radar_Lon": [-77.0, -73.78]})
+# A later frame listing QEA again does not move it: the first row per Radar_ID wins
+TERMINAL_RADARS = pd.DataFrame({"Radar_ID": ["QEA", "PHL"], "Radar_Lat": [0.0, 39.87], "Radar_Lon": [0.0, -75.24]})
+
+
+def _plots(n, seed=0):
+    rng = np.random.default_rng(seed)
+    plots = pd.DataFrame({
+        "time": np.arange(n, dtype=float),
+        "radar_id": rng.choice(["QEA", "JFK", "PHL", "XXX"], n),
+        "range_nmi": rng.uniform(-5.0, 70.0, n),
+        "az_acps": rng.uniform(-10.0, 4100.0, n),
+    })
+    # A shuffled, non-default index must not leak into the conversion
+    plots.index = rng.permutation(n) + 1000
+    return plots
+
+
+def _ground_m(lats, lons, other_lats, other_lons):
+    zeros = np.zeros(len(lats))
+    first = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.column_stack((lats, lons)), zeros))
+    second = np.column_stack(GeoTools.Geo.lat_lon_to_ecef(np.column_stack((other_lats, other_lons)), zeros))
+    return np.linalg.norm(first - second, axis=1)
+
+
+def test_plot_ingestor_exact_and_lookup_agree():
+    plots = _plots(4000)
+    radars = [RADARS, TERMINAL_RADARS]
+    lookup = RadarTools.PlotIngestor(radars, max_range_nmi=60.0).convert(plots)
+    exact = RadarTools.PlotIngestor(radars, method="exact", max_range_nmi=60.0).convert(plots)
+
+    pd.testing.assert_frame_equal(lookup[RadarTools.PLOT_COLUMNS], plots)
+    assert lookup.index.equals(plots.index) and exact.index.equals(plots.index)
+    # Unknown radars, negative or too-long ranges and out-of-scan ACPs are NaN in both
+    valid = (plots["radar_id"] != "XXX") & plots["range_nmi"].between(0.0, 60.0) & plots["az_acps"].between(0, 4096)
+    for converted in (lookup, exact):
+        assert converted["lat"].notna().equals(valid) and converted["lon"].notna().equals(valid)
+    lookup_lat_lon = lookup.loc[valid, ["lat", "lon"]].to_numpy().T
+    exact_lat_lon = exact.loc[valid, ["lat", "lon"]].to_numpy().T
+    assert _ground_m(*lookup_lat_lon, *exact_lat_lon).max() < 0.2
+
+    # Positions come from the first frame listing the radar, with IDs stripped
+    assert RadarTools.PlotIngestor(radars).positions.loc[["QEA", "JFK", "PHL"], "lat"].tolist() == [38.9, 40.64, 39.87]
+
+
+def test_plot_ingestor_rejects_unknown_methods():
+    with pytest.raises(ValueError):
+        RadarTools.PlotIngestor(RADARS, method="fast")
+
+
+def _write_binary(path, plots):
+    records = np.zeros(len(plots), dtype=RadarTools.PLOT_RECORD)
+    for column in RadarTools.PLOT_COLUMNS:
+        records[column] = plots[column].to_numpy()
+    records.tofile(path)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".bin"])
+def test_iter_plot_records_reads_blocks(tmp_path, suffix):
+    plots = _plots(25).reset_index(drop=True)
+    # Binary records store ranges and ACPs as float32
+    plots[["range_nmi", "az_acps"]] = plots[["range_nmi", "az_acps"]].astype(np.float32).astype(float)
+    path = str(tmp_path / f"plots{suffix}")
+    if suffix == ".csv":
+        plots.to_csv(path, index=False)
+    else:
+        _write_binary(path, plots)
+
+    blocks = list(RadarTools.iter_plot_records(path, block_size=10))
+    assert [len(block) for block in blocks] == [10, 10, 5]
+    assert all(list(block.columns) == RadarTools.PLOT_COLUMNS for block in blocks)
+    pd.testing.assert_frame_equal(pd.concat(blocks, ignore_index=True), plots, check_dtype=False)
+
+
+def test_csv_plot_writer_writes_one_header(tmp_path):
+    path = str(tmp_path / "converted.csv")
+    plots = _plots(30)
+    ingestor = RadarTools.PlotIngestor(RADARS)
+    writer = RadarTools.CsvPlotWriter(path)
+    # The first batch has only unknown radars, so every row is dropped
+    unknown = plots.assign(radar_id="XXX").iloc[:10]
+    writer(ingestor.convert(unknown))
+    for start in (10, 20):
+        writer(ingestor.convert(plots.iloc[start:start + 10]))
+    writer.close()
+
+    expected = ingestor.convert(plots.iloc[10:]).dropna(subset=["lat", "lon"]).reset_index(drop=True)
+    written = pd.read_csv(path, dtype={"radar_id": str})
+    assert writer.count == len(expected) == len(written)
+    pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+
+    writer = RadarTools.CsvPlotWriter(path, drop_unknown=False)
+    writer(ingestor.convert(unknown))
+    writer.close()
+    assert writer.count == 10 and pd.read_csv(path)["lat"].isna().all()
+
+
+class RecordingKml(object):
+    def __init__(self):
+        self.points = []
+
+    def add_point(self, lat, lon, parent_node=None, shape=None, color=None):
+        self.points.append((lat, lon, parent_node, shape, color))
+
+
+def test_kml_plot_writer_thins_across_batches(tmp_path):
+    plots = pd.DataFrame({
+        "time": np.arange(20, dtype=float), "radar_id": "QEA", "range_nmi": 10.0, "az_acps": np.arange(20) * 100.0,
+    })
+    converted = RadarTools.PlotIngestor(RADARS).convert(plots)
+    # Row 4 has no position and is skipped without shifting the every_nth pattern
+    converted.loc[4, ["lat", "lon"]] = np.nan
+    kml = RecordingKml()
+    writer = RadarTools.KmlPlotWriter(kml, parent_node="folder", shape="dot", color="ff0000ff", every_nth=3)
+    for start in (0, 7, 14):
+        writer(converted.iloc[start:start + 7])
+
+    rows = [0, 3, 6, 9, 12, 15, 18]
+    assert kml.points == [
+        (lat, lon, "folder", "dot", "ff0000ff") for lat, lon in converted.loc[rows, ["lat", "lon"]].to_numpy().tolist()
+    ]
+    assert writer.count == 7
+
+    kml = RecordingKml()
+    writer = RadarTools.KmlPlotWriter(kml, max_points=5)
+    path = str(tmp_path / "plots.csv")
+    plots.to_csv(path, index=False)
+    ingestor = RadarTools.PlotIngestor(RADARS)
+    ingestor.ingest(path, writer, block_size=3)
+    assert writer.count == len(kml.points) == 5
+    first = ingestor.convert(plots.iloc[:5])
+    assert [point[:2] for point in kml.points] == list(zip(first["lat"].tolist(), first["lon"].tolist()))
@@ -0,0 +1,265 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from Libs import DataTools
+from workbooks import (
+    RADARS, artcc_sheet, edit_shared_strings, radars_sheets, read_parts, shared_strings, write_parts, write_workbook
+)
+
+
+class RecordingCache(DataTools.WorkbookCache):
+    """Uncached WorkbookCache that records the sheets each parse asks for"""
+
+    def __init__(self):
+        super().__init__(cache_dir=None)
+        self.parsed = []
+
+    def read_excel_sheets(self, path, sheet_names, header=0, usecols=None) -> dict:
+        self.parsed.append(list(sheet_names))
+        return super().read_excel_sheets(path, sheet_names, header=header, usecols=usecols)
+
+
+@pytest.fixture
+def radars_path(tmp_path, artcc_rings):
+    return write_workbook(tmp_path / "Radars_ALL.xlsx", radars_sheets(artcc_rings))
+
+
+@pytest.fixture
+def session(radars_path):
+    # The default batches, for this copy of Radars_ALL
+    batches = [["Terminal Radars", "En Route Radars"], ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"],
+               ["EnRoute"]]
+    return DataTools.WorkbookSession(sheets={(radars_path, 0): batches}, workbook_cache=RecordingCache())
+
+
+def _edited_radars():
+    radars = RADARS.copy()
+    radars.loc[0, "Radar_Lat"] = 38.75
+    radars.loc[2] = ["Delta", "DDD", "ZKC", 40.0, -99.0, "MODES", None, "ZKC"]
+    return radars
+
+
+def _changed(before, after) -> list:
+    return [name for name in before if isinstance(name, str) and before[name] != after[name]]
+
+
+def test_sheet_fingerprints_follow_sheet_parts_and_styles(tmp_path, radars_path, artcc_rings):
+    before = DataTools.WorkbookCache.sheet_fingerprints(radars_path)
+    assert before["EnRoute"] == before[5]
+
+    write_workbook(radars_path, radars_sheets(artcc_rings, enroute_radars=_edited_radars()))
+    after = DataTools.WorkbookCache.sheet_fingerprints(radars_path)
+    assert _changed(before, after) == ["En Route Radars"]
+
+    # A number format (e.g. turning a value into a date) adds a cell style that only Terminal ClassB uses
+    book = openpyxl.load_workbook(radars_path)
+    book["Terminal ClassB"]["C2"].number_format = "yyyy-mm-dd"
+    book.save(radars_path)
+    styled = DataTools.WorkbookCache.sheet_fingerprints(radars_path)
+    assert "Terminal ClassB" in _changed(after, styled)
+
+    # Changing that style's format in the style sheet alone only affects the sheet using it
+    parts = read_parts(radars_path)
+    parts["xl/styles.xml"] = parts["xl/styles.xml"].replace(b'formatCode="yyyy-mm-dd"', b'formatCode="dd/mm/yyyy"')
+    write_parts(radars_path, parts)
+    restyled = DataTools.WorkbookCache.sheet_fingerprints(radars_path)
+    assert _changed(styled, restyled) == ["Terminal ClassB"]
+
+    # Every cell without a style attribute uses the first one
+    parts["xl/styles.xml"] = parts["xl/styles.xml"].replace(b'<xf numFmtId="0" fontId="0" fillId="0" borderId="0" p',
+                                                            b'<xf numFmtId="14" fontId="0" fillId="0" borderId="0" p')
+    write_parts(radars_path, parts)
+    assert len(_changed(restyled, DataTools.WorkbookCache.sheet_fingerprints(radars_path))) == 6
+
+
+@pytest.fixture
+def shared_path(tmp_path, artcc_rings):
+    """Radars_ALL with a shared string table, which Excel writes and openpyxl does not"""
+    return write_workbook(tmp_path / "Radars_Shared.xlsx", radars_sheets(artcc_rings), shared_strings=True)
+
+
+def _replace_string(old, new):
+    return lambda strings: [new if text == old else text for text in strings]
+
+
+def test_sheet_fingerprints_follow_only_the_shared_strings_a_sheet_uses(shared_path):
+    before = DataTools.WorkbookCache.sheet_fingerprints(shared_path)
+    # "Field" only appears in the Terminal class sheets
+    edit_shared_strings(shared_path, _replace_string("Field", "Airfield"))
+    after = DataTools.WorkbookCache.sheet_fingerprints(shared_path)
+    assert _changed(before, after) == ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"]
+    # The sheet parts themselves are untouched
+    assert all(before[name][0] == after[name][0] for name in range(6))
+
+    # "ZDC" is used by both radar sheets and by the ARTCC boundaries
+    edit_shared_strings(shared_path, _replace_string("ZDC", "ZDX"))
+    assert _changed(after, DataTools.WorkbookCache.sheet_fingerprints(shared_path)) == [
+        "Terminal Radars", "En Route Radars", "EnRoute"
+    ]
+
+
+def test_refresh_reparses_only_sheets_using_edited_shared_strings(shared_path, artcc_rings):
+    batches = [["Terminal Radars", "En Route Radars"], ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"],
+               ["EnRoute"]]
+    session = DataTools.WorkbookSession(sheets={(shared_path, 0): batches}, workbook_cache=RecordingCache())
+    for name in ["Terminal Radars", "Terminal ClassB", "EnRoute"]:
+        session.read_excel(shared_path, name)
+    assert len(session.workbook_cache.parsed) == 3
+
+    edit_shared_strings(shared_path, _replace_string("Field", "Airfield"))
+    changed = [(shared_path, name, 0) for name in ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"]]
+    assert session.refresh() == changed
+    assert session.workbook_cache.parsed[3:] == [["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"]]
+    assert session.read_excel(shared_path, "Terminal ClassC")["Arpt_Name"].tolist() == ["Airfield"]
+
+    # Excel appends new text to the table, so editing a cell only rewrites that cell's sheet
+    strings = shared_strings(shared_path)
+    edit_shared_strings(shared_path, lambda strings: strings + ["DDD"])
+    parts = read_parts(shared_path)
+    ccc, ddd = strings.index("CCC"), len(strings)
+    sheet = parts["xl/worksheets/sheet2.xml"]
+    parts["xl/worksheets/sheet2.xml"] = sheet.replace(f"<v>{ccc}</v>".encode(), f"<v>{ddd}</v>".encode())
+    write_parts(shared_path, parts)
+
+    assert session.refresh() == [(shared_path, "En Route Radars", 0)]
+    assert session.workbook_cache.parsed[4:] == [["En Route Radars"]]
+    assert session.read_excel(shared_path, "En Route Radars")["Radar_ID"].tolist() == ["AAA", "BBB", "DDD"]
+    assert session.read_excel(shared_path, "Terminal Radars")["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+
+
+def test_sheet_fingerprints_are_empty_for_non_zip_workbooks(tmp_path):
+    path = tmp_path / "old.xls"
+    path.write_bytes(b"not a zip package")
+    assert DataTools.WorkbookCache.sheet_fingerprints(str(path)) == {}
+
+
+def test_refresh_reparses_only_changed_sheets(radars_path, artcc_rings, session):
+    session.read_excel(radars_path, "Terminal Radars")
+    session.read_excel(radars_path, "EnRoute")
+    assert session.workbook_cache.parsed == [["Terminal Radars", "En Route Radars"], ["EnRoute"]]
+
+    # Rewritten with identical cells: nothing to parse
+    write_workbook(radars_path, radars_sheets(artcc_rings))
+    assert session.refresh() == []
+    assert len(session.workbook_cache.parsed) == 2
+
+    write_workbook(radars_path, radars_sheets(artcc_rings, enroute_radars=_edited_radars()))
+    assert session.refresh() == [(radars_path, "En Route Radars", 0)]
+    assert session.workbook_cache.parsed[2:] == [["En Route Radars"]]
+    assert session.version(radars_path, "En Route Radars") == 1
+    assert session.version(radars_path, "Terminal Radars") == 0
+    assert session.read_excel(radars_path, "En Route Radars")["Radar_ID"].tolist() == ["AAA", "BBB", "DDD"]
+
+
+def test_refresh_reports_deleted_sheets(radars_path, artcc_rings, session):
+    session.read_excel(radars_path, "Terminal Radars")
+    sheets = radars_sheets(artcc_rings)
+    del sheets["Terminal Radars"]
+    write_workbook(radars_path, sheets)
+
+    assert session.refresh() == [(radars_path, "Terminal Radars", 0)]
+    assert session.removed() == {(radars_path, "Terminal Radars", 0)}
+    assert session.read_excel(radars_path, "En Route Radars")["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+
+
+def test_reload_diffs_radars_and_updates_followed_index(radars_path, artcc_rings, session):
+    enroute = DataTools.EnRoute(workbook_session=session, radar_path=radars_path)
+    enroute.load_radars()
+    index = enroute.radar_index(follow=True)
+    received = []
+    enroute.subscribe(lambda system, diff: received.append(diff))
+
+    write_workbook(radars_path, radars_sheets(artcc_rings, enroute_radars=_edited_radars()))
+    diff = enroute.reload()
+
+    assert received == [diff]
+    assert diff.sheets == [(radars_path, "En Route Radars")] and diff.removed == []
+    assert diff.radios is None and not diff.airspace
+    assert diff.radars.added["Radar_ID"].tolist() == ["DDD"]
+    assert diff.radars.removed["Radar_ID"].tolist() == ["CCC"]
+    assert diff.radars.modified["Radar_ID"].tolist() == ["AAA"]
+    assert diff.radars.before["Radar_Lat"].tolist() == [38.5]
+    assert sorted(index.ids.tolist()) == ["AAA", "BBB", "DDD"]
+    assert index.nearest_ids([[38.75, -77.0]])[0, 0] == "AAA"
+    np.testing.assert_allclose(index.nearest([[38.75, -77.0]])[1][0, 0], 0.0, atol=1e-6)
+
+    # Nothing changed: no diff is published
+    assert enroute.reload().sheets == []
+    assert len(received) == 1
+
+    enroute.unfollow(index)
+    write_workbook(radars_path, radars_sheets(artcc_rings))
+    enroute.reload()
+    assert sorted(index.ids.tolist()) == ["AAA", "BBB", "DDD"]
+
+
+def test_followed_index_is_not_kept_alive(radars_path, session):
+    enroute = DataTools.EnRoute(workbook_session=session, radar_path=radars_path)
+    enroute.radar_index(follow=True)
+    write_workbook(radars_path, {"En Route Radars": _edited_radars()})
+    enroute.reload()
+    assert enroute._subscribers == []
+
+
+def test_reload_keeps_removed_sheet_tables(radars_path, artcc_rings, session):
+    terminal = DataTools.Terminal(workbook_session=session, radar_path=radars_path)
+    terminal.load_radars()
+    sheets = radars_sheets(artcc_rings)
+    del sheets["Terminal Radars"]
+    write_workbook(radars_path, sheets)
+
+    diff = terminal.reload()
+    assert diff.removed == [(radars_path, "Terminal Radars")]
+    assert diff.radars is None
+    assert terminal.radars["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+
+
+def test_reload_resets_built_boundaries_but_keeps_given_ones(radars_path, artcc_rings, session):
+    built = DataTools.EnRoute(workbook_session=session, radar_path=radars_path)
+    given = DataTools.EnRoute(
+        workbook_session=session, radar_path=radars_path, boundaries=DataTools.ArtccBoundaries(artcc_sheet(artcc_rings))
+    )
+    assert built.sv_map == given.sv_map == {"ZDC": 20, "ZKC": 30}
+
+    del artcc_rings["ZKC"]
+    write_workbook(radars_path, radars_sheets(artcc_rings))
+    assert built.reload().airspace
+    assert not given.reload().airspace
+    assert built.sv_map == {"ZDC": 20}
+    assert given.sv_map == {"ZDC": 20, "ZKC": 30}
+
+
+def test_sensor_diff_matches_repeated_and_missing_keys():
+    previous = pd.DataFrame({"RSID": ["R1", "R1", None, "R2"], "Lat": [1.0, 2.0, 3.0, 4.0]})
+    current = pd.DataFrame({"RSID": ["R1", "R1", None, "R3"], "Lat": [1.0, 2.5, 3.0, 5.0]}, index=[10, 11, 12, 13])
+    diff = DataTools.SensorDiff(previous, current, "RSID")
+
+    assert diff.added["RSID"].tolist() == ["R3"]
+    assert diff.removed["RSID"].tolist() == ["R2"]
+    # The second R1 changed; the first R1 and the unkeyed row match their previous occurrence
+    assert diff.modified.index.tolist() == [11]
+    assert diff.before["Lat"].tolist() == [2.0]
+    assert diff.ids == {"R1", "R2", "R3"}
+    assert len(diff) == 3
+
+
+def test_sensor_index_remove_and_apply_diff_compact():
+    lat_lon = np.column_stack((np.linspace(30.0, 45.0, 20), np.linspace(-120.0, -75.0, 20)))
+    index = DataTools.SensorIndex(lat_lon, ids=[f"S{n}" for n in range(20)], rebuild_fraction=0.1)
+
+    assert index.remove(["S0"]) == 1
+    # Masked out of results until the tree is rebuilt
+    assert index.ids.size == 20 and "S0" not in index.nearest_ids(lat_lon[:1], k=20)[0]
+    assert index.remove(["S18", "S19", "missing"]) == 2
+    # Three removals exceed 10% of the tree, so it was rebuilt without them
+    assert len(index) == 17 and index.ids.size == 17
+
+    previous = pd.DataFrame({"ID": ["S1", "S2"], "Lat": lat_lon[1:3, 0], "Lon": lat_lon[1:3, 1]})
+    current = pd.DataFrame({"ID": ["S1", "S2"], "Lat": [lat_lon[1, 0], 10.0], "Lon": [lat_lon[1, 1], 10.0]})
+    index.apply_diff(DataTools.SensorDiff(previous, current, "ID"), "Lat", "Lon")
+
+    assert len(index) == 17
+    assert index.nearest_ids([[10.0, 10.0]])[0, 0] == "S2"
+    assert index.within_ids(lat_lon[2:3], 1.0) == [[]]
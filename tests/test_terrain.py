@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.transform import from_origin
+
+from Libs import CoverageTools, TerrainTools
+
+# 4 x 4 degree DEM at 0.01 deg per cell, north-west corner at (40 N, 100 W)
+CELL_DEG = 0.01
+ORIGIN = (-100.0, 40.0)
+SENSOR = (38.0, -98.0)
+
+
+def _write_dem(path, elevation, nodata=None):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=elevation.shape[0], width=elevation.shape[1], count=1,
+        dtype="float32", crs="EPSG:4326", transform=from_origin(ORIGIN[0], ORIGIN[1], CELL_DEG, CELL_DEG),
+        nodata=nodata,
+    ) as dataset:
+        dataset.write(elevation.astype(np.float32), 1)
+    return str(path)
+
+
+@pytest.fixture
+def flat_dem(tmp_path):
+    return _write_dem(tmp_path / "flat.tif", np.zeros((400, 400)))
+
+
+@pytest.fixture
+def ridge_dem(tmp_path):
+    # 2000 m north-south wall 0.3 deg east of the sensor, spanning 37.5 N to 38.5 N
+    elevation = np.zeros((400, 400))
+    elevation[150:250, 230:232] = 2000.0
+    return _write_dem(tmp_path / "ridge.tif", elevation)
+
+
+def test_sampler_reads_blocks_fill_and_nodata(tmp_path):
+    rows, cols = np.mgrid[0:400, 0:400]
+    elevation = (rows * 1000 + cols).astype(float)
+    elevation[10, 20] = -9999.0
+    path = _write_dem(tmp_path / "ramp.tif", elevation, nodata=-9999.0)
+
+    with TerrainTools.DemSampler(path, block_size=64, fill_value=-1.0) as sampler:
+        lats = ORIGIN[1] - (np.array([0, 5, 199, 399]) + 0.5) * CELL_DEG
+        lons = ORIGIN[0] + (np.array([0, 300, 64, 399]) + 0.5) * CELL_DEG
+        np.testing.assert_allclose(sampler.sample(lats, lons), [0, 5300, 199064, 399399])
+        # Outside the raster and on a nodata cell
+        assert sampler.sample(41.0, -99.0) == -1.0
+        assert sampler.sample(ORIGIN[1] - 10.5 * CELL_DEG, ORIGIN[0] + 20.5 * CELL_DEG) == -1.0
+
+
+def test_flat_viewshed_matches_smooth_earth_horizon(flat_dem):
+    viewshed = TerrainTools.Viewshed(flat_dem, num_azimuths=8, range_step_nmi=0.5, max_range_nmi=100.0)
+    result = viewshed.compute(*SENSOR, antenna_height_ft=100.0, altitudes_ft=(1000.0, 3000.0))
+
+    assert result.max_range_nmi.shape == (2, 8)
+    horizon = CoverageTools.radio_horizon_nmi(100.0, np.array([1000.0, 3000.0]))
+    # Coverage stops within one range step of the 4/3 earth horizon on every radial
+    assert np.all(np.abs(result.max_range_nmi - horizon[:, None]) <= 0.5)
+
+
+def test_ridge_blocks_only_its_sector(ridge_dem):
+    viewshed = TerrainTools.Viewshed(ridge_dem, num_azimuths=36, range_step_nmi=0.5, max_range_nmi=60.0)
+    result = viewshed.compute(*SENSOR, antenna_height_ft=50.0, altitudes_ft=(1500.0,))
+    limits = result.azimuth_limits_nmi(0)
+
+    # The wall is ~14 nmi due east: targets at 1500 ft are blocked behind it, but not to the west
+    east = limits[result.azimuths == 90.0][0]
+    west = limits[result.azimuths == 270.0][0]
+    assert 13.0 <= east <= 15.0
+    assert west > 40.0
+    assert result.horizon_deg[result.azimuths == 90.0].max() > 3.0
+
+
+def test_horizon_azimuth_limits_feed_horizon_coverage(flat_dem, ridge_dem):
+    results = [
+        TerrainTools.Viewshed(dem, num_azimuths=36, range_step_nmi=0.5, max_range_nmi=60.0).compute(
+            *SENSOR, antenna_height_ft=50.0, altitudes_ft=(1500.0, 5000.0)
+        )
+        for dem in (flat_dem, ridge_dem)
+    ]
+    limits = TerrainTools.horizon_azimuth_limits(results, altitude_index=0)
+    assert limits.shape == (2, 36)
+
+    coverage = CoverageTools.HorizonCoverage(
+        [SENSOR, SENSOR], antenna_height_ft=50.0, altitudes_ft=(1500.0,), num_azimuths=36,
+        azimuth_limits_nmi=limits,
+    )
+    assert coverage.range_nmi.shape == (2, 1, 36)
+    np.testing.assert_allclose(coverage.range_nmi[:, 0], np.minimum(limits, coverage.horizon_nmi))
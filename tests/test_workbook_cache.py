@@ -0,0 +1,162 @@
+import os
+import pickle
+
+import pandas as pd
+import pytest
+
+from Libs import DataTools
+from workbooks import RADARS, radars_sheets, write_radio_workbook, write_workbook
+
+
+@pytest.fixture
+def radars_path(tmp_path, artcc_rings):
+    return write_workbook(tmp_path / "Radars_ALL.xlsx", radars_sheets(artcc_rings))
+
+
+@pytest.fixture
+def radio_path(tmp_path):
+    return write_radio_workbook(tmp_path / "radio_locations.xlsx")
+
+
+RADAR_BATCHES = [["Terminal Radars", "En Route Radars"], ["Terminal ClassB", "Terminal ClassC", "Terminal ClassD"],
+                 ["EnRoute"]]
+
+
+def _session(radars_path, radio_path, cache_dir=None):
+    return DataTools.WorkbookSession(
+        sheets={(radars_path, 0): RADAR_BATCHES, (radio_path, 6): [[0]]},
+        workbook_cache=DataTools.WorkbookCache(cache_dir),
+    )
+
+
+def _entry_sha1(cache, path, sheet_name):
+    with open(os.path.join(cache.entry_dir(path, sheet_name), "meta.pkl"), "rb") as f:
+        return pickle.load(f)["sha1"]
+
+
+def test_cached_sheets_match_a_fresh_parse(tmp_path, radars_path):
+    cache = DataTools.WorkbookCache(str(tmp_path / "cache"))
+    names = ["Terminal Radars", "EnRoute"]
+    parsed = cache.read_excel_sheets(radars_path, names)
+    cached = DataTools.WorkbookCache(str(tmp_path / "cache")).read_excel_sheets(radars_path, names)
+
+    for name in names:
+        pd.testing.assert_frame_equal(cached[name], pd.read_excel(radars_path, sheet_name=name))
+        pd.testing.assert_frame_equal(cached[name], parsed[name])
+    assert cache.stats == {"hits": 0, "misses": 2}
+    projected = cache.read_excel(radars_path, "Terminal Radars", usecols=["Radar_ID", "Radar_Lon"])
+    assert list(projected.columns) == ["Radar_ID", "Radar_Lon"] and cache.hits == 1
+
+
+def test_touched_workbook_is_rehashed_and_reused(tmp_path, radars_path):
+    cache = DataTools.WorkbookCache(str(tmp_path / "cache"))
+    cache.read_excel(radars_path, "Terminal Radars")
+    stat = os.stat(radars_path)
+    os.utime(radars_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not cache.is_current(radars_path, "Terminal Radars")
+
+    # The content hash still matches, so the entry is reused and its stored mtime refreshed
+    df = cache.read_excel(radars_path, "Terminal Radars")
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert cache.is_current(radars_path, "Terminal Radars")
+    pd.testing.assert_frame_equal(df, pd.read_excel(radars_path, sheet_name="Terminal Radars"))
+
+
+def test_changed_workbook_is_reparsed(tmp_path, radars_path, artcc_rings):
+    cache = DataTools.WorkbookCache(str(tmp_path / "cache"))
+    cache.read_excel(radars_path, "Terminal Radars")
+    old_sha1 = _entry_sha1(cache, radars_path, "Terminal Radars")
+
+    edited = RADARS.copy()
+    edited.loc[0, "Radar_ID"] = "ZZZ"
+    write_workbook(radars_path, radars_sheets(artcc_rings, terminal_radars=edited))
+    assert DataTools.WorkbookCache.content_hash(radars_path) != old_sha1
+
+    df = cache.read_excel(radars_path, "Terminal Radars")
+    assert df["Radar_ID"].tolist() == ["ZZZ", "BBB", "CCC"]
+    assert cache.stats == {"hits": 0, "misses": 2}
+    assert _entry_sha1(cache, radars_path, "Terminal Radars") == DataTools.WorkbookCache.content_hash(radars_path)
+    assert cache.is_current(radars_path, "Terminal Radars")
+
+
+def test_surveillance_system_cache_can_be_turned_off(tmp_path, radars_path, monkeypatch):
+    default_dir = tmp_path / "default_cache"
+    monkeypatch.setattr(DataTools, "_workbook_cache", DataTools.WorkbookCache(str(default_dir)))
+
+    enroute = DataTools.EnRoute(radar_path=radars_path, workbook_cache=DataTools.WorkbookCache(cache_dir=None))
+    assert enroute.radars["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+    assert not default_dir.exists()
+
+    # Without the opt-out the module cache is used
+    assert DataTools.EnRoute(radar_path=radars_path).radars["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+    assert default_dir.exists()
+
+
+def test_session_batches_match_per_sheet_reads(radars_path, radio_path):
+    session = _session(radars_path, radio_path)
+    for name in ["Terminal Radars", "En Route Radars", "Terminal ClassC", "EnRoute"]:
+        expected = pd.read_excel(radars_path, sheet_name=name)
+        pd.testing.assert_frame_equal(session.read_excel(radars_path, name), expected)
+    pd.testing.assert_frame_equal(session.read_excel(radio_path, header=6), pd.read_excel(radio_path, header=6))
+    # One parse per batch touched, however many of its sheets were read
+    assert session.parses == 4
+    assert session.pending() == {}
+
+    # Callers get copies, projected to usecols when given
+    edited = session.read_excel(radars_path, "Terminal Radars")
+    edited.loc[0, "Radar_ID"] = "ZZZ"
+    projected = session.read_excel(radars_path, "Terminal Radars", usecols=["Radar_Lon", "Radar_ID"])
+    assert list(projected.columns) == ["Radar_Lon", "Radar_ID"]
+    assert projected["Radar_ID"].tolist() == ["AAA", "BBB", "CCC"]
+    assert session.parses == 4
+
+
+def _serial_frames(radars_path, radio_path):
+    """Every registered sheet parsed in this process, one _parse_workbook call per workbook"""
+    radar_names = [name for batch in RADAR_BATCHES for name in batch]
+    frames = {(radars_path, name): df for name, df in
+              DataTools._parse_workbook((radars_path, radar_names, 0, None))[0].items()}
+    frames[(radio_path, 0)] = DataTools._parse_workbook((radio_path, [0], 6, None))[0][0]
+    return frames
+
+
+def _assert_preloaded(session, expected, radio_path):
+    assert session.pending() == {}
+    parses = session.parses
+    for (path, name), df in expected.items():
+        header = 6 if path == radio_path else 0
+        pd.testing.assert_frame_equal(session.read_excel(path, name, header), df)
+    # Everything was handed over by preload_workbooks, so reading parses nothing more
+    assert session.parses == parses
+
+
+@pytest.mark.parametrize("split_sheets", [False, True])
+def test_preload_workbooks_matches_serial_parse(tmp_path, radars_path, radio_path, split_sheets):
+    expected = _serial_frames(radars_path, radio_path)
+    session = _session(radars_path, radio_path, str(tmp_path / "cache"))
+    timings = DataTools.preload_workbooks(session, max_workers=2, split_sheets=split_sheets)
+
+    _assert_preloaded(session, expected, radio_path)
+    if split_sheets:
+        assert session.parses == 7
+        assert set(timings) == {f"{path}:{name}" for path, name in expected} | {"total"}
+    else:
+        assert session.parses == 2
+        assert set(timings) == {radars_path, radio_path, "total"}
+
+    # A second start finds every sheet current in the cache the workers wrote and loads it in-process
+    session = _session(radars_path, radio_path, str(tmp_path / "cache"))
+    timings = DataTools.preload_workbooks(session)
+    assert set(timings) == {f"{radars_path} (cached)", f"{radio_path} (cached)", "total"}
+    assert session.parses == 0
+    _assert_preloaded(session, expected, radio_path)
+
+
+def test_preload_workbooks_parses_a_single_workbook_in_process(radars_path, radio_path):
+    expected = _serial_frames(radars_path, radio_path)
+    session = _session(radars_path, radio_path)
+    session.read_excel(radio_path, header=6)
+
+    timings = DataTools.preload_workbooks(session)
+    assert set(timings) == {radars_path, "total"} and session.parses == 2
+    _assert_preloaded(session, expected, radio_path)
@@ -0,0 +1,152 @@
+"""Synthetic Radars_ALL / radio workbooks for the DataTools tests"""
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+import pandas as pd
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ElementTree.register_namespace("", MAIN_NS)
+ElementTree.register_namespace("r", "http://schemas.openxmlformats.org/officeDocument/2006/relationships")
+
+
+def write_workbook(path, sheets: dict, startrow=0, shared_strings=False):
+    """Write {sheet name: DataFrame} to an .xlsx file, with a shared string table as Excel saves it if asked"""
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False, startrow=startrow)
+    if shared_strings:
+        share_strings(path)
+    return str(path)
+
+
+def read_parts(path) -> dict:
+    with zipfile.ZipFile(path) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+def write_parts(path, parts: dict):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        for name, data in parts.items():
+            package.writestr(name, data)
+
+
+def share_strings(path):
+    """
+    Move the inline text cells openpyxl writes into xl/sharedStrings.xml; strings are numbered in order of
+    first use, sheet by sheet, and text used by several sheets gets one shared entry
+    """
+    parts = read_parts(path)
+    strings = {}
+    for name in sorted(part for part in parts if part.startswith("xl/worksheets/sheet")):
+        sheet = ElementTree.fromstring(parts[name])
+        for cell in sheet.iter(f"{{{MAIN_NS}}}c"):
+            inline = cell.find(f"{{{MAIN_NS}}}is")
+            if cell.get("t") == "inlineStr" and inline is None:
+                # openpyxl marks empty (None) cells as inline strings; Excel leaves them untyped
+                del cell.attrib["t"]
+            elif cell.get("t") == "inlineStr":
+                text = "".join(inline.itertext())
+                cell.remove(inline)
+                cell.set("t", "s")
+                ElementTree.SubElement(cell, f"{{{MAIN_NS}}}v").text = str(strings.setdefault(text, len(strings)))
+        parts[name] = ElementTree.tostring(sheet, encoding="UTF-8", xml_declaration=True)
+
+    parts["xl/sharedStrings.xml"] = shared_strings_part(list(strings))
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"</Types>",
+        b'<Override PartName="/xl/sharedStrings.xml" '
+        b'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>',
+    )
+    parts["xl/_rels/workbook.xml.rels"] = parts["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        b'<Relationship Id="rIdStrings" Target="sharedStrings.xml" '
+        b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/></Relationships>',
+    )
+    write_parts(path, parts)
+    return str(path)
+
+
+def shared_strings_part(strings: list) -> bytes:
+    table = ElementTree.Element(f"{{{MAIN_NS}}}sst", count=str(len(strings)), uniqueCount=str(len(strings)))
+    for text in strings:
+        ElementTree.SubElement(ElementTree.SubElement(table, f"{{{MAIN_NS}}}si"), f"{{{MAIN_NS}}}t").text = text
+    return ElementTree.tostring(table, encoding="UTF-8", xml_declaration=True)
+
+
+def shared_strings(path) -> list:
+    table = ElementTree.fromstring(read_parts(path)["xl/sharedStrings.xml"])
+    return ["".join(si.itertext()) for si in table.findall(f"{{{MAIN_NS}}}si")]
+
+
+def edit_shared_strings(path, edit):
+    """Rewrite the shared string table in place (edit maps the list of strings to a new list), sheets untouched"""
+    parts = read_parts(path)
+    parts["xl/sharedStrings.xml"] = shared_strings_part(edit(shared_strings(path)))
+    write_parts(path, parts)
+
+
+def artcc_sheet(rings: dict) -> pd.DataFrame:
+    """EnRoute sheet rows for {ARTCC ID: (SV ID, [(lat, lon), ...])}; only each ring's first row carries the IDs"""
+    rows = []
+    for artcc, (sv_id, ring) in rings.items():
+        for vertex, (lat, lon) in enumerate(ring):
+            rows.append({
+                "ARTCC_ID": artcc if vertex == 0 else None, "SV ID": sv_id if vertex == 0 else None,
+                "SV_Lat": lat, "SV_Lon": lon,
+            })
+    return pd.DataFrame(rows, columns=["ARTCC_ID", "SV ID", "SV_Lat", "SV_Lon"])
+
+
+RADARS = pd.DataFrame({
+    "Radar_Name": ["Alpha", "Bravo", "Charlie"],
+    "Radar_ID": ["AAA", "BBB", "CCC"],
+    "SDP1": ["ZDC", "ZKC", "ZDC"],
+    "Radar_Lat": [38.5, "39 30 00N", 39.0],
+    "Radar_Lon": [-77.0, -100.0, -76.0],
+    "SSR Type": ["MODES", "ATCBI-6", "MODES"],
+    "PSR Type": ["ASR-9", None, "ARSR-4"],
+    "Airspace_ID": ["ZDC", "ZKC", "ZDC"],
+})
+
+
+def terminal_class_sheet(sv_id, lat, lon) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"SV ID": [sv_id], "Arpt_Name": ["Field"], "SV_Lat": [lat], "SV_Lon": [lon], "SV_Range_NM": [30]}
+    )
+
+
+def radars_sheets(rings: dict, terminal_radars=None, enroute_radars=None) -> dict:
+    """Every Radars_ALL sheet Terminal and EnRoute read"""
+    return {
+        "Terminal Radars": RADARS if terminal_radars is None else terminal_radars,
+        "En Route Radars": RADARS if enroute_radars is None else enroute_radars,
+        "Terminal ClassB": terminal_class_sheet(1, 38.9, -77.0),
+        "Terminal ClassC": terminal_class_sheet(2, 39.2, -76.7),
+        "Terminal ClassD": terminal_class_sheet(3, 38.7, -77.3),
+        "EnRoute": artcc_sheet(rings),
+    }
+
+
+# Radio workbook rows: "O" marks a radio operational for the ERAM site of each eCTV column
+RADIOS = pd.DataFrame({
+    "Operational Status": ["Operational", "Operational", "Planned", "Operational", "Operational"],
+    "LID\n(GBT/[MRU])": ["GBT1", "GBT2", "MRU3", "GBT4", "GBT5"],
+    "Facility Location": ["Here", "There", "Elsewhere", "Far", "Unused"],
+    "RSID": ["R1", "R2", "R3", "R4", "R5"],
+    "Latitude\n(Degrees)": [38.5, "39 30 00N", 39.0, 40.0, 41.0],
+    "Longitude\n(Degrees)": [-77.0, -100.0, -76.0, -99.0, -75.0],
+    "Enclosed By SV.1": ["ZDC", "ZKC", "ZDC", "ZKC", "ZNY"],
+    "ADS-B/WAM Usage": ["ADS-B", "WAM", "ADS-B", "ADS-B", None],
+    "Site Elevation (MSL)": [100, 200, 300, 400, 500],
+    "Antenna Height (AGL)": [10, 20, 30, 40, 50],
+    "1090ES Antenna": ["Omni", "Sector", "Omni", "Omni", "Omni"],
+    "Radio Variant": ["GBT", "GBT/MRU", "MRU", "GBT", None],
+    "ZDC eCTV": ["O", None, "O", None, "O"],
+    "ZKC eCTV": [None, "O", "O", "O", None],
+    "ZNY eCTV": [None, None, None, None, "O"],
+})
+
+
+def write_radio_workbook(path, radios=None):
+    """Radio workbook with its header on the seventh row, as SurveillanceSystem reads it"""
+    return write_workbook(path, {"Radios": RADIOS if radios is None else radios}, startrow=6)